@@ -12,6 +12,7 @@ type TtsController = {
     abort: AbortController;
     runId: string;
     chain: Promise<void>;
+    segmentCount: number;
     fastStartTimer: number | null;
 };
 
@@ -38,6 +39,8 @@ export function useTtsController(
 
     const scheduleSegment = React.useCallback((ctl: TtsController, text: string) => {
         const localRunId = ctl.runId;
+        // The first segment is what the listener waits on; the rest is prefetch
+        const priority = ctl.segmentCount++ === 0 ? "high" : "low";
 
         ctl.chain = ctl.chain
             .then(async () => {
@@ -48,6 +51,7 @@ export function useTtsController(
                     input: text,
                     voice: "af_heart",
                     speed: 1.0,
+                    priority,
                     signal: ctl.abort.signal
                 });
 
@@ -83,6 +87,7 @@ export function useTtsController(
             abort: new AbortController(),
             runId: Math.random().toString(16),
             chain: Promise.resolve(),
+            segmentCount: 0,
             fastStartTimer: null
         };
 
@@ -2,6 +2,8 @@ export async function* streamChatCompletion(args: {
     model: string;
     messages: Array<{ role: "system" | "user" | "assistant" | "tool"; content: string }>;
     sessionId: string;
+    // Set when this reply will be spoken; lets the server pre-synthesize it
+    tts?: { voice: string; speed: number };
     signal?: AbortSignal;
 }): AsyncGenerator<string> {
     // 2. Append session_id to the URL
@@ -16,6 +18,7 @@ export async function* streamChatCompletion(args: {
             model: args.model,
             messages: args.messages,
             stream: true,
+            ...(args.tts ? { tts: args.tts } : {}),
         }),
         signal: args.signal,
     });
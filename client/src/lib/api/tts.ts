@@ -3,6 +3,7 @@ export async function fetchSpeechWav(args: {
   voice: string;
   speed: number;
   model?: string;
+  priority?: "high" | "normal" | "low";
   signal?: AbortSignal;
 }): Promise<Blob> {
   const res = await fetch("/v1/audio/speech", {
@@ -14,6 +15,7 @@ export async function fetchSpeechWav(args: {
       voice: args.voice,
       response_format: "wav",
       speed: args.speed,
+      priority: args.priority ?? "normal",
     }),
     signal: args.signal,
   });
@@ -5,9 +5,13 @@ from fastapi import APIRouter
 from .v1.openai.chat_completions import router as chat_router
 from .v1.openai.audio_speech import router as speech_router
 from .v1.sessions import router as sessions_router  # <--- Import
+from .v1.metrics import router as metrics_router
+from .v1.voice import router as voice_router
 
 api_router = APIRouter()
 
 api_router.include_router(chat_router, prefix="/v1", tags=["openai"])
 api_router.include_router(speech_router, prefix="/v1", tags=["openai"])
 api_router.include_router(sessions_router, prefix="/v1", tags=["sessions"])
+api_router.include_router(metrics_router, prefix="/v1", tags=["metrics"])
+api_router.include_router(voice_router, prefix="/v1", tags=["voice"])
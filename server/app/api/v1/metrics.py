@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    """
+    Runtime counters (caches, queues, pools) as JSON.
+    """
+    chat = getattr(request.app.state, "chat", None)
+    tts = getattr(request.app.state, "tts", None)
+    return {
+        "chat": chat.stats() if chat else None,
+        "tts": tts.stats() if tts else None,
+    }
+
+
+@router.get("/metrics/requests")
+async def request_metrics(
+    request: Request,
+    session_id: Optional[str] = Query(None),
+    since: Optional[float] = Query(None, description="Unix time, seconds"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Recent chat requests, newest first: token usage and timings (ms).
+    """
+    chat = getattr(request.app.state, "chat", None)
+    if not chat:
+        return {"requests": []}
+    return {"requests": chat.usage_store.query(session_id, since, limit)}
@@ -1,31 +1,104 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Request
-from fastapi.responses import Response
+import asyncio
+from typing import Awaitable, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 
 from app.schemas.openai_audio import SpeechRequest
+from app.services.audio_codecs import MEDIA_TYPES, format_available
 
 router = APIRouter()
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+async def _wait_disconnect(request: Request) -> None:
+    # The body is already consumed, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _unless_disconnected(request: Request, work: Awaitable[bytes]) -> Optional[bytes]:
+    """
+    Awaits `work`, cancelling it if the client hangs up first.
+    Returns None in that case.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+
+    if not task.done():
+        return None
+    return task.result()
+
+
 @router.post("/audio/speech")
 async def audio_speech(req: SpeechRequest, request: Request):
     """
     OpenAI-compatible: POST /v1/audio/speech
-    Returns raw audio bytes. We currently support WAV only.
+    Returns raw audio bytes: wav, pcm (s16le mono), and flac/opus/mp3 when
+    the local libsndfile can encode them.
+    With `stream=true` the audio is sent chunked as segments are synthesized.
+    Work for a client that disconnects stops at the next segment boundary.
     """
     tts = request.app.state.tts
 
-    wav_bytes = await tts.synthesize_wav(
+    fmt = req.response_format
+    if not format_available(fmt):
+        raise HTTPException(
+            status_code=400,
+            detail=f"response_format '{fmt}' is not supported by this server",
+        )
+
+    job = tts.prepare(
         text_markdown=req.input,
         voice=req.voice,
         speed=req.speed,
+        response_format=fmt,
+        priority=req.priority,
+        stream=req.stream,
     )
 
+    # Audio is content-addressed, so the job key is a strong validator.
+    etag = f'"{job.key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f'inline; filename="speech.{fmt}"',
+    }
+    if fmt == "pcm":
+        headers["X-Sample-Rate"] = str(tts.sample_rate)
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if req.stream:
+        return StreamingResponse(
+            tts.render_stream(job),
+            media_type=MEDIA_TYPES[fmt],
+            headers={"X-Accel-Buffering": "no", **headers},
+        )
+
+    audio = await _unless_disconnected(request, tts.render_audio(job))
+    if audio is None:
+        # Nginx's "client closed request"; nobody will read it
+        return Response(status_code=499)
+
     return Response(
-        content=wav_bytes,
-        media_type="audio/wav",
-        headers={
-            "Content-Disposition": 'inline; filename="speech.wav"',
-        },
+        content=audio,
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
     )
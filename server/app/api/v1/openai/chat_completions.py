@@ -1,25 +1,34 @@
 from __future__ import annotations
 
-import json
 import time
 import asyncio
-from typing import AsyncIterator, Optional
+from typing import Any, AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.schemas.openai_chat import ChatCompletionRequest
 from app.core.dependencies import get_chat_runtime
-from app.services.chat_runtime import ChatRuntime
+from app.services.admission import ChatOverloaded, retry_after_header
+from app.services.chat_runtime import ChatRuntime, ChatTurn
+from app.services.chat_sse import ChatChunkEncoder, coalesce_deltas
+from app.services.usage import server_timing
 
 router = APIRouter()
 
 
-def _sse(obj: dict) -> str:
+def _sampling(req: ChatCompletionRequest) -> dict[str, Any]:
     """
-    Helper to format a dict as a Server-Sent Events data line.
+    Sampling knobs the request sets, as pydantic-ai model settings.
     """
-    return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n"
+    knobs = {"temperature": req.temperature, "max_tokens": req.max_tokens}
+    return {k: v for k, v in knobs.items() if v is not None}
+
+
+def _cache_header(turn: ChatTurn) -> dict[str, str]:
+    if not turn.cache_key:
+        return {}
+    return {"X-Cache": "HIT" if turn.cached is not None else "MISS"}
 
 
 @router.post("/chat/completions")
@@ -43,17 +52,29 @@ async def chat_completions(
         session_id or request.headers.get("X-Session-ID") or "default_session"
     )
 
+    turn = await chat.prepare(
+        req.messages, session_id=actual_session_id, model=model, sampling=_sampling(req)
+    )
+
+    try:
+        await chat.start(turn)
+    except ChatOverloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Chat backend is busy: {e}",
+            headers=retry_after_header(e),
+        )
+
     # Non streaming
     if not req.stream:
         # Optional non-streaming: collect deltas
         out = []
-        async for delta in chat.stream_deltas(
-            req.messages, session_id=actual_session_id
-        ):
+        async for delta in chat.stream(turn, tts=req.tts):
             out.append(delta)
         text = "".join(out)
+        headers = {**_cache_header(turn), "Server-Timing": server_timing(turn.timings)}
 
-        return {
+        body = {
             "id": resp_id,
             "object": "chat.completion",
             "created": created,
@@ -65,62 +86,40 @@ async def chat_completions(
                     "finish_reason": "stop",
                 }
             ],
-            "usage": {
-                # Dummy
-                "prompt_tokens": 0,
-                "completion_tokens": len(out),
-                "total_tokens": len(out),
-            },
+            "usage": turn.usage.as_openai(),
+            # Extension, same idea as llama-server's
+            "timings": turn.timings,
         }
+        return JSONResponse(body, headers=headers)
+
+    include_usage = bool(req.stream_options and req.stream_options.include_usage)
+    # Only what is known before the first byte; the rest goes in the usage chunk
+    headers = {**_cache_header(turn), "Server-Timing": server_timing(turn.timings)}
 
-    async def event_gen() -> AsyncIterator[str]:
+    async def event_gen() -> AsyncIterator[bytes]:
+        chunks = ChatChunkEncoder(resp_id, created, model)
         # First chunk with role
-        yield _sse(
-            {
-                "id": resp_id,
-                "object": "chat.completion.chunk",
-                "created": created,
-                "model": model,
-                "choices": [
-                    {"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}
-                ],
-            }
-        )
+        yield chunks.role()
+
+        deltas = chat.stream(turn, disconnect_check=request, tts=req.tts)
+        if chat.stream_coalesce_s > 0:
+            deltas = coalesce_deltas(
+                deltas, chat.stream_coalesce_s, chat.stream_coalesce_chars, chat.stream_stats
+            )
 
         try:
-            async for delta in chat.stream_deltas(
-                req.messages, session_id=actual_session_id, disconnect_check=request
-            ):
+            async for delta in deltas:
                 if await request.is_disconnected():
                     break
 
-                yield _sse(
-                    {
-                        "id": resp_id,
-                        "object": "chat.completion.chunk",
-                        "created": created,
-                        "model": model,
-                        "choices": [
-                            {
-                                "index": 0,
-                                "delta": {"content": delta},
-                                "finish_reason": None,
-                            }
-                        ],
-                    }
-                )
+                chat.stream_stats.frames += 1
+                yield chunks.content(delta)
 
             # Final chunk
-            yield _sse(
-                {
-                    "id": resp_id,
-                    "object": "chat.completion.chunk",
-                    "created": created,
-                    "model": model,
-                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
-                }
-            )
-            yield "data: [DONE]\n\n"
+            yield chunks.stop()
+            if include_usage:
+                yield chunks.usage(turn.usage.as_openai(), turn.timings)
+            yield chunks.done()
 
         except asyncio.CancelledError:
             return
@@ -135,5 +134,6 @@ async def chat_completions(
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
             "Connection": "keep-alive",
+            **headers,
         },
     )
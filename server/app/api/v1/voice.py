@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+
+from app.schemas.openai_audio import AudioFormat
+from app.schemas.openai_chat import ChatMessage
+from app.services.audio_codecs import format_available
+from app.services.chat_runtime import ChatRuntime
+from app.services.markdown_tts import MarkdownTtsNormalizer
+from app.services.tts_runtime import KokoroRuntime
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class VoiceStart(BaseModel):
+    type: str = "start"
+    messages: List[ChatMessage]
+    session_id: Optional[str] = None
+    voice: Optional[str] = None
+    speed: Optional[float] = None
+    response_format: AudioFormat = "wav"
+
+
+class _VoiceTurn:
+    """
+    One assistant reply: LLM deltas are cleaned for speech as they stream,
+    and each finished sentence is synthesized in order. Text and audio
+    share the socket.
+    """
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        send_lock: asyncio.Lock,
+        chat: ChatRuntime,
+        tts: KokoroRuntime,
+        start: VoiceStart,
+    ):
+        self.ws = ws
+        self.send_lock = send_lock
+        self.chat = chat
+        self.tts = tts
+        self.start = start
+
+        self.segments: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self.normalizer = MarkdownTtsNormalizer()
+
+    async def run(self) -> None:
+        tasks = [
+            asyncio.create_task(self._generate()),
+            asyncio.create_task(self._synthesize()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            await self._send_json({"type": "done"})
+        except asyncio.CancelledError:
+            # "stop" from the client: tear down LLM and synthesis together
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        except Exception as e:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.error(f"Voice turn failed: {e}")
+            await self._send_json({"type": "error", "detail": str(e)})
+
+    async def _generate(self) -> None:
+        try:
+            async for delta in self.chat.stream_deltas(
+                self.start.messages,
+                session_id=self.start.session_id or "default_session",
+            ):
+                await self._send_json({"type": "delta", "content": delta})
+                self._enqueue(self.normalizer.feed(delta))
+
+            self._enqueue(self.normalizer.finish())
+        finally:
+            self.segments.put_nowait(None)
+
+    async def _synthesize(self) -> None:
+        index = 0
+        while True:
+            text = await self.segments.get()
+            if text is None:
+                return
+
+            job = self.tts.prepare(
+                text,
+                voice=self.start.voice,
+                speed=self.start.speed,
+                response_format=self.start.response_format,
+                # Nothing plays until the first segment exists
+                priority="high" if index == 0 else "normal",
+                markdown=False,
+                stream=True,
+            )
+            await self._send_json(
+                {
+                    "type": "audio_start",
+                    "index": index,
+                    "text": text,
+                    "format": job.response_format,
+                    "sample_rate": self.tts.sample_rate,
+                }
+            )
+            async for chunk in self.tts.render_stream(job):
+                async with self.send_lock:
+                    await self.ws.send_bytes(chunk)
+            await self._send_json({"type": "audio_end", "index": index})
+            index += 1
+
+    def _enqueue(self, segments: list[str]) -> None:
+        for s in segments:
+            self.segments.put_nowait(s)
+
+    async def _send_json(self, payload: dict) -> None:
+        async with self.send_lock:
+            await self.ws.send_json(payload)
+
+
+@router.websocket("/voice")
+async def voice_socket(ws: WebSocket):
+    """
+    Duplex voice mode. Client sends JSON:
+      {"type": "start", "messages": [...], "session_id", "voice", "speed", "response_format"}
+      {"type": "stop"}
+    Server sends JSON `delta`, `audio_start`, `audio_end`, `done`, `stopped`,
+    `error` messages; audio for the current segment arrives as binary frames
+    between its `audio_start` and `audio_end`.
+    """
+    chat: ChatRuntime | None = getattr(ws.app.state, "chat", None)
+    tts: KokoroRuntime | None = getattr(ws.app.state, "tts", None)
+
+    await ws.accept()
+    if not chat or not tts:
+        await ws.close(code=1011, reason="Runtimes not initialized")
+        return
+
+    send_lock = asyncio.Lock()
+    turn_task: Optional[asyncio.Task] = None
+
+    async def cancel_turn() -> bool:
+        nonlocal turn_task
+        if turn_task is None:
+            return False
+        if turn_task.done():
+            # Turns report their own errors; this only surfaces what escaped
+            if not turn_task.cancelled() and turn_task.exception() is not None:
+                logger.error(f"Voice turn failed: {turn_task.exception()}")
+            turn_task = None
+            return False
+        turn_task.cancel()
+        try:
+            await turn_task
+        except asyncio.CancelledError:
+            pass
+        turn_task = None
+        return True
+
+    try:
+        while True:
+            try:
+                msg = await ws.receive_json()
+            except (ValueError, KeyError):
+                # Not JSON, or a binary frame
+                async with send_lock:
+                    await ws.send_json({"type": "error", "detail": "Expected a JSON text message"})
+                continue
+            kind = msg.get("type") if isinstance(msg, dict) else None
+
+            if kind == "stop":
+                if await cancel_turn():
+                    async with send_lock:
+                        await ws.send_json({"type": "stopped"})
+                continue
+
+            if kind != "start":
+                async with send_lock:
+                    await ws.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+                continue
+
+            try:
+                start = VoiceStart.model_validate(msg)
+            except ValidationError as e:
+                async with send_lock:
+                    await ws.send_json({"type": "error", "detail": str(e)})
+                continue
+
+            if not format_available(start.response_format):
+                async with send_lock:
+                    await ws.send_json(
+                        {
+                            "type": "error",
+                            "detail": f"response_format '{start.response_format}' is not supported",
+                        }
+                    )
+                continue
+
+            # A new prompt supersedes whatever is still playing
+            await cancel_turn()
+            turn_task = asyncio.create_task(
+                _VoiceTurn(ws, send_lock, chat, tts, start).run()
+            )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await cancel_turn()
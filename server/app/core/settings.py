@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+
+class LlmUpstream(BaseModel):
+    url: str
+    weight: float = 1.0
+    api_key: Optional[str] = None
+    name: Optional[str] = None
 
 
 class Settings(BaseSettings):
@@ -12,6 +19,16 @@ class Settings(BaseSettings):
     llm_base_url: str = Field(default="http://127.0.0.1:8080/v1")
     llm_api_key: str = Field(default="local")
     llm_model: str = Field(default="local-model")
+    # Several OpenAI-compatible servers for the same model, e.g.
+    # LLM_UPSTREAMS='[{"url": "http://a:8080/v1", "weight": 2}, {"url": "http://b:8080/v1"}]'.
+    # Empty = just llm_base_url. Streams go to the least-loaded healthy
+    # upstream (in-flight / weight); a session sticks to its upstream so
+    # the server can reuse its KV cache, unless that one is more than
+    # `llm_affinity_slack` streams busier than the least-loaded one.
+    llm_upstreams: List[LlmUpstream] = Field(default_factory=list)
+    llm_affinity_slack: int = Field(default=4)
+    llm_health_interval_s: float = Field(default=10.0)
+    llm_unhealthy_after: int = Field(default=3)
 
     system_prompt: str = Field(
         default=(
@@ -30,8 +47,125 @@ class Settings(BaseSettings):
     kokoro_voice: str = Field(default="af_heart")
     kokoro_speed: float = Field(default=1.0)
     kokoro_split_pattern: str = Field(default=r"\n+")
+    # Finer split used by streaming responses so audio starts after the
+    # first sentence instead of the first paragraph.
+    kokoro_stream_split_pattern: str = Field(default=r"(?<=[.!?…])\s+|\n+")
     kokoro_sample_rate: int = Field(default=24000)
     kokoro_repo_id: str = Field(default="hexgrad/Kokoro-82M")
+    # Voices in other languages load their own pipeline on first use (sharing
+    # the model). Non-default languages are evicted least-recently-used past
+    # this budget (0 = keep all). The estimate is used where RSS can't be read.
+    kokoro_pipeline_budget_mb: int = Field(default=0)
+    kokoro_pipeline_estimate_mb: int = Field(default=200)
+
+    # Acoustic model backend. "torch" is Kokoro's KModel; "onnx" runs an
+    # exported (by default int8-quantized) model on onnxruntime's CPU
+    # provider. G2P is KPipeline either way. Threads: 0 = onnxruntime default.
+    kokoro_backend: Literal["torch", "onnx"] = Field(default="torch")
+    kokoro_onnx_model_path: Optional[str] = Field(default=None)
+    kokoro_onnx_repo_id: str = Field(default="onnx-community/Kokoro-82M-v1.0-ONNX")
+    kokoro_onnx_file: str = Field(default="onnx/model_quantized.onnx")
+    kokoro_onnx_threads: int = Field(default=0)
+
+    # Startup warm-up: preload voices and run one synthesis per voice before
+    # /readyz reports ready. The default voice is always included.
+    kokoro_warmup: bool = Field(default=True)
+    kokoro_preload_voices: List[str] = Field(default_factory=list)
+    kokoro_warmup_text: str = Field(default="Hello, warming up.")
+
+    # Synthesis worker processes (0 = in-process behind a single lock).
+    # Each worker loads its own model; torch threads are per worker.
+    kokoro_workers: int = Field(default=0)
+    kokoro_worker_threads: int = Field(default=1)
+
+    # Micro-batching of concurrent non-streaming requests that share voice
+    # and speed (0 ms window disables it).
+    kokoro_batch_window_ms: float = Field(default=0.0)
+    kokoro_batch_max_size: int = Field(default=8)
+
+    # TTS audio cache (0 entries disables it). The disk tier is optional.
+    kokoro_cache_max_entries: int = Field(default=512)
+    kokoro_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    kokoro_cache_dir: Optional[str] = Field(default=None)
+    kokoro_cache_disk_max_bytes: int = Field(default=512 * 1024 * 1024)
+
+    # Sentence -> phoneme cache so repeated sentences skip G2P and only run
+    # the acoustic model (0 entries disables it). Per worker process.
+    kokoro_phoneme_cache_max_entries: int = Field(default=4096)
+
+    # Speculative synthesis of streamed chat replies for clients that send
+    # `tts` options with the chat request (off by default). Each sentence is
+    # rendered ahead of the client's /v1/audio/speech call and kept for the
+    # TTL; at most `max_inflight` renders run speculatively at once.
+    kokoro_presynth: bool = Field(default=False)
+    kokoro_presynth_ttl_s: float = Field(default=30.0)
+    kokoro_presynth_max_inflight: int = Field(default=4)
+    kokoro_presynth_max_entries: int = Field(default=64)
+
+    # Chat history and long-term memory are fetched concurrently; whatever
+    # has not arrived by this deadline is left out of the prompt (0 = wait).
+    context_deadline_ms: float = Field(default=150.0)
+
+    # Prompt assembly: recent history is packed newest-first into what the
+    # token budget leaves after memory facts, the summary and the current
+    # turn. Older messages are folded into a per-session rolling summary in
+    # the background (0 summary tokens disables summaries).
+    prompt_budget_tokens: int = Field(default=3072)
+    prompt_summary_max_tokens: int = Field(default=384)
+    prompt_history_fetch_limit: int = Field(default=64)
+    prompt_tokenizer: Literal["estimate", "tiktoken"] = Field(default="estimate")
+    prompt_tiktoken_encoding: str = Field(default="cl100k_base")
+    prompt_chars_per_token: float = Field(default=4.0)
+
+    # At most this many generations run against the LLM at once (0, the
+    # default, = no limit); the rest queue per session, served round-robin.
+    # Requests get 429 + Retry-After when the queue is full or the expected
+    # wait is longer than chat_max_queue_wait_s.
+    chat_max_concurrent: int = Field(default=0)
+    chat_max_queue: int = Field(default=32)
+    chat_max_queue_wait_s: float = Field(default=20.0)
+
+    # "direct" streams generate -> persist without a graph runtime;
+    # "langgraph" runs them as graph nodes, for flows that add branches.
+    chat_pipeline: Literal["direct", "langgraph"] = Field(default="direct")
+
+    # Streamed deltas arriving within this window of the oldest one not yet
+    # sent go out as one SSE chunk, up to chat_stream_coalesce_chars
+    # (0 ms, the default, sends one chunk per delta). The first delta is
+    # never held.
+    chat_stream_coalesce_ms: float = Field(default=0.0)
+    chat_stream_coalesce_chars: int = Field(default=256)
+
+    # Per-request usage and timings kept for /v1/metrics/requests
+    chat_usage_max_records: int = Field(default=1000)
+
+    # A request identical to one still generating (same session and
+    # prompt) follows that stream instead of starting another.
+    chat_coalesce: bool = Field(default=True)
+
+    # Opt-in cache of finished replies for byte-identical prompts sent with
+    # temperature 0 (0 entries disables it). Hits replay the same chunks.
+    chat_cache_max_entries: int = Field(default=0)
+    chat_cache_max_chars: int = Field(default=4 * 1024 * 1024)
+    chat_cache_ttl_s: float = Field(default=600.0)
+
+    # Graphiti search results cached per normalized query (0 entries
+    # disables it); new memory episodes invalidate them.
+    memory_cache_max_entries: int = Field(default=256)
+    memory_cache_ttl_s: float = Field(default=300.0)
+
+    # Finished turns are written to history right away and queued in a
+    # SQLite outbox, where up to N consecutive turns of a session become
+    # one Graphiti episode. With max_pending turns queued, new turns skip
+    # memory rather than wait. Pending turns are flushed (up to the drain
+    # timeout) on shutdown and resumed on the next start.
+    memory_outbox_max_pending: int = Field(default=256)
+    memory_episode_max_turns: int = Field(default=4)
+    memory_episode_linger_s: float = Field(default=10.0)
+    memory_outbox_max_attempts: int = Field(default=5)
+    memory_outbox_retry_base_s: float = Field(default=1.0)
+    memory_outbox_retry_max_s: float = Field(default=60.0)
+    memory_outbox_drain_s: float = Field(default=10.0)
 
     # Graphiti (Memory)
     graphiti_url: str | None = Field(default="bolt://localhost:7687")
@@ -3,7 +3,8 @@ from __future__ import annotations
 from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
-AudioFormat = Literal["wav"]
+AudioFormat = Literal["wav", "pcm", "flac", "opus", "mp3"]
+TtsPriority = Literal["high", "normal", "low"]
 
 
 class SpeechRequest(BaseModel):
@@ -13,3 +14,9 @@ class SpeechRequest(BaseModel):
     voice: Optional[str] = None
     response_format: AudioFormat = "wav"
     speed: Optional[float] = None
+
+    # Extension: chunked output, written segment by segment
+    stream: bool = False
+    # Extension: scheduling hint. "high" for the segment about to play,
+    # "low" for prefetch further ahead.
+    priority: TtsPriority = "normal"
@@ -11,12 +11,27 @@ class ChatMessage(BaseModel):
     content: str
 
 
+class ChatTtsOptions(BaseModel):
+    voice: Optional[str] = None
+    speed: Optional[float] = None
+
+
+class ChatStreamOptions(BaseModel):
+    # Send a final chunk with `usage` (and `timings`) before [DONE]
+    include_usage: bool = False
+
+
 class ChatCompletionRequest(BaseModel):
     model: str = Field(default="local-model")
     messages: List[ChatMessage]
     stream: bool = True
+    stream_options: Optional[ChatStreamOptions] = None
 
     # Optional knobs (accepted for compatibility; may not be used)
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
     metadata: Optional[dict[str, Any]] = None
+
+    # Extension: the client will speak this reply with these settings, so
+    # the server may pre-synthesize sentences as they stream
+    tts: Optional[ChatTtsOptions] = None
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from app.core.settings import Settings
+
+
+class ChatOverloaded(Exception):
+    def __init__(self, retry_after_s: float, reason: str):
+        super().__init__(reason)
+        self.retry_after_s = retry_after_s
+
+
+class ChatSlot:
+    """
+    Held for the length of one generation; `release` is idempotent.
+    """
+
+    def __init__(self, admission: ChatAdmission, waited_s: float):
+        self._admission = admission
+        self.waited_s = waited_s
+        self.started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._admission._release(time.perf_counter() - self.started)
+
+
+class ChatAdmission:
+    """
+    At most `max_concurrent` generations reach the LLM at once. The rest
+    wait in per-session queues served round-robin, so one chatty session
+    cannot starve the others. A request is turned away up front (429) when
+    `max_queue` are already waiting or the expected wait, from the queue
+    length and the mean generation time, exceeds `max_wait_s`.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait_s: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+
+        self.running = 0
+        self._queues: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._queued = 0
+        # Exponential moving average of generation time
+        self._gen_s: Optional[float] = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_count = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.gen_count = 0
+        self.gen_total_s = 0.0
+
+    def estimated_wait_s(self) -> float:
+        if self.running < self.max_concurrent and not self._queued:
+            return 0.0
+        if self._gen_s is None:
+            return 0.0
+        return (self._queued + 1) / self.max_concurrent * self._gen_s
+
+    async def acquire(self, session_id: str) -> ChatSlot:
+        if self.running < self.max_concurrent and not self._queued:
+            self.running += 1
+            return self._admit(0.0)
+
+        estimate = self.estimated_wait_s()
+        if self._queued >= self.max_queue or estimate > self.max_wait_s:
+            self.rejected += 1
+            raise ChatOverloaded(
+                retry_after_s=max(1.0, estimate),
+                reason=f"{self.running} generations running, {self._queued} waiting",
+            )
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append(fut)
+        self._queued += 1
+        t0 = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over just as we gave up
+                self._release(None)
+            else:
+                self._forget(session_id, fut)
+            raise
+        return self._admit(time.perf_counter() - t0)
+
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queued": self._queued,
+            "queued_sessions": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "estimated_wait_ms": self.estimated_wait_s() * 1000.0,
+            "queue_wait_ms": {
+                "mean": (self.wait_total_s / self.wait_count * 1000.0) if self.wait_count else 0.0,
+                "max": self.wait_max_s * 1000.0,
+            },
+            "generation_ms": {
+                "mean": (self.gen_total_s / self.gen_count * 1000.0) if self.gen_count else 0.0,
+            },
+        }
+
+    def _admit(self, waited_s: float) -> ChatSlot:
+        self.admitted += 1
+        self.wait_count += 1
+        self.wait_total_s += waited_s
+        self.wait_max_s = max(self.wait_max_s, waited_s)
+        return ChatSlot(self, waited_s)
+
+    def _release(self, gen_s: Optional[float]) -> None:
+        if gen_s is not None:
+            self.gen_count += 1
+            self.gen_total_s += gen_s
+            self._gen_s = gen_s if self._gen_s is None else 0.8 * self._gen_s + 0.2 * gen_s
+
+        # Hand the slot to the next session in turn
+        while self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            fut = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.running -= 1
+
+    def _forget(self, session_id: str, fut: asyncio.Future) -> None:
+        queue = self._queues.get(session_id)
+        if queue is None or fut not in queue:
+            return
+        queue.remove(fut)
+        self._queued -= 1
+        if not queue:
+            del self._queues[session_id]
+
+
+def build_chat_admission(settings: Settings) -> ChatAdmission | None:
+    if settings.chat_max_concurrent <= 0:
+        return None
+
+    return ChatAdmission(
+        max_concurrent=settings.chat_max_concurrent,
+        max_queue=settings.chat_max_queue,
+        max_wait_s=settings.chat_max_queue_wait_s,
+    )
+
+
+def retry_after_header(e: ChatOverloaded) -> dict[str, str]:
+    return {"Retry-After": str(math.ceil(e.retry_after_s))}
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import io
+import logging
+import struct
+import wave
+
+import numpy as np
+
+try:
+    import soundfile as sf  # type: ignore
+
+    soundfile_available = True
+except (ImportError, OSError):  # OSError: libsndfile missing
+    soundfile_available = False
+
+logger = logging.getLogger(__name__)
+
+# OpenAI response_format -> media type
+MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+    "flac": "audio/flac",
+    "opus": "audio/ogg",
+    "mp3": "audio/mpeg",
+}
+
+# Compressed formats go through libsndfile: (container, subtype)
+_SOUNDFILE_FORMATS = {
+    "flac": ("FLAC", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    arr = np.asarray(audio)
+    if arr.ndim > 1:
+        arr = arr.reshape(-1)
+
+    # Convert to int16 PCM
+    if arr.dtype != np.int16:
+        arr = np.clip(arr, -1.0, 1.0)
+        arr = (arr * 32767.0).astype(np.int16)
+    return arr
+
+
+def wav_bytes_from_int16(pcm: np.ndarray, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)  # int16
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def wav_stream_header(sample_rate: int) -> bytes:
+    # RIFF/data sizes are unknown up front; 0xFFFFFFFF is the conventional
+    # "streaming" value accepted by browsers and ffmpeg.
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        0xFFFFFFFF,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        1,  # mono
+        sample_rate,
+        sample_rate * 2,
+        2,
+        16,
+        b"data",
+        0xFFFFFFFF,
+    )
+
+
+def format_available(fmt: str) -> bool:
+    """
+    wav/pcm are always available; the rest depend on the local libsndfile.
+    """
+    if fmt in ("wav", "pcm"):
+        return True
+    if fmt not in _SOUNDFILE_FORMATS or not soundfile_available:
+        return False
+    container, subtype = _SOUNDFILE_FORMATS[fmt]
+    return subtype in sf.available_subtypes(container)
+
+
+def encode_audio(pcm: np.ndarray, sample_rate: int, fmt: str) -> bytes:
+    """
+    Encode a complete int16 clip. CPU-bound for compressed formats, so call
+    it off the event loop.
+    """
+    if fmt == "wav":
+        return wav_bytes_from_int16(pcm, sample_rate)
+    if fmt == "pcm":
+        return pcm.tobytes()
+
+    if not format_available(fmt):
+        raise ValueError(f"Audio format '{fmt}' is not available")
+    container, subtype = _SOUNDFILE_FORMATS[fmt]
+    buf = io.BytesIO()
+    sf.write(buf, pcm, sample_rate, format=container, subtype=subtype)
+    return buf.getvalue()
+
+
+class _TailBuffer(io.BytesIO):
+    """
+    Seekable sink for libsndfile that hands out bytes as they are written.
+    Late seeks into already-sent bytes (header fix-ups) are not re-sent,
+    which the streamable formats here tolerate.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._sent = 0
+
+    def drain(self) -> bytes:
+        data = self.getvalue()[self._sent :]
+        self._sent += len(data)
+        return data
+
+
+class StreamEncoder:
+    """
+    Incremental encoder: header() once, feed() per segment, finish() at end.
+    Each call returns the bytes that are ready to send.
+    """
+
+    def __init__(self, fmt: str, sample_rate: int):
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self._buf: _TailBuffer | None = None
+        self._sf = None
+
+        if fmt in _SOUNDFILE_FORMATS:
+            if not format_available(fmt):
+                raise ValueError(f"Audio format '{fmt}' is not available")
+            container, subtype = _SOUNDFILE_FORMATS[fmt]
+            self._buf = _TailBuffer()
+            self._sf = sf.SoundFile(
+                self._buf,
+                mode="w",
+                samplerate=sample_rate,
+                channels=1,
+                format=container,
+                subtype=subtype,
+            )
+
+    def header(self) -> bytes:
+        if self.fmt == "wav":
+            return wav_stream_header(self.sample_rate)
+        return b""
+
+    def feed(self, pcm: np.ndarray) -> bytes:
+        if self._sf is None or self._buf is None:
+            return pcm.tobytes()
+        self._sf.write(pcm)
+        return self._buf.drain()
+
+    def finish(self) -> bytes:
+        if self._sf is None or self._buf is None:
+            return b""
+        self._sf.close()
+        return self._buf.drain()
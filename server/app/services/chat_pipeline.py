@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional, Protocol, TypedDict
+
+from pydantic_ai import Agent
+
+from langgraph.graph import StateGraph, START, END
+from langgraph.config import get_stream_writer
+
+from app.core.settings import Settings
+from app.services.llm_router import LlmBackend, LlmRouter
+from app.services.memory_outbox import MemoryWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationRun:
+    """
+    What a generation reports besides its deltas, filled in as it runs.
+    """
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    failed: bool = False
+
+
+class ChatPipeline(Protocol):
+    """
+    The generate -> persist part of a turn (retrieve and assemble happen
+    in ChatRuntime.prepare). Yields text deltas.
+    """
+
+    name: str
+
+    def run(
+        self,
+        prompt: str,
+        user_query: str,
+        session_id: str,
+        sampling: dict[str, Any],
+        run: GenerationRun,
+    ) -> AsyncIterator[str]: ...
+
+
+class LlmStage:
+    """
+    Streams one reply from the agent on a routed backend. A backend that
+    fails before sending anything is swapped for another.
+    """
+
+    def __init__(self, agent: Agent, router: LlmRouter):
+        self.agent = agent
+        self.router = router
+
+    async def generate(
+        self,
+        prompt: str,
+        session_id: str,
+        sampling: dict[str, Any],
+        run: GenerationRun,
+    ) -> AsyncIterator[str]:
+        router = self.router
+        model_settings = sampling or None
+        response_acc = ""
+        tried: tuple[LlmBackend, ...] = ()
+
+        while True:
+            backend = router.pick(session_id, exclude=tried)
+            try:
+                with router.track(backend) as call:
+                    async with self.agent.run_stream(
+                        prompt, model=backend.model, model_settings=model_settings
+                    ) as result:
+                        # Prefer delta streaming if available. No debounce:
+                        # SSE framing does its own coalescing.
+                        try:
+                            async for delta in result.stream_text(delta=True, debounce_by=None):
+                                if not delta:
+                                    continue
+                                call.first_token()
+                                response_acc += delta
+                                yield delta
+                        except TypeError:
+                            # Fallback: stream full text and compute deltas
+                            async for full in result.stream_text(debounce_by=None):
+                                if not isinstance(full, str):
+                                    continue
+                                delta = full[len(response_acc) :]
+                                if delta:
+                                    call.first_token()
+                                    response_acc = full
+                                    yield delta
+
+                        # Reported by the upstream in its final stream chunk
+                        usage = result.usage()
+                        run.prompt_tokens = usage.input_tokens
+                        run.completion_tokens = usage.output_tokens
+                return
+            except Exception as e:
+                tried += (backend,)
+                # Nothing sent yet: another backend can still answer
+                if not response_acc and len(tried) < len(router.backends):
+                    logger.warning(f"LLM backend {backend.name} failed, trying another: {e}")
+                    continue
+                logger.error(f"Agent run failed: {e}")
+                run.failed = True
+                yield f"[Error generating response: {e}]"
+                return
+
+
+class DirectPipeline:
+    """
+    Linear generate -> persist with nothing in between: deltas go straight
+    from the agent stream to the caller.
+    """
+
+    name = "direct"
+
+    def __init__(self, llm: LlmStage, memory_writer: MemoryWriter):
+        self.llm = llm
+        self.memory_writer = memory_writer
+
+    async def run(
+        self,
+        prompt: str,
+        user_query: str,
+        session_id: str,
+        sampling: dict[str, Any],
+        run: GenerationRun,
+    ) -> AsyncIterator[str]:
+        parts: list[str] = []
+        async for delta in self.llm.generate(prompt, session_id, sampling, run):
+            parts.append(delta)
+            yield delta
+
+        # Error text replaces a partial reply, as it is what the user saw last
+        response = parts[-1] if run.failed else "".join(parts)
+        # History is written now, the memory episode in the background
+        await self.memory_writer.enqueue(session_id, user_query, response)
+
+
+class ChatState(TypedDict):
+    prompt: str
+    user_query: str
+    response: str
+    session_id: str
+    sampling: dict[str, Any]
+    failed: bool
+
+
+class LangGraphPipeline:
+    """
+    The same stages as LangGraph nodes, for flows that need branching or
+    more nodes. Deltas travel as custom stream chunks.
+    """
+
+    name = "langgraph"
+
+    def __init__(self, llm: LlmStage, memory_writer: MemoryWriter):
+        self.llm = llm
+        self.memory_writer = memory_writer
+        self.graph = self._build()
+
+    async def run(
+        self,
+        prompt: str,
+        user_query: str,
+        session_id: str,
+        sampling: dict[str, Any],
+        run: GenerationRun,
+    ) -> AsyncIterator[str]:
+        async for chunk in self.graph.astream(
+            {
+                "prompt": prompt,
+                "response": "",
+                "user_query": user_query,
+                "session_id": session_id,
+                "sampling": sampling,
+                "failed": False,
+            },
+            stream_mode="custom",
+        ):
+            if not isinstance(chunk, dict):
+                continue
+            kind = chunk.get("type")
+            if kind == "token":
+                delta = chunk.get("delta") or ""
+                if delta:
+                    yield delta
+            elif kind == "usage":
+                run.prompt_tokens = chunk.get("prompt_tokens") or 0
+                run.completion_tokens = chunk.get("completion_tokens") or 0
+            elif kind == "error":
+                run.failed = True
+
+    def _build(self) -> Any:
+        llm = self.llm
+        memory_writer = self.memory_writer
+
+        async def respond_node(state: ChatState) -> ChatState:
+            # Note: 'state' is typed dict, but LangGraph passes it as dict at runtime
+            writer = get_stream_writer()
+
+            session_id = state.get("session_id", "default")
+            result = GenerationRun()
+            response_acc = ""
+            async for delta in llm.generate(
+                state.get("prompt", ""), session_id, state.get("sampling") or {}, result
+            ):
+                writer({"type": "token", "delta": delta})
+                response_acc = delta if result.failed else response_acc + delta
+
+            writer(
+                {
+                    "type": "usage",
+                    "prompt_tokens": result.prompt_tokens,
+                    "completion_tokens": result.completion_tokens,
+                }
+            )
+            if result.failed:
+                writer({"type": "error"})
+
+            return {**state, "response": response_acc, "failed": result.failed}
+
+        async def persist_node(state: ChatState) -> ChatState:
+            # History is written now, the memory episode in the background
+            await memory_writer.enqueue(
+                state.get("session_id", "default"),
+                state.get("user_query", ""),
+                state.get("response", ""),
+            )
+            return state
+
+        # Graph def
+        workflow = StateGraph(ChatState)
+        workflow.add_node("respond", respond_node)
+        workflow.add_node("persist", persist_node)
+        workflow.add_edge(START, "respond")
+        workflow.add_edge("respond", "persist")
+        workflow.add_edge("persist", END)
+
+        return workflow.compile()
+
+
+def build_chat_pipeline(
+    settings: Settings, llm: LlmStage, memory_writer: MemoryWriter
+) -> ChatPipeline:
+    if settings.chat_pipeline == "langgraph":
+        return LangGraphPipeline(llm, memory_writer)
+    return DirectPipeline(llm, memory_writer)
@@ -1,40 +1,78 @@
 from __future__ import annotations
 
-import asyncio
-from dataclasses import dataclass
-from datetime import datetime, timezone
-import hashlib
+from dataclasses import dataclass, field, replace
 import logging
-from typing import Any, AsyncIterator, TypedDict, List
+import time
+from typing import Any, AsyncIterator, Optional, List
 
 from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
 
-from langgraph.graph import StateGraph, START, END
-from langgraph.config import get_stream_writer
-
-from app.services.history import SQLiteChatHistory
+from app.services.admission import ChatAdmission, ChatSlot, build_chat_admission
+from app.services.completion_cache import (
+    CompletionCache,
+    build_completion_cache,
+    make_completion_key,
+)
+from app.services.history import SessionContext, SQLiteChatHistory
+from app.services.inflight import Generation, InflightGenerations
+from app.services.chat_sse import StreamStats
+from app.services.chat_pipeline import (
+    ChatPipeline,
+    GenerationRun,
+    LlmStage,
+    build_chat_pipeline,
+)
+from app.services.llm_router import LlmRouter, build_llm_router
+from app.services.memory_cache import MemorySearchCache, build_memory_cache
+from app.services.memory_outbox import MemoryWriter, build_memory_writer
+from app.services.prompt_budget import (
+    CharEstimator,
+    PromptStats,
+    TokenCounter,
+    build_token_counter,
+    pack_recent,
+)
+from app.services.retrieval import ContextRetriever
+from app.services.session_summary import SessionSummarizer, build_session_summarizer
+from app.services.tts_presynth import TtsPresynthesizer
+from app.services.usage import RequestRecord, TurnUsage, UsageStore, build_usage_store
 
 try:
     from graphiti_core import Graphiti
-    from graphiti_core.nodes import EpisodeType  # type: ignore
 
     graphiti_available = True
 except ImportError:
     graphiti_available = False
 
 from app.core.settings import Settings
-from app.schemas.openai_chat import ChatMessage
+from app.schemas.openai_chat import ChatMessage, ChatTtsOptions
 
 logger = logging.getLogger(__name__)
 
 
-class ChatState(TypedDict):
-    prompt: str
-    user_query: str
-    response: str
+@dataclass
+class ChatTurn:
+    """
+    A request with its prompt fully assembled, before generation starts.
+    `cached` holds the reply's deltas when the completion cache has it,
+    and `usage` then starts as the original generation's, marked cached.
+    """
+
     session_id: str
+    user_query: str
+    prompt: str
+    sampling: dict[str, Any]
+    prompt_key: str = ""
+    cache_key: Optional[str] = None
+    cached: Optional[tuple[str, ...]] = None
+    model: str = ""
+    # Set by ChatRuntime.start
+    generation: Optional[Generation] = None
+    owner: bool = False
+    # Filled in as the turn runs; timings in ms
+    timings: dict[str, float] = field(default_factory=dict)
+    usage: TurnUsage = field(default_factory=TurnUsage)
+    complete: bool = False
 
 
 def _messages_to_transcript(messages: List[ChatMessage]) -> str:
@@ -48,68 +86,53 @@ def _messages_to_transcript(messages: List[ChatMessage]) -> str:
     return "\n".join(parts).strip()
 
 
-def generate_turn_id(content_a: str, content_b: str) -> str:
-    """
-    Generate a deterministic ID based on content.
-    """
-    raw = (content_a[:50] + content_b[:50]).encode("utf-8")
-    return hashlib.sha256(raw).hexdigest()[:16]
-
-
-async def _save_memory_background(
-    client: Graphiti | None,
-    history: SQLiteChatHistory,
-    session_id: str,
-    user_content: str,
-    assistant_content: str,
-):
-    """
-    1. Save immediate chat history to SQLite
-    2. Save episode to Graphiti if available.
-    """
-
-    try:
-        # 1. Save to SQLite
-        if session_id:
-            await history.add_message(session_id, "user", user_content)
-            await history.add_message(session_id, "assistant", assistant_content)
-    except Exception as e:
-        logger.error(f"Failed ot save SQLite history: {e}")
-    # 2. Save to Graphiti
-    if client and graphiti_available:
-        try:
-            # Deterministic ID prevents duplicates of restart
-
-            turn_id = generate_turn_id(user_content, assistant_content)
-            episode_name = f"turn_{turn_id}"
-
-            body = f"User: {user_content}\nAssistant: {assistant_content}"
-
-            await client.add_episode(
-                name=episode_name,
-                episode_body=body,
-                source=EpisodeType.message,  # type: ignore
-                source_description="User chat interaction",
-                reference_time=datetime.now(timezone.utc),
-            )
-            logger.debug(f"Saved episode {episode_name} to Graphiti memory.")
-        except Exception as e:
-            logger.warning(f"Failed to save memory episode: {e}")
-
-
 @dataclass
 class ChatRuntime:
     agent: Agent
-    graph: Any
+    pipeline: ChatPipeline
     memory: Graphiti | None
     history: SQLiteChatHistory
+    writer: MemoryWriter
+    router: LlmRouter
+    retriever: ContextRetriever = field(default_factory=lambda: ContextRetriever(0.15))
+    memory_cache: Optional[MemorySearchCache] = None
+    counter: TokenCounter = field(default_factory=CharEstimator)
+    summarizer: Optional[SessionSummarizer] = None
+    prompt_budget_tokens: int = 3072
+    history_fetch_limit: int = 64
+    prompt_stats: PromptStats = field(default_factory=PromptStats)
+    completion_cache: Optional[CompletionCache] = None
+    inflight: InflightGenerations = field(default_factory=InflightGenerations)
+    admission: Optional[ChatAdmission] = None
+    usage_store: UsageStore = field(default_factory=lambda: UsageStore(1000))
+    stream_coalesce_s: float = 0.0
+    stream_coalesce_chars: int = 256
+    stream_stats: StreamStats = field(default_factory=StreamStats)
+    presynth: Optional[TtsPresynthesizer] = None
 
     async def stream_deltas(
         self,
         messages: List[ChatMessage],
         session_id: str,
         disconnect_check: Any = None,
+        tts: Optional[ChatTtsOptions] = None,
+        model: str = "",
+        sampling: Optional[dict[str, Any]] = None,
     ) -> AsyncIterator[str]:
+        turn = await self.prepare(messages, session_id, model, sampling)
+        await self.start(turn)
+        async for delta in self.stream(turn, disconnect_check, tts):
+            yield delta
+
+    async def prepare(
+        self,
+        messages: List[ChatMessage],
+        session_id: str,
+        model: str = "",
+        sampling: Optional[dict[str, Any]] = None,
+    ) -> ChatTurn:
+        sampling = sampling or {}
+
         # 1. Extract latest user query
         user_query = ""
         for m in reversed(messages):
@@ -117,57 +140,268 @@ class ChatRuntime:
                 user_query = (m.content or "").strip()
                 break
 
-        # 2. Fetch Chat History (SQLite)
-        short_term_msgs = await self.history.get_recent_messages(session_id, limit=6)
-        short_term_str = _messages_to_transcript(short_term_msgs)
+        # 2 + 3. Fetch Chat History (SQLite) and Long-Term Memory (Graphiti)
+        # concurrently, under the retrieval deadline
+        t0 = time.perf_counter()
+        lookups: dict[str, Any] = {
+            "history": self.history.get_context(session_id, self.history_fetch_limit),
+        }
+        # Cached facts need no lookup, so they are never skipped or late
+        facts: Optional[list[str]] = None
+        if self.memory and user_query:
+            if self.memory_cache:
+                facts = self.memory_cache.get(user_query)
+            if facts is None:
+                lookups["memory"] = self._search_facts(user_query)
+        context = await self.retriever.gather(lookups, session_id)
+        t1 = time.perf_counter()
 
-        # 3. Fetch Long-Term Memory (Graphiti)
         long_term_context = ""
-        if self.memory and user_query:
-            try:
-                results = await self.memory.search(user_query)
-                if results:
-                    facts = [r.fact for r in results if getattr(r, "fact", None)]
-                    if facts:
-                        long_term_context = (
-                            "RELEVANT LONG-TERM MEMORY (Facts):\n- "
-                            + "\n- ".join(facts)
-                            + "\n\n"
-                        )
-            except Exception as e:
-                logger.error(f"Error retrieving memory: {e}")
+        if facts is None:
+            facts = context.get("memory")
+        if facts:
+            long_term_context = (
+                "RELEVANT LONG-TERM MEMORY (Facts):\n- " + "\n- ".join(facts) + "\n\n"
+            )
 
         # 4. Construct Full Prompt
-        # Structure: Facts -> Recent History -> Current Input
+        # Structure: Facts -> Summary -> Recent History -> Current Input
         current_transcript = _messages_to_transcript(messages)
+        session: Optional[SessionContext] = context.get("history")
+
+        summary_context = ""
+        if session and session.summary:
+            summary_context = f"CONVERSATION SUMMARY (earlier turns):\n{session.summary}\n\n"
+
+        fixed = (
+            f"{long_term_context}{summary_context}"
+            f"PREVIOUS CONVERSATION HISTORY:\n"
+            f"CURRENT INTERACTION:\n{current_transcript}"
+        )
+        fixed_tokens = self.counter.count(fixed)
+
+        # As much recent history as the budget leaves room for
+        recent = session.recent if session else []
+        kept, history_tokens = pack_recent(
+            self.counter,
+            [m for _, m in recent],
+            max(0, self.prompt_budget_tokens - fixed_tokens),
+        )
+        left_out = recent[: len(recent) - kept]
+        if left_out and self.summarizer:
+            self.summarizer.schedule(session_id, left_out[-1][0])
+        self.prompt_stats.add(fixed_tokens + history_tokens, kept, len(left_out))
+
+        short_term_str = _messages_to_transcript([m for _, m in recent[len(left_out) :]])
 
         full_prompt = (
-            f"{long_term_context}"
+            f"{long_term_context}{summary_context}"
             f"PREVIOUS CONVERSATION HISTORY:\n{short_term_str}"
             f"CURRENT INTERACTION:\n{current_transcript}"
         )
 
-        # 5. Execute LangGraph / PydanticAI Stream
-        async for chunk in self.graph.astream(
-            {
-                "prompt": full_prompt,
-                "response": "",
-                "user_query": user_query,
-                "session_id": session_id,
-            },
-            stream_mode="custom",
-        ):
-            if disconnect_check is not None:
-                try:
-                    if await disconnect_check.is_disconnected():
-                        break
-                except Exception:
-                    pass
-
-            if isinstance(chunk, dict) and chunk.get("type") == "token":
-                delta = chunk.get("delta") or ""
-                if delta:
+        turn = ChatTurn(
+            session_id=session_id,
+            user_query=user_query,
+            prompt=full_prompt,
+            sampling=sampling,
+            prompt_key=make_completion_key(model, full_prompt, sampling),
+            model=model,
+        )
+        turn.timings["retrieval"] = (t1 - t0) * 1000.0
+        turn.timings["prompt"] = (time.perf_counter() - t1) * 1000.0
+        cache = self.completion_cache
+        if cache and cache.cacheable(sampling):
+            turn.cache_key = turn.prompt_key
+            hit = cache.get(turn.cache_key)
+            if hit is not None:
+                turn.cached = hit.deltas
+                turn.usage = replace(hit.usage, cached=True)
+        return turn
+
+    async def start(self, turn: ChatTurn) -> None:
+        """
+        Admit the turn and start (or join) its generation. Raises
+        ChatOverloaded when the LLM queue is too long to wait in.
+        """
+        if turn.cached is not None or turn.generation is not None:
+            return
+
+        # Identical request already generating (client retry, second tab):
+        # follow that stream instead of starting another
+        key = (turn.session_id, turn.prompt_key)
+        slot: Optional[ChatSlot] = None
+        if self.admission and self.inflight.get(key) is None:
+            slot = await self.admission.acquire(turn.session_id)
+            turn.timings["queue"] = slot.waited_s * 1000.0
+
+        turn.generation, turn.owner = self.inflight.join(
+            key, lambda gen: self._generate(turn, gen)
+        )
+        if slot:
+            if turn.owner:
+                # Also covers a generation cancelled before it started
+                turn.generation.task.add_done_callback(lambda _: slot.release())
+            else:
+                slot.release()
+
+    async def stream(
+        self,
+        turn: ChatTurn,
+        disconnect_check: Any = None,
+        tts: Optional[ChatTtsOptions] = None,
+    ) -> AsyncIterator[str]:
+        # Voice-enabled clients: start synthesizing sentences before the
+        # client gets to ask for them
+        speculator = (
+            self.presynth.speculator(tts.voice, tts.speed)
+            if self.presynth and tts
+            else None
+        )
+
+        if turn.cached is not None:
+            # Same chunks as the original generation; the turn is still
+            # part of the conversation
+            try:
+                for delta in turn.cached:
+                    if speculator:
+                        speculator.feed(delta)
                     yield delta
+                if speculator:
+                    speculator.finish()
+            finally:
+                if speculator:
+                    speculator.close()
+            await self.writer.enqueue(turn.session_id, turn.user_query, "".join(turn.cached))
+            turn.complete = True
+            self._record(turn, "cache")
+            return
+
+        await self.start(turn)
+        if not turn.owner and speculator:
+            # The owning request speculates for this reply
+            speculator.close()
+            speculator = None
+
+        gen: Generation = turn.generation  # type: ignore[assignment]
+        try:
+            async for delta in gen.subscribe():
+                if disconnect_check is not None:
+                    try:
+                        if await disconnect_check.is_disconnected():
+                            break
+                    except Exception:
+                        pass
+
+                if speculator:
+                    speculator.feed(delta)
+                yield delta
+
+            if speculator:
+                speculator.finish()
+        finally:
+            if speculator:
+                speculator.close()
+            meta = gen.meta
+            turn.usage = TurnUsage(
+                prompt_tokens=meta.get("prompt_tokens", 0),
+                completion_tokens=meta.get("completion_tokens", 0),
+            )
+            for name in ("ttft", "generation", "tokens_per_second"):
+                if name in meta:
+                    turn.timings[name] = meta[name]
+            turn.complete = bool(meta.get("complete"))
+            self._record(turn, "llm" if turn.owner else "coalesced")
+
+    def _record(self, turn: ChatTurn, source: str) -> None:
+        self.usage_store.record(
+            RequestRecord(
+                at=time.time(),
+                session_id=turn.session_id,
+                model=turn.model,
+                source=source,
+                complete=turn.complete,
+                prompt_tokens=turn.usage.prompt_tokens,
+                completion_tokens=turn.usage.completion_tokens,
+                timings=dict(turn.timings),
+            )
+        )
+
+    async def _generate(self, turn: ChatTurn, gen: Generation) -> AsyncIterator[str]:
+        # 5. Generate -> persist (direct or LangGraph pipeline)
+        deltas: list[str] = []
+        run = GenerationRun()
+        meta = gen.meta
+        started = time.perf_counter()
+        first_token: Optional[float] = None
+        async for delta in self.pipeline.run(
+            turn.prompt, turn.user_query, turn.session_id, turn.sampling, run
+        ):
+            if first_token is None:
+                first_token = time.perf_counter()
+                meta["ttft"] = (first_token - started) * 1000.0
+            deltas.append(delta)
+            yield delta
+        complete = not run.failed
+        meta["prompt_tokens"] = run.prompt_tokens
+        meta["completion_tokens"] = run.completion_tokens
+
+        finished = time.perf_counter()
+        meta["generation"] = (finished - started) * 1000.0
+        # Decode rate: tokens after the first over the time they took
+        tokens = meta.get("completion_tokens", 0)
+        if first_token is not None and tokens > 1 and finished > first_token:
+            meta["tokens_per_second"] = (tokens - 1) / (finished - first_token)
+        meta["complete"] = complete
+
+        if complete and turn.cache_key and self.completion_cache:
+            self.completion_cache.put(
+                turn.cache_key,
+                tuple(deltas),
+                TurnUsage(prompt_tokens=run.prompt_tokens, completion_tokens=run.completion_tokens),
+            )
+
+    async def _search_facts(self, user_query: str) -> list[str]:
+        # Cache misses only; prepare() has already checked the cache
+        cache = self.memory_cache
+        if cache:
+            generation = cache.generation
+
+        results = await self.memory.search(user_query)  # type: ignore[union-attr]
+        facts = [r.fact for r in results or [] if getattr(r, "fact", None)]
+        if cache:
+            cache.put(user_query, facts, generation)
+        return facts
+
+    def stats(self) -> dict:
+        return {
+            "retrieval": self.retriever.stats(),
+            "memory_cache": self.memory_cache.stats() if self.memory_cache else None,
+            "memory_writer": self.writer.stats(),
+            "prompt": {
+                "tokenizer": self.counter.name,
+                "budget_tokens": self.prompt_budget_tokens,
+                **self.prompt_stats.as_dict(),
+            },
+            "summaries": self.summarizer.stats() if self.summarizer else None,
+            "llm": self.router.stats(),
+            "inflight": self.inflight.stats(),
+            "admission": self.admission.stats() if self.admission else None,
+            "usage": self.usage_store.stats(),
+            "stream": {
+                "coalesce_ms": self.stream_coalesce_s * 1000.0,
+                **self.stream_stats.stats(),
+            },
+            "completion_cache": (
+                self.completion_cache.stats() if self.completion_cache else None
+            ),
+        }
+
+    async def close(self, drain_timeout_s: float) -> None:
+        if self.summarizer:
+            await self.summarizer.close()
+        await self.writer.drain(drain_timeout_s)
+        await self.router.close()
 
 
 async def build_chat_runtime(
@@ -175,11 +409,19 @@ async def build_chat_runtime(
     memory_client: Graphiti | None,
     history_service: SQLiteChatHistory,
 ) -> ChatRuntime:
-    provider = OpenAIProvider(
-        base_url=settings.llm_base_url,
-        api_key=settings.llm_api_key,
+    router = build_llm_router(settings)
+    # Runs pick their backend per call; this one is the agent's default
+    model = router.default.model
+    memory_cache = build_memory_cache(settings) if memory_client else None
+    memory_writer = await build_memory_writer(
+        settings, history_service, memory_client, memory_cache
+    )
+    counter = build_token_counter(settings)
+    # Summaries share the chat turns' routing and admission
+    admission = build_chat_admission(settings)
+    summarizer = build_session_summarizer(
+        settings, router, admission, history_service, counter
     )
-    model = OpenAIChatModel(settings.llm_model, provider=provider)
 
     system_prompt_text = settings.system_prompt
     system_prompt_text += (
@@ -194,65 +436,25 @@ async def build_chat_runtime(
         instrument=settings.is_langfuse_enabled,  # <- <- Langfuse works via PydanticAI instrumentation (set up in main.py) + instrument=True here
     )
 
-    async def respond_node(state: ChatState) -> ChatState:
-        # Note: 'state' is typed dict, but LangGraph passes it as dict at runtime
-        writer = get_stream_writer()
-
-        prompt = state.get("prompt", "")
-        user_query = state.get("user_query", "")
-        session_id = state.get("session_id", "default")
-
-        response_acc = ""
-
-        try:
-            async with agent.run_stream(prompt) as result:
-                # Prefer delta streaming if available
-                try:
-                    async for delta in result.stream_text(delta=True):
-                        if not delta:
-                            continue
-                        writer({"type": "token", "delta": delta})
-                        response_acc += delta
-                except TypeError:
-                    # Fallback: stream full text and compute deltas
-                    async for full in result.stream_text():
-                        if not isinstance(full, str):
-                            continue
-                        delta = full[len(response_acc) :]
-                        if delta:
-                            writer({"type": "token", "delta": delta})
-                            response_acc = full
-        except Exception as e:
-            logger.error(f"Agent run failed: {e}")
-            response_acc = f"[Error generating response: {e}]"
-            writer({"type": "token", "delta": response_acc})
-
-        # lunch BG save
-        # Save to SQLite (history) and Graphiti (memory)
-        asyncio.create_task(
-            _save_memory_background(
-                memory_client, history_service, session_id, user_query, response_acc
-            )
-        )
-
-        return {
-            "prompt": prompt,
-            "response": response_acc,
-            "user_query": user_query,
-            "session_id": session_id,
-        }
-
-    # Graph def
-    workflow = StateGraph(ChatState)
-    workflow.add_node("respond", respond_node)
-    workflow.add_edge(START, "respond")
-    workflow.add_edge("respond", END)
-
-    graph = workflow.compile()
+    pipeline = build_chat_pipeline(settings, LlmStage(agent, router), memory_writer)
 
     return ChatRuntime(
         agent=agent,
-        graph=graph,
+        pipeline=pipeline,
         memory=memory_client,
         history=history_service,
+        writer=memory_writer,
+        router=router,
+        retriever=ContextRetriever(settings.context_deadline_ms / 1000.0),
+        memory_cache=memory_cache,
+        counter=counter,
+        summarizer=summarizer,
+        prompt_budget_tokens=settings.prompt_budget_tokens,
+        history_fetch_limit=settings.prompt_history_fetch_limit,
+        completion_cache=build_completion_cache(settings),
+        inflight=InflightGenerations(settings.chat_coalesce),
+        admission=admission,
+        usage_store=build_usage_store(settings),
+        stream_coalesce_s=settings.chat_stream_coalesce_ms / 1000.0,
+        stream_coalesce_chars=settings.chat_stream_coalesce_chars,
     )
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional
+
+try:
+    import orjson  # type: ignore
+
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+# Stands in for the delta while the chunk envelope is rendered
+_DELTA_MARKER = "\u0000delta\u0000"
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_str(text: str) -> bytes:
+    try:
+        return orjson.dumps(text) if orjson_available else _dumps(text)
+    except (TypeError, UnicodeEncodeError):
+        # Lone surrogates: keep them as \u escapes
+        return json.dumps(text).encode("ascii")
+
+
+def sse_event(obj: Any) -> bytes:
+    return b"data: " + _dumps(obj) + b"\n\n"
+
+
+class ChatChunkEncoder:
+    """
+    SSE frames for one streamed chat completion. The chunk envelope is
+    rendered once per response; each content frame only encodes the delta
+    string and splices it in, instead of serializing the whole dict.
+    """
+
+    def __init__(self, resp_id: str, created: int, model: str):
+        self.envelope = {
+            "id": resp_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+        }
+        rendered = sse_event(self._chunk({"content": _DELTA_MARKER}, None))
+        self._prefix, self._suffix = rendered.split(_dumps(_DELTA_MARKER))
+
+    def role(self) -> bytes:
+        return sse_event(self._chunk({"role": "assistant"}, None))
+
+    def content(self, delta: str) -> bytes:
+        return self._prefix + _dumps_str(delta) + self._suffix
+
+    def stop(self) -> bytes:
+        return sse_event(self._chunk({}, "stop"))
+
+    def usage(self, usage: dict, timings: dict[str, float]) -> bytes:
+        return sse_event({**self.envelope, "choices": [], "usage": usage, "timings": timings})
+
+    @staticmethod
+    def done() -> bytes:
+        return b"data: [DONE]\n\n"
+
+    def _chunk(self, delta: dict, finish_reason: Optional[str]) -> dict:
+        return {
+            **self.envelope,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+
+class StreamStats:
+    """
+    Content frames sent, and deltas merged into a frame with others.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.merged = 0
+
+    def stats(self) -> dict:
+        deltas = self.frames + self.merged
+        return {
+            "frames": self.frames,
+            "deltas": deltas,
+            "deltas_per_frame": (deltas / self.frames) if self.frames else 0.0,
+        }
+
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str],
+    window_s: float,
+    max_chars: int,
+    stats: Optional[StreamStats] = None,
+) -> AsyncIterator[str]:
+    """
+    Merges deltas arriving within `window_s` of the oldest one not yet
+    sent, until `max_chars` are held. The first delta goes out at once so
+    time to first token is unchanged. The source is read by a separate
+    task, so a slow reader gets everything produced meanwhile as one delta.
+    """
+    loop = asyncio.get_running_loop()
+    pending: list[str] = []
+    size = 0
+    oldest_at = 0.0
+    finished = False
+    error: Optional[BaseException] = None
+    wake: Optional[asyncio.Future] = None
+
+    def notify() -> None:
+        if wake is not None and not wake.done():
+            wake.set_result(None)
+
+    async def pump() -> None:
+        nonlocal size, oldest_at, finished, error
+        try:
+            async for delta in deltas:
+                if not pending:
+                    oldest_at = loop.time()
+                pending.append(delta)
+                size += len(delta)
+                if len(pending) == 1 or size >= max_chars:
+                    notify()
+        except Exception as e:
+            error = e
+        finally:
+            finished = True
+            notify()
+
+    reader = asyncio.create_task(pump())
+    first = True
+    try:
+        while True:
+            if not pending and not finished:
+                wake = loop.create_future()
+                await wake
+            if pending and not first and not finished and size < max_chars:
+                # Hold until the window closes, max_chars or the end
+                wake = loop.create_future()
+                timer = loop.call_at(oldest_at + window_s, notify)
+                try:
+                    await wake
+                finally:
+                    timer.cancel()
+
+            if pending:
+                first = False
+                if stats is not None:
+                    stats.merged += len(pending) - 1
+                out = "".join(pending)
+                pending.clear()
+                size = 0
+                yield out
+            elif finished:
+                break
+
+        if error is not None:
+            raise error
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
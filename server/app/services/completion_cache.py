@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.core.settings import Settings
+from app.services.usage import TurnUsage
+
+
+def make_completion_key(model: str, prompt: str, sampling: dict[str, Any]) -> str:
+    """
+    Content address for a generation: the fully assembled prompt plus
+    everything that changes what the model samples.
+    """
+    raw = json.dumps(
+        {"model": model, "prompt": prompt, "sampling": sampling},
+        sort_keys=True,
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedReply:
+    deltas: tuple[str, ...]
+    # Token usage of the generation that produced it
+    usage: TurnUsage
+
+
+class CompletionCache:
+    """
+    LRU + TTL cache of finished replies, stored as the delta sequence they
+    streamed as so a hit replays the same chunks, with the token usage
+    of the original generation. Bounded by entry count
+    and total characters. Only deterministic requests (temperature 0) are
+    worth caching; `cacheable` decides that.
+    """
+
+    def __init__(self, max_entries: int, max_chars: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl_s = ttl_s
+
+        self._entries: OrderedDict[str, tuple[float, CachedReply]] = OrderedDict()
+        self._chars = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cacheable(sampling: dict[str, Any]) -> bool:
+        return sampling.get("temperature") == 0
+
+    def get(self, key: str) -> Optional[CachedReply]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_s:
+            self._drop(key)
+            self.expired += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, deltas: tuple[str, ...], usage: TurnUsage) -> None:
+        size = sum(len(d) for d in deltas)
+        if size > self.max_chars:
+            return
+        if key in self._entries:
+            self._drop(key)
+
+        self._entries[key] = (time.monotonic(), CachedReply(deltas, usage))
+        self._chars += size
+        while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+            "chars": self._chars,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+    def _drop(self, key: str) -> None:
+        _, reply = self._entries.pop(key)
+        self._chars -= sum(len(d) for d in reply.deltas)
+
+
+def build_completion_cache(settings: Settings) -> CompletionCache | None:
+    if settings.chat_cache_max_entries <= 0:
+        return None
+
+    return CompletionCache(
+        max_entries=settings.chat_cache_max_entries,
+        max_chars=settings.chat_cache_max_chars,
+        ttl_s=settings.chat_cache_ttl_s,
+    )
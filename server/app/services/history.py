@@ -26,6 +26,15 @@ class StoredMessage:
     created_at: float
 
 
+@dataclass
+class SessionContext:
+    # Rolling summary of every message up to and including `summary_upto_id`
+    summary: str
+    summary_upto_id: int
+    # (id, message) newer than the summary, oldest first
+    recent: list[tuple[int, ChatMessage]]
+
+
 @dataclass
 class HistoryEntry:
     role: str
@@ -50,6 +59,14 @@ class SQLiteChatHistory:
             await db.execute(
                 "CREATE INDEX IF NOT EXISTS idx_session ON messages(session_id)"
             )
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS session_summaries (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    upto_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
             await db.commit()
 
     async def add_message(self, session_id: str, role: str, content: str):
@@ -149,6 +166,9 @@ class SQLiteChatHistory:
     async def delete_session(self, session_id: str):
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            await db.execute(
+                "DELETE FROM session_summaries WHERE session_id = ?", (session_id,)
+            )
             await db.commit()
 
     async def get_recent_messages(
@@ -168,6 +188,83 @@ class SQLiteChatHistory:
             # Reverse to return in chronological order (oldest -> newest)
             return [ChatMessage(role=r[0], content=r[1]) for r in reversed(rows)]  # pyright: ignore
 
+    async def get_context(self, session_id: str, limit: int) -> SessionContext:
+        """
+        The session's rolling summary plus up to `limit` newest messages it
+        does not cover yet.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT summary, upto_id FROM session_summaries WHERE session_id = ?",
+                (session_id,),
+            )
+            row = await cursor.fetchone()
+            summary, upto_id = (row[0], row[1]) if row else ("", 0)
+
+            cursor = await db.execute(
+                """
+                SELECT id, role, content FROM messages
+                WHERE session_id = ? AND id > ?
+                ORDER BY id DESC LIMIT ?
+                """,
+                (session_id, upto_id, limit),
+            )
+            rows = await cursor.fetchall()
+            recent = [
+                (r[0], ChatMessage(role=r[1], content=r[2]))  # pyright: ignore
+                for r in reversed(rows)
+            ]
+        return SessionContext(summary=summary, summary_upto_id=upto_id, recent=recent)
+
+    async def get_messages_between(
+        self, session_id: str, after_id: int, upto_id: int
+    ) -> list[tuple[int, ChatMessage]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """
+                SELECT id, role, content FROM messages
+                WHERE session_id = ? AND id > ? AND id <= ?
+                ORDER BY id ASC
+                """,
+                (session_id, after_id, upto_id),
+            )
+            rows = await cursor.fetchall()
+            return [(r[0], ChatMessage(role=r[1], content=r[2])) for r in rows]  # pyright: ignore
+
+    async def get_summary(self, session_id: str) -> tuple[str, int]:
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT summary, upto_id FROM session_summaries WHERE session_id = ?",
+                (session_id,),
+            )
+            row = await cursor.fetchone()
+            return (row[0], row[1]) if row else ("", 0)
+
+    async def set_summary(
+        self, session_id: str, summary: str, upto_id: int, prev_upto_id: int
+    ) -> bool:
+        """
+        Store a summary covering messages up to `upto_id`, only if the stored
+        one still ends at `prev_upto_id` (0 = none yet).
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            if prev_upto_id == 0:
+                cursor = await db.execute(
+                    "INSERT OR IGNORE INTO session_summaries (session_id, summary, upto_id) VALUES (?, ?, ?)",
+                    (session_id, summary, upto_id),
+                )
+            else:
+                cursor = await db.execute(
+                    """
+                    UPDATE session_summaries
+                    SET summary = ?, upto_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE session_id = ? AND upto_id = ?
+                    """,
+                    (summary, upto_id, session_id, prev_upto_id),
+                )
+            await db.commit()
+            return cursor.rowcount > 0
+
 
 # Singleton instance builder
 async def build_history_service() -> SQLiteChatHistory:
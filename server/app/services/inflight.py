@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Generation:
+    """
+    One running generation, fanned out to every request that asked for it.
+    Deltas are buffered so a subscriber that joins late first replays what
+    was already produced. The producer is cancelled once the last
+    subscriber leaves. `meta` is for the producer to report on the run
+    (usage, timings) to all subscribers.
+    """
+
+    def __init__(self, start: Callable[[Generation], AsyncIterator[str]]):
+        self.deltas: list[str] = []
+        self.done = False
+        self.subscribers = 0
+        self.meta: dict[str, Any] = {}
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._pump(start(self)))
+        # Runs even if the task is cancelled before its first step
+        self._task.add_done_callback(self._finished)
+
+    @property
+    def task(self) -> asyncio.Task:
+        return self._task
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        i = 0
+        try:
+            while True:
+                while i < len(self.deltas):
+                    yield self.deltas[i]
+                    i += 1
+                if self.done:
+                    return
+                changed = self._changed
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self._task.cancel()
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for delta in source:
+                self.deltas.append(delta)
+                self._notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Generation failed: {e}")
+
+    def _finished(self, _: asyncio.Task) -> None:
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class InflightGenerations:
+    """
+    Single-flight registry: requests with the same key (session + prompt
+    hash) while a generation is running subscribe to it instead of
+    starting another, so the model runs and the turn is persisted once.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._running: dict[Hashable, Generation] = {}
+
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def get(self, key: Hashable) -> Optional[Generation]:
+        return self._running.get(key) if self.enabled else None
+
+    def join(
+        self, key: Hashable, start: Callable[[Generation], AsyncIterator[str]]
+    ) -> tuple[Generation, bool]:
+        """
+        The running generation for `key`, or a new one from `start(gen)`.
+        The flag is True for the request that started it.
+        """
+        gen = self._running.get(key) if self.enabled else None
+        if gen is not None:
+            self.coalesced += 1
+            return gen, False
+
+        gen = Generation(start)
+        self.started += 1
+        if self.enabled:
+            self._running[key] = gen
+            gen.task.add_done_callback(lambda t: self._finished(key, gen, t))
+        return gen, True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "inflight": len(self._running),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
+
+    def _finished(self, key: Hashable, gen: Generation, task: asyncio.Task) -> None:
+        if self._running.get(key) is gen:
+            del self._running[key]
+        if task.cancelled():
+            self.cancelled += 1
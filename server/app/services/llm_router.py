@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import httpx
+
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from app.core.settings import LlmUpstream, Settings
+
+logger = logging.getLogger(__name__)
+
+# Sessions remembered for affinity
+MAX_AFFINITY_SESSIONS = 10_000
+
+
+@dataclass
+class LlmBackend:
+    name: str
+    url: str
+    weight: float
+    model: OpenAIChatModel
+    api_key: str
+
+    inflight: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+
+    requests: int = 0
+    errors: int = 0
+    ttft_s: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+    total_s: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def load(self) -> float:
+        return (self.inflight + 1) / self.weight
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ttft_ms": _percentiles(self.ttft_s),
+            "total_ms": _percentiles(self.total_s),
+        }
+
+
+def _percentiles(samples: deque[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0
+
+    return {"p50": at(0.5), "p95": at(0.95)}
+
+
+class LlmCall:
+    """
+    One stream on a backend; the caller marks the first token and any
+    failure, timing and in-flight accounting happen in `LlmRouter.track`.
+    """
+
+    def __init__(self, backend: LlmBackend):
+        self.backend = backend
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            self.backend.ttft_s.append(self.first_token_at - self.started)
+
+
+class LlmRouter:
+    """
+    Spreads chat streams over OpenAI-compatible upstreams serving the same
+    model:
+    - least in-flight streams relative to weight wins
+    - a session stays on the backend that served it (its KV cache still
+      holds the prompt prefix) unless that backend is unhealthy or more
+      than `affinity_slack` streams busier than the best one
+    - `unhealthy_after` consecutive failures (streams or probes) take a
+      backend out until a health probe succeeds
+    """
+
+    def __init__(
+        self,
+        backends: list[LlmBackend],
+        affinity_slack: int,
+        health_interval_s: float,
+        unhealthy_after: int,
+    ):
+        self.backends = backends
+        self.affinity_slack = affinity_slack
+        self.health_interval_s = health_interval_s
+        self.unhealthy_after = unhealthy_after
+
+        self._affinity: OrderedDict[str, LlmBackend] = OrderedDict()
+        self._probe_task: Optional[asyncio.Task] = None
+
+        self.affinity_hits = 0
+        self.affinity_moves = 0
+
+    @property
+    def default(self) -> LlmBackend:
+        return self.backends[0]
+
+    def pick(self, session_id: str, exclude: tuple[LlmBackend, ...] = ()) -> LlmBackend:
+        candidates = [b for b in self.backends if b.healthy and b not in exclude]
+        if not candidates:
+            # Nothing known-good: still try rather than fail outright
+            candidates = [b for b in self.backends if b not in exclude] or self.backends
+        best = min(candidates, key=LlmBackend.load)
+
+        sticky = self._affinity.get(session_id)
+        if sticky is not None and sticky in candidates:
+            if sticky.inflight - best.inflight <= self.affinity_slack:
+                self._affinity.move_to_end(session_id)
+                self.affinity_hits += 1
+                return sticky
+            self.affinity_moves += 1
+
+        self._remember(session_id, best)
+        return best
+
+    @contextmanager
+    def track(self, backend: LlmBackend) -> Iterator[LlmCall]:
+        call = LlmCall(backend)
+        backend.inflight += 1
+        backend.requests += 1
+        try:
+            yield call
+        except Exception:
+            backend.errors += 1
+            self._failed(backend)
+            raise
+        else:
+            backend.consecutive_failures = 0
+            backend.total_s.append(time.perf_counter() - call.started)
+        finally:
+            backend.inflight -= 1
+
+    def start(self) -> None:
+        if len(self.backends) > 1 and self.health_interval_s > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> dict:
+        return {
+            "backends": {b.name: b.stats() for b in self.backends},
+            "affinity_sessions": len(self._affinity),
+            "affinity_hits": self.affinity_hits,
+            "affinity_moves": self.affinity_moves,
+        }
+
+    def _remember(self, session_id: str, backend: LlmBackend) -> None:
+        self._affinity[session_id] = backend
+        self._affinity.move_to_end(session_id)
+        while len(self._affinity) > MAX_AFFINITY_SESSIONS:
+            self._affinity.popitem(last=False)
+
+    def _failed(self, backend: LlmBackend) -> None:
+        backend.consecutive_failures += 1
+        if backend.healthy and backend.consecutive_failures >= self.unhealthy_after:
+            backend.healthy = False
+            logger.warning(f"LLM backend {backend.name} marked unhealthy.")
+
+    async def _probe_loop(self) -> None:
+        async with httpx.AsyncClient(timeout=min(5.0, self.health_interval_s)) as client:
+            while True:
+                await asyncio.gather(*(self._probe(client, b) for b in self.backends))
+                await asyncio.sleep(self.health_interval_s)
+
+    async def _probe(self, client: httpx.AsyncClient, backend: LlmBackend) -> None:
+        try:
+            r = await client.get(
+                f"{backend.url.rstrip('/')}/models",
+                headers={"Authorization": f"Bearer {backend.api_key}"},
+            )
+            r.raise_for_status()
+        except Exception as e:
+            logger.debug(f"LLM backend {backend.name} probe failed: {e}")
+            self._failed(backend)
+            return
+
+        backend.consecutive_failures = 0
+        if not backend.healthy:
+            backend.healthy = True
+            logger.info(f"LLM backend {backend.name} is healthy again.")
+
+
+def _backend(settings: Settings, upstream: LlmUpstream, index: int) -> LlmBackend:
+    api_key = upstream.api_key or settings.llm_api_key
+    provider = OpenAIProvider(base_url=upstream.url, api_key=api_key)
+    return LlmBackend(
+        name=upstream.name or f"llm{index}",
+        url=upstream.url,
+        weight=max(upstream.weight, 1e-6),
+        model=OpenAIChatModel(settings.llm_model, provider=provider),
+        api_key=api_key,
+    )
+
+
+def build_llm_router(settings: Settings) -> LlmRouter:
+    upstreams = settings.llm_upstreams or [LlmUpstream(url=settings.llm_base_url)]
+    router = LlmRouter(
+        backends=[_backend(settings, u, i) for i, u in enumerate(upstreams)],
+        affinity_slack=settings.llm_affinity_slack,
+        health_interval_s=settings.llm_health_interval_s,
+        unhealthy_after=settings.llm_unhealthy_after,
+    )
+    router.start()
+    return router
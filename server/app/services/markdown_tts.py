@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from abc import ABC, abstractmethod
 
 
 _FENCED_CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```", re.MULTILINE)
@@ -53,3 +54,427 @@ def markdown_to_tts_text(md: str) -> str:
     text = re.sub(r"[ \t]{2,}", " ", text)
 
     return text
+
+
+# -------------------------------------------------------------------------
+# INCREMENTAL NORMALIZER
+# -------------------------------------------------------------------------
+# Each stage is a streaming transducer that reproduces one pass of
+# markdown_to_tts_text exactly (same leftmost/non-overlapping semantics).
+# Stages only hold back input they cannot decide yet - an open fence, an
+# unclosed "[", a line start followed by whitespace - so every character
+# is scanned once per stage instead of once per regex pass over the whole
+# document.
+
+_CODE_REPLACEMENT = "\nCheck the code below.\n"
+_SENTENCE_END = ".!?…"
+_WS_RUN_RE = re.compile(r"\s+")
+
+
+class _Stage(ABC):
+    def __init__(self):
+        self._buf = ""
+
+    def feed(self, text: str) -> str:
+        self._buf += text
+        return self._drain(final=False)
+
+    def finish(self) -> str:
+        return self._drain(final=True)
+
+    @abstractmethod
+    def _drain(self, final: bool) -> str: ...
+
+
+class _FenceStage(_Stage):
+    # ```[\s\S]*?```  ->  "\nCheck the code below.\n"
+    def __init__(self):
+        super().__init__()
+        self._in_fence = False
+        self._scan = 3
+
+    def _drain(self, final: bool) -> str:
+        out: list[str] = []
+        buf = self._buf
+        while buf:
+            if not self._in_fence:
+                i = buf.find("```")
+                if i == -1:
+                    # A trailing "`" or "``" may still become a fence
+                    keep = 0 if final else min(2, len(buf) - len(buf.rstrip("`")))
+                    out.append(buf[: len(buf) - keep])
+                    buf = buf[len(buf) - keep :]
+                    break
+                out.append(buf[:i])
+                buf = buf[i:]
+                self._in_fence = True
+                self._scan = 3
+            else:
+                j = buf.find("```", self._scan)
+                if j == -1:
+                    if final:
+                        # Unclosed fence: the regex leaves it untouched
+                        out.append(buf)
+                        buf = ""
+                        self._in_fence = False
+                        break
+                    self._scan = max(3, len(buf) - 2)
+                    break
+                out.append(_CODE_REPLACEMENT)
+                buf = buf[j + 3 :]
+                self._in_fence = False
+        self._buf = buf
+        return "".join(out)
+
+
+class _BracketStage(_Stage):
+    # !\[([^\]]*)\]\(([^)]+)\)  or  \[([^\]]+)\]\(([^)]+)\)
+    def __init__(self, image: bool):
+        super().__init__()
+        self._image = image
+        self._start = "![" if image else "["
+
+    def _drain(self, final: bool) -> str:
+        out: list[str] = []
+        buf = self._buf
+        start = self._start
+        while buf:
+            i = buf.find(start)
+            if i == -1:
+                # "!" at the very end may be the start of "!["
+                keep = 1 if (self._image and not final and buf.endswith("!")) else 0
+                out.append(buf[: len(buf) - keep])
+                buf = buf[len(buf) - keep :]
+                break
+
+            out.append(buf[:i])
+            buf = buf[i:]
+
+            text_at = len(start)
+            close = buf.find("]", text_at)
+            if close == -1:
+                if final:
+                    out.append(buf)
+                    buf = ""
+                break
+            label = buf[text_at:close]
+            if not self._image and not label:
+                out.append(buf[:1])
+                buf = buf[1:]
+                continue
+
+            if close + 1 >= len(buf):
+                if final:
+                    out.append(buf)
+                    buf = ""
+                break
+            if buf[close + 1] != "(":
+                out.append(buf[:1])
+                buf = buf[1:]
+                continue
+
+            end = buf.find(")", close + 2)
+            if end == -1:
+                if final:
+                    out.append(buf)
+                    buf = ""
+                break
+            if end == close + 2:
+                # "()" - the URL group needs at least one character
+                out.append(buf[:1])
+                buf = buf[1:]
+                continue
+
+            out.append((label or "image") if self._image else label)
+            buf = buf[end + 1 :]
+        self._buf = buf
+        return "".join(out)
+
+
+class _InlineCodeStage(_Stage):
+    # `([^`]+)`  ->  content
+    def _drain(self, final: bool) -> str:
+        out: list[str] = []
+        buf = self._buf
+        while buf:
+            i = buf.find("`")
+            if i == -1:
+                out.append(buf)
+                buf = ""
+                break
+            out.append(buf[:i])
+            buf = buf[i:]
+
+            j = buf.find("`", 1)
+            if j == -1:
+                if final:
+                    out.append(buf)
+                    buf = ""
+                break
+            if j == 1:
+                out.append("`")
+                buf = buf[1:]
+                continue
+            out.append(buf[1:j])
+            buf = buf[j + 1 :]
+        self._buf = buf
+        return "".join(out)
+
+
+class _LineStartStage(_Stage):
+    """
+    One MULTILINE pass anchored at ^. `max_indent` bounds the leading \\s
+    run (None = unbounded \\s*); `marker` returns the length of the marker
+    plus trailing whitespace at a position, 0 for no match, or None when
+    more input is needed.
+    """
+
+    def __init__(self, max_indent, marker):
+        super().__init__()
+        self._max_indent = max_indent
+        self._marker = marker
+        self._line_start = True
+
+    def _drain(self, final: bool) -> str:
+        out: list[str] = []
+        buf = self._buf
+        while buf:
+            if not self._line_start:
+                nl = buf.find("\n")
+                if nl == -1:
+                    out.append(buf)
+                    buf = ""
+                    break
+                out.append(buf[: nl + 1])
+                buf = buf[nl + 1 :]
+                self._line_start = True
+                continue
+
+            m = _WS_RUN_RE.match(buf)
+            run = m.end() if m else 0
+            if run == len(buf) and not final:
+                break  # cannot see past the whitespace yet
+
+            matched = None
+            if self._max_indent is None or run <= self._max_indent:
+                matched = self._marker(buf, run, final)
+                if matched is None:
+                    break
+                if matched:
+                    consumed = buf[: run + matched]
+                    buf = buf[run + matched :]
+                    self._line_start = consumed.endswith("\n")
+                    continue
+
+            # No match here; the next candidate is the line start after the
+            # first newline inside the leading whitespace, if any.
+            nl = buf.find("\n", 0, run)
+            if nl == -1:
+                out.append(buf[:run])
+                buf = buf[run:]
+                self._line_start = False
+            else:
+                out.append(buf[: nl + 1])
+                buf = buf[nl + 1 :]
+        self._buf = buf
+        return "".join(out)
+
+
+def _trailing_ws(buf: str, at: int, final: bool, required: bool):
+    # Greedy \s+ (required) or \s* after a marker
+    m = _WS_RUN_RE.match(buf, at)
+    run = (m.end() - at) if m else 0
+    if at + run == len(buf) and not final:
+        return None
+    if required and not run:
+        return 0
+    return run
+
+
+def _heading_marker(buf: str, at: int, final: bool):
+    # #{1,6}\s+
+    n = len(buf) - len(buf[at:].lstrip("#")) - at
+    if n == 0:
+        return 0
+    if at + n == len(buf):
+        return None if not final else 0
+    if n > 6:
+        return 0
+    ws = _trailing_ws(buf, at + n, final, required=True)
+    if ws is None:
+        return None
+    return n + ws if ws else 0
+
+
+def _quote_marker(buf: str, at: int, final: bool):
+    # >\s?
+    if at >= len(buf) or buf[at] != ">":
+        return 0
+    if at + 1 == len(buf) and not final:
+        return None
+    return 2 if at + 1 < len(buf) and buf[at + 1].isspace() else 1
+
+
+def _bullet_marker(buf: str, at: int, final: bool):
+    # [-*+]\s+
+    if at >= len(buf) or buf[at] not in "-*+":
+        return 0
+    ws = _trailing_ws(buf, at + 1, final, required=True)
+    if ws is None:
+        return None
+    return 1 + ws if ws else 0
+
+
+def _number_marker(buf: str, at: int, final: bool):
+    # \d+\.\s+
+    n = 0
+    while at + n < len(buf) and buf[at + n].isdecimal():
+        n += 1
+    if n == 0:
+        return 0
+    if at + n == len(buf):
+        return None if not final else 0
+    if buf[at + n] != ".":
+        return 0
+    ws = _trailing_ws(buf, at + n + 1, final, required=True)
+    if ws is None:
+        return None
+    return n + 1 + ws if ws else 0
+
+
+class _EmphasisStage(_Stage):
+    # Drop * and _, then "~~" pairs (left to right)
+    _DELETE = str.maketrans("", "", "*_")
+
+    def feed(self, text: str) -> str:
+        self._buf += text.translate(self._DELETE)
+        return self._drain(final=False)
+
+    def _drain(self, final: bool) -> str:
+        buf = self._buf
+        # A trailing run of "~" may pair with the next chunk
+        keep = 0 if final else len(buf) - len(buf.rstrip("~"))
+        head, self._buf = buf[: len(buf) - keep], buf[len(buf) - keep :]
+        return head.replace("~~", "")
+
+
+class _HtmlStage(_Stage):
+    # <[^>]+>  ->  ""
+    def __init__(self):
+        super().__init__()
+        self._scan = 1
+
+    def _drain(self, final: bool) -> str:
+        out: list[str] = []
+        buf = self._buf
+        while buf:
+            i = buf.find("<")
+            if i == -1:
+                out.append(buf)
+                buf = ""
+                break
+            if i:
+                out.append(buf[:i])
+                buf = buf[i:]
+                self._scan = 1
+
+            j = buf.find(">", self._scan)
+            if j == -1:
+                if final:
+                    out.append(buf)
+                    buf = ""
+                else:
+                    self._scan = len(buf)
+                break
+            self._scan = 1
+            if j == 1:
+                out.append("<")
+                buf = buf[1:]
+                continue
+            buf = buf[j + 1 :]
+        self._buf = buf
+        return "".join(out)
+
+
+class MarkdownTtsNormalizer:
+    """
+    Incremental equivalent of markdown_to_tts_text: a chain of streaming
+    stages, one per regex pass, each scanning every character once.
+
+    feed() accepts arbitrary deltas and returns sentences that are complete
+    and ready for speech; finish() flushes the rest. After finish(), `text`
+    equals markdown_to_tts_text() of everything fed.
+    """
+
+    def __init__(self):
+        self._stages: list[_Stage] = [
+            _FenceStage(),
+            _BracketStage(image=True),
+            _BracketStage(image=False),
+            _InlineCodeStage(),
+            _LineStartStage(3, _heading_marker),
+            _LineStartStage(3, _quote_marker),
+            _LineStartStage(None, _bullet_marker),
+            _LineStartStage(None, _number_marker),
+            _EmphasisStage(),
+            _HtmlStage(),
+        ]
+        self._parts: list[str] = []
+        self._pending_ws = ""
+        self._sentence: list[str] = []
+        self._last_char = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, delta: str) -> list[str]:
+        if not delta:
+            return []
+        for stage in self._stages:
+            delta = stage.feed(delta)
+            if not delta:
+                return []
+        return self._emit(delta)
+
+    def finish(self) -> list[str]:
+        delta = ""
+        for stage in self._stages:
+            delta = stage.feed(delta) + stage.finish() if delta else stage.finish()
+        out = self._emit(delta)
+        # Trailing whitespace is stripped, like the batch function
+        self._pending_ws = ""
+        sentence = "".join(self._sentence).strip()
+        self._sentence = []
+        if sentence:
+            out.append(sentence)
+        return out
+
+    def _emit(self, text: str) -> list[str]:
+        out: list[str] = []
+        pos = 0
+        for m in _WS_RUN_RE.finditer(text):
+            self._commit(text[pos : m.start()])
+            ws = m.group(0)
+            if self._parts and (self._last_char in _SENTENCE_END or "\n" in ws):
+                sentence = "".join(self._sentence).strip()
+                self._sentence = []
+                if sentence:
+                    out.append(sentence)
+            self._pending_ws += ws
+            pos = m.end()
+        self._commit(text[pos:])
+        return out
+
+    def _commit(self, word: str) -> None:
+        if not word:
+            return
+        if self._pending_ws:
+            if self._parts:
+                ws = re.sub(r"[ \t]{2,}", " ", re.sub(r"\n{3,}", "\n\n", self._pending_ws))
+                self._parts.append(ws)
+                self._sentence.append(ws)
+            self._pending_ws = ""
+        self._parts.append(word)
+        self._sentence.append(word)
+        self._last_char = word[-1]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.settings import Settings
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    "  Continue! " and "continue" search the same facts.
+    """
+    return _SPACES.sub(" ", query).strip().strip(".!?,;:").strip().lower()
+
+
+class MemorySearchCache:
+    """
+    LRU + TTL cache of Graphiti search results (the fact strings), keyed by
+    (group_id, normalized query). `group_id=None` is a search across all
+    groups. Adding an episode to a group invalidates that group's entries
+    and the cross-group ones; a search that was already running when that
+    happened is not stored, since it may predate the episode.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+
+        self._entries: OrderedDict[tuple[Optional[str], str], tuple[float, list[str]]] = (
+            OrderedDict()
+        )
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, query: str, group_id: Optional[str] = None) -> Optional[list[str]]:
+        key = (group_id, normalize_query(query))
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_s:
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self,
+        query: str,
+        facts: list[str],
+        generation: int,
+        group_id: Optional[str] = None,
+    ) -> None:
+        # `generation` is what the caller read before searching
+        if generation != self._generation:
+            self.stale_puts += 1
+            return
+
+        key = (group_id, normalize_query(query))
+        self._entries[key] = (time.monotonic(), facts)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, group_id: Optional[str] = None) -> None:
+        self._generation += 1
+        stale = [k for k in self._entries if k[0] is None or k[0] == group_id]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+def build_memory_cache(settings: Settings) -> MemorySearchCache | None:
+    if settings.memory_cache_max_entries <= 0:
+        return None
+
+    return MemorySearchCache(
+        max_entries=settings.memory_cache_max_entries,
+        ttl_s=settings.memory_cache_ttl_s,
+    )
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+import logging
+import time
+from typing import Optional
+
+import aiosqlite
+
+from app.core.settings import Settings
+from app.services.history import SQLiteChatHistory
+from app.services.memory_cache import MemorySearchCache
+
+try:
+    from graphiti_core import Graphiti
+    from graphiti_core.nodes import EpisodeType  # type: ignore
+
+    graphiti_available = True
+except ImportError:
+    graphiti_available = False
+
+logger = logging.getLogger(__name__)
+
+
+def generate_turn_id(content_a: str, content_b: str) -> str:
+    """
+    Generate a deterministic ID based on content.
+    """
+    raw = (content_a[:50] + content_b[:50]).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+@dataclass
+class _Turn:
+    id: int
+    session_id: str
+    user_content: str
+    assistant_content: str
+    created_at: float
+    attempts: int
+
+
+class MemoryWriter:
+    """
+    Write-behind for finished chat turns. `enqueue` writes the turn to
+    `messages` and, in the same transaction, to the `memory_outbox` table,
+    so history is up to date before the reply ends. A background task then
+    merges up to `episode_max_turns` consecutive turns of a session into
+    one Graphiti episode (one extraction instead of one per turn), once the
+    oldest has waited `episode_linger_s`, retrying with backoff.
+
+    Rows leave the outbox once their episode is written, so turns still
+    pending at shutdown (after `drain`) are picked up on the next start.
+    `enqueue` never waits: with `max_pending` turns outstanding, new turns
+    only go to history and are left out of memory.
+    """
+
+    def __init__(
+        self,
+        history: SQLiteChatHistory,
+        memory: Graphiti | None,
+        cache: MemorySearchCache | None,
+        max_pending: int,
+        episode_max_turns: int,
+        episode_linger_s: float,
+        max_attempts: int,
+        retry_base_s: float,
+        retry_max_s: float,
+    ):
+        self.history = history
+        self.memory = memory if graphiti_available else None
+        self.cache = cache
+        self.max_pending = max_pending
+        self.episode_max_turns = episode_max_turns
+        self.episode_linger_s = episode_linger_s
+        self.max_attempts = max_attempts
+        self.retry_base_s = retry_base_s
+        self.retry_max_s = retry_max_s
+
+        self._db: Optional[aiosqlite.Connection] = None
+        # One transaction at a time on the shared connection
+        self._tx = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._draining = False
+
+        self.pending = 0
+        self.oldest_pending_at: Optional[float] = None
+        self.enqueued = 0
+        self.episodes = 0
+        self.episode_turns = 0
+        self.retries = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    async def start(self) -> None:
+        self._db = await aiosqlite.connect(self.history.db_path)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS memory_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user_content TEXT NOT NULL,
+                assistant_content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        await self._db.commit()
+        await self._refresh_pending()
+        if self.pending:
+            logger.info(f"Memory outbox: resuming {self.pending} pending turn(s).")
+
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, session_id: str, user_content: str, assistant_content: str) -> None:
+        self.enqueued += 1
+        db = self._db
+        if db is None:
+            # Not started or already drained: history only
+            await self.history.add_message(session_id, "user", user_content)
+            await self.history.add_message(session_id, "assistant", assistant_content)
+            return
+
+        now = time.time()
+        to_memory = self.memory is not None and self.pending < self.max_pending
+        async with self._tx:
+            await db.executemany(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                [(session_id, "user", user_content), (session_id, "assistant", assistant_content)],
+            )
+            if to_memory:
+                await db.execute(
+                    "INSERT INTO memory_outbox (session_id, user_content, assistant_content, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (session_id, user_content, assistant_content, now),
+                )
+            await db.commit()
+
+        if not to_memory:
+            if self.memory is not None:
+                self.skipped += 1
+                logger.warning(f"Memory outbox full ({self.pending} pending), turn left out of memory.")
+            return
+        self.pending += 1
+        if self.oldest_pending_at is None:
+            self.oldest_pending_at = now
+        self._wake.set()
+
+    async def drain(self, timeout_s: float) -> None:
+        """
+        Flush what can be flushed (no linger, no backoff) within `timeout_s`;
+        the rest stays in the outbox for the next start.
+        """
+        if self._task is None:
+            return
+
+        self._draining = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning(f"Memory outbox: {self.pending} turn(s) left for next start.")
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        self._task = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        lag = time.time() - self.oldest_pending_at if self.oldest_pending_at else 0.0
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "lag_seconds": round(lag, 3),
+            "enqueued": self.enqueued,
+            "episodes": self.episodes,
+            "turns_per_episode": (self.episode_turns / self.episodes) if self.episodes else 0.0,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+        }
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            if not self._draining:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._poll_interval())
+                except asyncio.TimeoutError:
+                    if not self.pending:
+                        continue
+                self._wake.clear()
+
+            done_before = self.episode_turns + self.dropped
+            try:
+                await self._flush_episodes()
+                await self._refresh_pending()
+            except Exception as e:
+                logger.error(f"Memory outbox flush failed: {e}")
+                if self._draining:
+                    return
+                await asyncio.sleep(self.retry_base_s)
+                continue
+
+            # Draining: keep going while passes still make progress
+            if self._draining and (
+                not self.pending or self.episode_turns + self.dropped == done_before
+            ):
+                return
+
+    def _poll_interval(self) -> float:
+        return max(0.1, min(self.episode_linger_s, self.retry_base_s))
+
+    async def _flush_episodes(self) -> None:
+        if not self.memory:
+            return
+
+        async with self._tx:
+            cursor = await self._db.execute(  # type: ignore[union-attr]
+                "SELECT id, session_id, user_content, assistant_content, created_at, attempts "
+                "FROM memory_outbox WHERE next_attempt_at <= ? ORDER BY id",
+                (time.time() if not self._draining else float("inf"),),
+            )
+            rows = await cursor.fetchall()
+        sessions: dict[str, list[_Turn]] = defaultdict(list)
+        for row in rows:
+            sessions[row[1]].append(_Turn(*row))
+
+        now = time.time()
+        for turns in sessions.values():
+            for i in range(0, len(turns), self.episode_max_turns):
+                group = turns[i : i + self.episode_max_turns]
+                full = len(group) == self.episode_max_turns
+                if not (full or self._draining or now - group[0].created_at >= self.episode_linger_s):
+                    continue
+                await self._write_episode(group)
+
+    async def _write_episode(self, turns: list[_Turn]) -> None:
+        body = "\n\n".join(
+            f"User: {t.user_content}\nAssistant: {t.assistant_content}" for t in turns
+        )
+        # Deterministic ID prevents duplicates on retry/restart
+        turn_id = generate_turn_id(turns[0].user_content, turns[-1].assistant_content)
+        ids = [(t.id,) for t in turns]
+
+        try:
+            await self.memory.add_episode(  # type: ignore[union-attr]
+                name=f"turn_{turn_id}",
+                episode_body=body,
+                source=EpisodeType.message,  # type: ignore
+                source_description="User chat interaction",
+                reference_time=datetime.fromtimestamp(turns[-1].created_at, timezone.utc),
+            )
+        except Exception as e:
+            attempts = max(t.attempts for t in turns) + 1
+            async with self._tx:
+                if attempts >= self.max_attempts:
+                    logger.error(
+                        f"Dropping memory episode ({len(turns)} turn(s)) after {attempts} attempts: {e}"
+                    )
+                    await self._db.executemany("DELETE FROM memory_outbox WHERE id = ?", ids)  # type: ignore[union-attr]
+                    self.dropped += len(turns)
+                else:
+                    delay = min(self.retry_max_s, self.retry_base_s * 2 ** (attempts - 1))
+                    logger.warning(f"Failed to save memory episode, retrying in {delay:.1f}s: {e}")
+                    await self._db.executemany(  # type: ignore[union-attr]
+                        "UPDATE memory_outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                        [(attempts, time.time() + delay, i) for (i,) in ids],
+                    )
+                    self.retries += 1
+                await self._db.commit()  # type: ignore[union-attr]
+            return
+
+        async with self._tx:
+            await self._db.executemany("DELETE FROM memory_outbox WHERE id = ?", ids)  # type: ignore[union-attr]
+            await self._db.commit()  # type: ignore[union-attr]
+        self.episodes += 1
+        self.episode_turns += len(turns)
+        logger.debug(f"Saved episode turn_{turn_id} ({len(turns)} turn(s)) to Graphiti memory.")
+
+        # Episodes go to the default group, which every search covers
+        if self.cache:
+            self.cache.invalidate()
+
+    async def _refresh_pending(self) -> None:
+        async with self._tx:
+            cursor = await self._db.execute(  # type: ignore[union-attr]
+                "SELECT COUNT(*), MIN(created_at) FROM memory_outbox"
+            )
+            count, oldest = await cursor.fetchone()  # type: ignore[misc]
+        self.pending = count
+        self.oldest_pending_at = oldest
+
+
+async def build_memory_writer(
+    settings: Settings,
+    history: SQLiteChatHistory,
+    memory: Graphiti | None,
+    cache: MemorySearchCache | None,
+) -> MemoryWriter:
+    writer = MemoryWriter(
+        history=history,
+        memory=memory,
+        cache=cache,
+        max_pending=settings.memory_outbox_max_pending,
+        episode_max_turns=settings.memory_episode_max_turns,
+        episode_linger_s=settings.memory_episode_linger_s,
+        max_attempts=settings.memory_outbox_max_attempts,
+        retry_base_s=settings.memory_outbox_retry_base_s,
+        retry_max_s=settings.memory_outbox_retry_max_s,
+    )
+    await writer.start()
+    return writer
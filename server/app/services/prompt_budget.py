@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Protocol
+
+from app.core.settings import Settings
+from app.schemas.openai_chat import ChatMessage
+
+try:
+    import tiktoken  # type: ignore
+
+    tiktoken_available = True
+except ImportError:
+    tiktoken_available = False
+
+# Role header and separators _messages_to_transcript adds per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+
+class CharEstimator:
+    """
+    No tokenizer needed: ~4 characters per token for English text, rounded
+    up so budgets err on the short side.
+    """
+
+    name = "estimate"
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class TiktokenCounter:
+    name = "tiktoken"
+
+    def __init__(self, encoding: str):
+        self._enc = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._enc.encode(text, disallowed_special=()))
+
+
+def message_tokens(counter: TokenCounter, message: ChatMessage) -> int:
+    return counter.count(message.content or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def pack_recent(
+    counter: TokenCounter, messages: list[ChatMessage], budget: int
+) -> tuple[int, int]:
+    """
+    How many of the newest `messages` (whole messages, oldest first in the
+    list) fit in `budget` tokens. Returns (kept, tokens used).
+    """
+    used = 0
+    kept = 0
+    for m in reversed(messages):
+        cost = message_tokens(counter, m)
+        if used + cost > budget:
+            break
+        used += cost
+        kept += 1
+    return kept, used
+
+
+@dataclass
+class PromptStats:
+    prompts: int = 0
+    tokens_total: int = 0
+    tokens_max: int = 0
+    history_kept: int = 0
+    history_left_out: int = 0
+
+    def add(self, tokens: int, kept: int, left_out: int) -> None:
+        self.prompts += 1
+        self.tokens_total += tokens
+        self.tokens_max = max(self.tokens_max, tokens)
+        self.history_kept += kept
+        self.history_left_out += left_out
+
+    def as_dict(self) -> dict:
+        n = self.prompts
+        return {
+            "prompts": n,
+            "mean_tokens": (self.tokens_total / n) if n else 0.0,
+            "max_tokens": self.tokens_max,
+            "mean_history_messages": (self.history_kept / n) if n else 0.0,
+            "history_left_out": self.history_left_out,
+        }
+
+
+def build_token_counter(settings: Settings) -> TokenCounter:
+    if settings.prompt_tokenizer == "tiktoken":
+        if not tiktoken_available:
+            raise RuntimeError("PROMPT_TOKENIZER=tiktoken needs tiktoken (uv sync --extra tiktoken)")
+        return TiktokenCounter(settings.prompt_tiktoken_encoding)
+    return CharEstimator(settings.prompt_chars_per_token)
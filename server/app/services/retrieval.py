@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SourceStats:
+    calls: int = 0
+    late: int = 0
+    skipped: int = 0
+    errors: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "late": self.late,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_ms": (self.total_s / self.calls * 1000.0) if self.calls else 0.0,
+            "max_ms": self.max_s * 1000.0,
+        }
+
+
+class ContextRetriever:
+    """
+    Runs prompt-context lookups (history, long-term memory, ...) at the
+    same time and waits at most `deadline_s` for them. Whatever finished
+    in time is returned; late lookups keep running only so their latency
+    gets recorded, and their results are dropped.
+
+    At most one late lookup per source and session runs at a time: while
+    a session's previous lookup of a source is still running past its
+    deadline, that session skips the source instead of piling more work
+    onto a slow backend. Other sessions are not affected.
+    """
+
+    def __init__(self, deadline_s: float):
+        self.deadline_s = deadline_s
+        self.sources: dict[str, SourceStats] = {}
+        self._late: dict[tuple[str, str], asyncio.Future] = {}
+
+    async def gather(
+        self, lookups: dict[str, Awaitable[Any]], session_id: str = ""
+    ) -> dict[str, Any]:
+        if not lookups:
+            return {}
+
+        started = time.perf_counter()
+        tasks: dict[asyncio.Future, str] = {}
+        for name, aw in lookups.items():
+            if (name, session_id) in self._late:
+                self._stats(name).skipped += 1
+                _discard(aw)
+                continue
+            tasks[asyncio.ensure_future(self._timed(name, aw, started))] = name
+        if not tasks:
+            return {}
+
+        done, pending = await asyncio.wait(
+            tasks, timeout=self.deadline_s if self.deadline_s > 0 else None
+        )
+
+        results: dict[str, Any] = {}
+        for task in done:
+            name = tasks[task]
+            e = task.exception()
+            if e is not None:
+                self._stats(name).errors += 1
+                logger.error(f"Context lookup '{name}' failed: {e}")
+                continue
+            results[name] = task.result()
+
+        for task in pending:
+            name = tasks[task]
+            self._stats(name).late += 1
+            logger.warning(
+                f"Context lookup '{name}' missed the {self.deadline_s * 1000:.0f} ms "
+                f"deadline; continuing without it."
+            )
+            late_key = (name, session_id)
+            self._late[late_key] = task
+            task.add_done_callback(lambda t, k=late_key: self._late_done(k, t))
+
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "deadline_ms": self.deadline_s * 1000.0,
+            "late_running": len(self._late),
+            "sources": {name: s.as_dict() for name, s in self.sources.items()},
+        }
+
+    async def _timed(self, name: str, aw: Awaitable[Any], started: float) -> Any:
+        try:
+            return await aw
+        finally:
+            self._stats(name).add(time.perf_counter() - started)
+
+    def _stats(self, name: str) -> SourceStats:
+        return self.sources.setdefault(name, SourceStats())
+
+    def _late_done(self, key: tuple[str, str], task: asyncio.Future) -> None:
+        if self._late.get(key) is task:
+            del self._late[key]
+        # A late lookup that then fails has nobody to report to
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Late context lookup '{key[0]}' failed: {task.exception()}")
+
+
+def _discard(aw: Awaitable[Any]) -> None:
+    # Never started: close it so it is not reported as never awaited
+    if asyncio.iscoroutine(aw):
+        aw.close()
+    elif isinstance(aw, asyncio.Future):
+        aw.cancel()
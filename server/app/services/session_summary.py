@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from pydantic_ai import Agent
+
+from app.core.settings import Settings
+from app.schemas.openai_chat import ChatMessage
+from app.services.admission import ChatAdmission, ChatOverloaded
+from app.services.history import SQLiteChatHistory
+from app.services.llm_router import LlmRouter
+from app.services.prompt_budget import TokenCounter, message_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant. Given the current summary and the messages that follow it, "
+    "write the updated summary. Keep names, facts, decisions, preferences and "
+    "open questions; drop pleasantries. Write plain prose, no preamble."
+)
+
+
+def _summary_prompt(summary: str, messages: list[ChatMessage], max_tokens: int) -> str:
+    lines = [f"{m.role.upper()}: {(m.content or '').strip()}" for m in messages]
+    return (
+        f"CURRENT SUMMARY:\n{summary or '(none yet)'}\n\n"
+        f"NEW MESSAGES:\n" + "\n\n".join(lines) + "\n\n"
+        f"Updated summary (at most ~{max_tokens} tokens):"
+    )
+
+
+class SessionSummarizer:
+    """
+    Folds messages that no longer fit the prompt's history budget into the
+    session's rolling summary, in the background and one session at a
+    time. Each run only feeds the model the previous summary plus the
+    messages it does not cover yet, in chunks of at most `chunk_tokens`.
+
+    Summary calls are LLM work like chat turns: each one waits for an
+    admission slot in the session's queue and goes to the session's
+    backend through the router. When admission turns it away, the fold
+    is left for a later turn.
+    """
+
+    def __init__(
+        self,
+        agent: Any,
+        router: LlmRouter,
+        admission: Optional[ChatAdmission],
+        history: SQLiteChatHistory,
+        counter: TokenCounter,
+        max_summary_tokens: int,
+        chunk_tokens: int,
+    ):
+        self.agent = agent
+        self.router = router
+        self.admission = admission
+        self.history = history
+        self.counter = counter
+        self.max_summary_tokens = max_summary_tokens
+        self.chunk_tokens = chunk_tokens
+
+        self._tasks: dict[str, asyncio.Task] = {}
+
+        self.runs = 0
+        self.folded_messages = 0
+        self.failures = 0
+        self.deferred = 0
+        self.seconds = 0.0
+
+    def schedule(self, session_id: str, upto_id: int) -> None:
+        """
+        Fold everything up to message `upto_id`, unless a fold for this
+        session is already running (the next turn will catch up).
+        """
+        if session_id in self._tasks:
+            return
+        task = asyncio.create_task(self._fold(session_id, upto_id))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+
+    async def close(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "folded_messages": self.folded_messages,
+            "failures": self.failures,
+            "deferred": self.deferred,
+            "inflight": len(self._tasks),
+            "mean_seconds": (self.seconds / self.runs) if self.runs else 0.0,
+        }
+
+    async def _fold(self, session_id: str, upto_id: int) -> None:
+        t0 = time.perf_counter()
+        try:
+            summary, done_id = await self.history.get_summary(session_id)
+            pending = await self.history.get_messages_between(session_id, done_id, upto_id)
+            while pending:
+                chunk = self._chunk(pending)
+                new_summary = await self._summarize(
+                    session_id, summary, [m for _, m in chunk]
+                )
+                new_done_id = chunk[-1][0]
+                if not await self.history.set_summary(
+                    session_id, new_summary, new_done_id, prev_upto_id=done_id
+                ):
+                    # Deleted or advanced meanwhile
+                    return
+                summary, done_id = new_summary, new_done_id
+                pending = pending[len(chunk) :]
+                self.folded_messages += len(chunk)
+        except asyncio.CancelledError:
+            raise
+        except ChatOverloaded:
+            # Chat turns come first; the next turn schedules the fold again
+            self.deferred += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Session summary failed for {session_id}: {e}")
+        finally:
+            self.runs += 1
+            self.seconds += time.perf_counter() - t0
+
+    def _chunk(self, pending: list[tuple[int, ChatMessage]]) -> list[tuple[int, ChatMessage]]:
+        # Oldest first; always at least one message so a huge one still folds
+        used = 0
+        n = 0
+        for _, m in pending:
+            cost = message_tokens(self.counter, m)
+            if n and used + cost > self.chunk_tokens:
+                break
+            used += cost
+            n += 1
+        return pending[:n]
+
+    async def _summarize(
+        self, session_id: str, summary: str, messages: list[ChatMessage]
+    ) -> str:
+        slot = await self.admission.acquire(session_id) if self.admission else None
+        try:
+            backend = self.router.pick(session_id)
+            with self.router.track(backend):
+                result = await self.agent.run(
+                    _summary_prompt(summary, messages, self.max_summary_tokens),
+                    model=backend.model,
+                )
+        finally:
+            if slot:
+                slot.release()
+        return str(result.output).strip()
+
+
+def build_session_summarizer(
+    settings: Settings,
+    router: LlmRouter,
+    admission: Optional[ChatAdmission],
+    history: SQLiteChatHistory,
+    counter: TokenCounter,
+) -> Optional[SessionSummarizer]:
+    if settings.prompt_summary_max_tokens <= 0:
+        return None
+
+    # Runs pick their backend per call; this one is the agent's default
+    agent = Agent(router.default.model, system_prompt=SUMMARY_SYSTEM_PROMPT, output_type=str)
+    return SessionSummarizer(
+        agent=agent,
+        router=router,
+        admission=admission,
+        history=history,
+        counter=counter,
+        max_summary_tokens=settings.prompt_summary_max_tokens,
+        chunk_tokens=settings.prompt_budget_tokens,
+    )
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional, Protocol
+
+import numpy as np
+
+from app.core.settings import Settings
+
+from kokoro import KPipeline
+
+try:
+    import onnxruntime as ort  # type: ignore
+
+    onnxruntime_available = True
+except ImportError:
+    onnxruntime_available = False
+
+logger = logging.getLogger(__name__)
+
+
+class SynthesisBackend(Protocol):
+    """
+    Supplies the acoustic model under a language's KPipeline. G2P always
+    stays in KPipeline; `shared_model` is the default language's model,
+    which other languages reuse.
+    """
+
+    name: str
+
+    def new_pipeline(self, lang_code: str, repo_id: str, shared_model: Any) -> KPipeline: ...
+
+
+class TorchBackend:
+    """
+    Kokoro's own PyTorch KModel.
+    """
+
+    name = "torch"
+
+    def new_pipeline(self, lang_code: str, repo_id: str, shared_model: Any) -> KPipeline:
+        return KPipeline(lang_code=lang_code, repo_id=repo_id, model=shared_model or True)
+
+
+@dataclass
+class _OnnxOutput:
+    # Same shape as KModel.Output; no durations, so no word timestamps
+    audio: np.ndarray
+    pred_dur: None = None
+
+
+class OnnxKokoroModel:
+    """
+    Stands in for KModel: phonemes + style vector -> waveform, run by
+    onnxruntime on CPU. Works with the Kokoro v1.0 ONNX exports (fp32 or
+    int8-quantized), which take token ids, a 256-d style and the speed.
+    """
+
+    device = "cpu"
+    context_length = 512
+
+    def __init__(self, model_path: str, vocab: dict[str, int], threads: int):
+        opts = ort.SessionOptions()
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.vocab = vocab
+
+        names = {i.name for i in self.session.get_inputs()}
+        # onnx-community export says "input_ids", kokoro-onnx says "tokens"
+        self._ids_name = "input_ids" if "input_ids" in names else "tokens"
+
+    def __call__(self, phonemes: str, ref_s, speed: float = 1, return_output: bool = False):
+        ids = [i for i in (self.vocab.get(p) for p in phonemes) if i is not None]
+        if len(ids) + 2 > self.context_length:
+            raise ValueError(f"Phoneme sequence too long: {len(ids) + 2} > {self.context_length}")
+
+        feeds = {
+            self._ids_name: np.array([[0, *ids, 0]], dtype=np.int64),
+            "style": np.asarray(ref_s, dtype=np.float32).reshape(1, -1),
+            "speed": np.array([speed], dtype=np.float32),
+        }
+        audio = self.session.run(None, feeds)[0].reshape(-1)
+        return _OnnxOutput(audio=audio) if return_output else audio
+
+
+class OnnxBackend:
+    """
+    KPipeline for G2P with `model=False`, then an ONNX model in its place.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, vocab: dict[str, int], threads: int):
+        self.model_path = model_path
+        self.vocab = vocab
+        self.threads = threads
+
+    def new_pipeline(self, lang_code: str, repo_id: str, shared_model: Any) -> KPipeline:
+        pipeline = KPipeline(lang_code=lang_code, repo_id=repo_id, model=False)
+        pipeline.model = shared_model or OnnxKokoroModel(
+            self.model_path, self.vocab, self.threads
+        )
+        return pipeline
+
+
+def _onnx_backend(settings: Settings) -> OnnxBackend:
+    if not onnxruntime_available:
+        raise RuntimeError(
+            "KOKORO_BACKEND=onnx needs onnxruntime (uv sync --extra onnx)"
+        )
+
+    from huggingface_hub import hf_hub_download
+
+    model_path: Optional[str] = settings.kokoro_onnx_model_path
+    if not model_path:
+        model_path = hf_hub_download(settings.kokoro_onnx_repo_id, settings.kokoro_onnx_file)
+
+    # Token ids come from the reference model's config, same as KModel
+    with open(hf_hub_download(settings.kokoro_repo_id, "config.json")) as f:
+        vocab = json.load(f)["vocab"]
+
+    logger.info(f"Kokoro ONNX backend: {model_path}")
+    return OnnxBackend(model_path, vocab, settings.kokoro_onnx_threads)
+
+
+def build_tts_backend(settings: Settings) -> SynthesisBackend:
+    if settings.kokoro_backend == "onnx":
+        return _onnx_backend(settings)
+    return TorchBackend()
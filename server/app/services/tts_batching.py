@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from app.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# (texts, voice, speed, priority) -> int16 segments per text
+BatchRunner = Callable[[list[str], str, float, int], Awaitable[list[list[np.ndarray]]]]
+
+
+@dataclass
+class _Pending:
+    chunks: list[str]
+    priority: int
+    future: asyncio.Future
+
+
+class TtsMicroBatcher:
+    """
+    Collects requests that share voice and speed for up to `window_s`
+    (or until `max_batch` requests are waiting) and renders them with a
+    single pipeline call. Each caller gets back only its own segments.
+    """
+
+    def __init__(self, run_batch: BatchRunner, window_s: float, max_batch: int):
+        self._run_batch = run_batch
+        self.window_s = window_s
+        self.max_batch = max(1, max_batch)
+
+        self._groups: dict[tuple[str, float], list[_Pending]] = {}
+        self._timers: dict[tuple[str, float], asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.requests = 0
+        self.size_histogram: Counter[int] = Counter()
+
+    async def submit(
+        self, chunks: list[str], voice: str, speed: float, priority: int
+    ) -> list[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        key = (voice, speed)
+
+        pending = _Pending(chunks=chunks, priority=priority, future=loop.create_future())
+        group = self._groups.setdefault(key, [])
+        group.append(pending)
+
+        if len(group) >= self.max_batch:
+            self._flush(key)
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.window_s, self._flush, key)
+
+        return await pending.future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": (self.requests / self.batches) if self.batches else 0.0,
+            "max_batch_size": max(self.size_histogram, default=0),
+            "batch_size_histogram": dict(sorted(self.size_histogram.items())),
+        }
+
+    def _flush(self, key: tuple[str, float]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        # Callers that gave up while waiting are dropped before rendering
+        group = [p for p in self._groups.pop(key, []) if not p.future.done()]
+        if not group:
+            return
+
+        task = asyncio.ensure_future(self._run(key, group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: tuple[str, float], group: list[_Pending]) -> None:
+        voice, speed = key
+
+        texts: list[str] = []
+        owners: list[int] = []
+        for i, p in enumerate(group):
+            texts.extend(p.chunks)
+            owners.extend([i] * len(p.chunks))
+
+        self.batches += 1
+        self.requests += len(group)
+        self.size_histogram[len(group)] += 1
+
+        try:
+            # A batch is as urgent as its most urgent member
+            priority = min(p.priority for p in group)
+            per_text = await self._run_batch(texts, voice, speed, priority)
+        except Exception as e:
+            logger.error(f"TTS batch of {len(group)} failed: {e}")
+            for p in group:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+
+        results: list[list[np.ndarray]] = [[] for _ in group]
+        for owner, segments in zip(owners, per_text):
+            results[owner].extend(segments)
+
+        for p, segments in zip(group, results):
+            if not p.future.done():
+                p.future.set_result(segments)
+
+
+def build_tts_batcher(settings: Settings, run_batch: BatchRunner) -> TtsMicroBatcher | None:
+    if settings.kokoro_batch_window_ms <= 0:
+        return None
+
+    return TtsMicroBatcher(
+        run_batch=run_batch,
+        window_s=settings.kokoro_batch_window_ms / 1000.0,
+        max_batch=settings.kokoro_batch_max_size,
+    )
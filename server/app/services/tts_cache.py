@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_audio_key(
+    clean_text: str,
+    voice: str,
+    speed: float,
+    sample_rate: int,
+    fmt: str = "wav",
+    model: str = "",
+    split_pattern: str = "",
+) -> str:
+    """
+    Content address for a synthesized clip. Everything that changes the
+    rendered audio goes into the hash: the model and backend that render
+    it (`model`, see audio_model_fingerprint) and the pattern the text is
+    split on, which differs between full and streamed renders.
+    """
+    raw = "\0".join(
+        [model, split_pattern, fmt, str(sample_rate), voice, f"{speed:.4f}", clean_text]
+    ).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def audio_model_fingerprint(settings: Settings) -> str:
+    """
+    Identifies the acoustic model and backend, so a disk cache (or a
+    client's ETag) from another model is never served.
+    """
+    if settings.kokoro_backend == "onnx":
+        source = settings.kokoro_onnx_model_path or (
+            f"{settings.kokoro_onnx_repo_id}/{settings.kokoro_onnx_file}"
+        )
+    else:
+        source = settings.kokoro_repo_id
+    return f"{settings.kokoro_backend}:{source}"
+
+
+class TtsAudioCache:
+    """
+    Two-tier cache for rendered audio:
+    - memory: LRU bounded by entry count and total bytes
+    - disk (optional): one file per key, oldest evicted past a size cap
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir if disk_dir and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._mem: OrderedDict[str, bytes] = OrderedDict()
+        self._mem_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions_memory = 0
+        self.evictions_disk = 0
+
+        if self.disk_dir:
+            self._load_disk_index()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.hits_memory += 1
+            return data
+
+        if self.disk_dir and key in self._disk:
+            data = await asyncio.to_thread(self._read_file, key)
+            if data is not None:
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits_disk += 1
+                self._put_memory(key, data)
+                return data
+            self._disk_bytes -= self._disk.pop(key, 0)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        self._put_memory(key, data)
+        if not self.disk_dir or key in self._disk or len(data) > self.disk_max_bytes:
+            return
+
+        try:
+            await asyncio.to_thread(self._write_file, key, data)
+        except OSError as e:
+            logger.warning(f"TTS disk cache write failed: {e}")
+            return
+
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        evicted = self._evict_disk()
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+
+    def stats(self) -> dict:
+        hits = self.hits_memory + self.hits_disk
+        lookups = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "memory_entries": len(self._mem),
+            "memory_bytes": self._mem_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "evictions_memory": self.evictions_memory,
+            "evictions_disk": self.evictions_disk,
+        }
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+
+        while self._mem and (
+            len(self._mem) > self.max_entries or self._mem_bytes > self.max_bytes
+        ):
+            _k, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+            self.evictions_memory += 1
+
+    # ------------------------------------------------------------------
+    # Disk tier: index is owned by the event loop, file IO runs on a thread
+    # ------------------------------------------------------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir or "", f"{key}.audio")
+
+    def _load_disk_index(self) -> None:
+        os.makedirs(self.disk_dir or "", exist_ok=True)
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".audio"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name[: -len(".audio")], st.st_size))
+
+        # Oldest first so popitem(last=False) evicts LRU
+        for _mtime, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._remove_files(self._evict_disk())
+
+    def _evict_disk(self) -> list[str]:
+        evicted: list[str] = []
+        while self._disk and self._disk_bytes > self.disk_max_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.evictions_disk += 1
+            evicted.append(key)
+        return evicted
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as LRU order across restarts
+            return data
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _remove_files(self, keys: list[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+def build_tts_cache(settings: Settings) -> TtsAudioCache | None:
+    if settings.kokoro_cache_max_entries <= 0:
+        return None
+
+    return TtsAudioCache(
+        max_entries=settings.kokoro_cache_max_entries,
+        max_bytes=settings.kokoro_cache_max_bytes,
+        disk_dir=settings.kokoro_cache_dir,
+        disk_max_bytes=settings.kokoro_cache_disk_max_bytes,
+    )
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+import numpy as np
+
+from kokoro import KPipeline
+
+
+class PhonemeCache:
+    """
+    LRU from (lang_code, normalized sentence) to the phoneme strings Kokoro
+    produced for it. A hit skips G2P; only the acoustic model runs.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[tuple[str, str], tuple[str, ...]] = OrderedDict()
+        self._bytes = 0
+        # Pipeline calls run on executor threads
+        self._mutex = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, lang_code: str, sentence: str) -> Optional[tuple[str, ...]]:
+        key = (lang_code, sentence)
+        with self._mutex:
+            phonemes = self._entries.get(key)
+            if phonemes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return phonemes
+
+    def put(self, lang_code: str, sentence: str, phonemes: tuple[str, ...]) -> None:
+        key = (lang_code, sentence)
+        with self._mutex:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _entry_size(key, old)
+
+            self._entries[key] = phonemes
+            self._bytes += _entry_size(key, phonemes)
+
+            while len(self._entries) > self.max_entries:
+                old_key, old_val = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(old_key, old_val)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+
+def split_text(clean_text: str, split_pattern: str) -> list[str]:
+    """
+    Same chunking KPipeline applies internally, done up front.
+    """
+    return [t for t in re.split(split_pattern, clean_text.strip()) if t.strip()]
+
+
+def _entry_size(key: tuple[str, str], phonemes: tuple[str, ...]) -> int:
+    return sum(sys.getsizeof(s) for s in (*key, *phonemes))
+
+
+def iter_audio(
+    pipeline: KPipeline,
+    cache: Optional[PhonemeCache],
+    texts: list[str],
+    voice: str,
+    speed: float,
+) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Yields (text_index, float audio) per Kokoro segment. Each text is one
+    sentence/chunk (already split); on a cache hit its phonemes go straight
+    to `generate_from_tokens`, on a miss the full pipeline runs and the
+    phonemes it produced are remembered.
+    """
+    if cache is None:
+        for result in pipeline(texts, voice=voice, speed=speed, split_pattern=None):
+            if result.audio is not None and result.text_index is not None:
+                yield result.text_index, np.asarray(result.audio)
+        return
+
+    lang_code = pipeline.lang_code
+    for i, text in enumerate(texts):
+        sentence = " ".join(text.split())
+        if not sentence:
+            continue
+
+        phonemes = cache.get(lang_code, sentence)
+        if phonemes is not None:
+            for ps in phonemes:
+                for result in pipeline.generate_from_tokens(ps, voice=voice, speed=speed):
+                    if result.audio is not None:
+                        yield i, np.asarray(result.audio)
+            continue
+
+        seen: list[str] = []
+        for result in pipeline(sentence, voice=voice, speed=speed, split_pattern=None):
+            if result.phonemes:
+                seen.append(result.phonemes)
+            if result.audio is not None:
+                yield i, np.asarray(result.audio)
+        # Only a fully consumed sentence is cached
+        if seen:
+            cache.put(lang_code, sentence, tuple(seen))
+
+
+def build_phoneme_cache(max_entries: int) -> PhonemeCache | None:
+    if max_entries <= 0:
+        return None
+    return PhonemeCache(max_entries)
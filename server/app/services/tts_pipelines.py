@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.settings import Settings
+from app.services.tts_backends import SynthesisBackend
+
+from kokoro import KPipeline
+
+logger = logging.getLogger(__name__)
+
+# Kokoro voice names start with their language code (af_heart -> "a")
+LANG_CODES = frozenset("abefhijpz")
+
+
+def lang_for_voice(voice: str, default: str) -> str:
+    code = voice[:1].lower()
+    return code if code in LANG_CODES else default
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class _Loaded:
+    pipeline: KPipeline
+    size_bytes: int
+    uses: int = 0
+
+
+class KokoroPipelines:
+    """
+    One KPipeline per language code, loaded on first use through the
+    synthesis backend. Every pipeline shares the acoustic model of the
+    default-language pipeline, which is
+    always loaded; the other languages (their G2P state) are evicted
+    least-recently-used once their combined size exceeds `budget_bytes`
+    (0 = no limit). Sizes are the process RSS growth seen while loading,
+    or `estimate_bytes` where that cannot be measured.
+    """
+
+    def __init__(
+        self,
+        backend: SynthesisBackend,
+        default_lang: str,
+        repo_id: str,
+        budget_bytes: int,
+        estimate_bytes: int,
+    ):
+        self.backend = backend
+        self.default_lang = default_lang
+        self.repo_id = repo_id
+        self.budget_bytes = budget_bytes
+        self.estimate_bytes = estimate_bytes
+
+        self._loaded: OrderedDict[str, _Loaded] = OrderedDict()
+        # Loads run on executor threads
+        self._mutex = threading.Lock()
+
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.events: deque[dict] = deque(maxlen=32)
+
+    def for_voice(self, voice: str) -> KPipeline:
+        return self.get(lang_for_voice(voice, self.default_lang))
+
+    def get(self, lang_code: str) -> KPipeline:
+        with self._mutex:
+            entry = self._loaded.get(lang_code)
+            if entry is None:
+                entry = self._load(lang_code)
+            self._loaded.move_to_end(lang_code)
+            entry.uses += 1
+            self._evict()
+            return entry.pipeline
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "loaded": {
+                lang: {"size_bytes": e.size_bytes, "uses": e.uses}
+                for lang, e in self._loaded.items()
+            },
+            "evictable_bytes": self._evictable_bytes(),
+            "budget_bytes": self.budget_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_seconds": round(self.load_seconds, 3),
+            "events": list(self.events),
+        }
+
+    def _load(self, lang_code: str) -> _Loaded:
+        # Other languages reuse the default pipeline's model
+        model = None
+        if lang_code != self.default_lang:
+            default = self._loaded.get(self.default_lang) or self._load(self.default_lang)
+            model = default.pipeline.model
+
+        before = _rss_bytes()
+        t0 = time.perf_counter()
+        pipeline = self.backend.new_pipeline(lang_code, self.repo_id, model)
+        seconds = time.perf_counter() - t0
+        after = _rss_bytes()
+
+        if before is not None and after is not None:
+            size = max(0, after - before)
+        else:
+            size = self.estimate_bytes
+        entry = _Loaded(pipeline=pipeline, size_bytes=size)
+        self._loaded[lang_code] = entry
+
+        self.loads += 1
+        self.load_seconds += seconds
+        self.events.append(
+            {
+                "event": "load",
+                "lang": lang_code,
+                "seconds": round(seconds, 3),
+                "size_bytes": size,
+                "at": time.time(),
+            }
+        )
+        logger.info(f"Loaded Kokoro pipeline '{lang_code}' in {seconds:.2f}s.")
+        return entry
+
+    def _evictable_bytes(self) -> int:
+        return sum(
+            e.size_bytes for lang, e in self._loaded.items() if lang != self.default_lang
+        )
+
+    def _evict(self) -> None:
+        if self.budget_bytes <= 0:
+            return
+        # Oldest first; the default language and the one just used stay
+        for lang in list(self._loaded)[:-1]:
+            if self._evictable_bytes() <= self.budget_bytes:
+                return
+            if lang == self.default_lang:
+                continue
+            entry = self._loaded.pop(lang)
+            self.evictions += 1
+            self.events.append(
+                {
+                    "event": "evict",
+                    "lang": lang,
+                    "size_bytes": entry.size_bytes,
+                    "at": time.time(),
+                }
+            )
+            logger.info(f"Evicted Kokoro pipeline '{lang}'.")
+
+
+def build_kokoro_pipelines(settings: Settings, backend: SynthesisBackend) -> KokoroPipelines:
+    return KokoroPipelines(
+        backend=backend,
+        default_lang=settings.kokoro_lang_code,
+        repo_id=settings.kokoro_repo_id,
+        budget_bytes=settings.kokoro_pipeline_budget_mb * 1024 * 1024,
+        estimate_bytes=settings.kokoro_pipeline_estimate_mb * 1024 * 1024,
+    )
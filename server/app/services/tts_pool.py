@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from app.core.settings import Settings
+from app.services.audio_codecs import to_int16
+from app.services.tts_phonemes import (
+    PhonemeCache,
+    build_phoneme_cache,
+    iter_audio,
+    split_text,
+)
+from app.services.tts_backends import build_tts_backend
+from app.services.tts_pipelines import KokoroPipelines, build_kokoro_pipelines
+
+from kokoro import KPipeline
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------------------------
+# WORKER PROCESS SIDE
+# -------------------------------------------------------------------------
+_worker_pipelines: KokoroPipelines | None = None
+_worker_phonemes: PhonemeCache | None = None
+
+
+def _init_worker(settings: Settings) -> None:
+    global _worker_pipelines, _worker_phonemes
+
+    if settings.kokoro_worker_threads > 0:
+        import torch
+
+        torch.set_num_threads(settings.kokoro_worker_threads)
+
+    _worker_pipelines = build_kokoro_pipelines(settings, build_tts_backend(settings))
+    _worker_pipelines.get(settings.kokoro_lang_code)
+    _worker_phonemes = build_phoneme_cache(settings.kokoro_phoneme_cache_max_entries)
+
+
+def _worker_call(fn, *args):
+    # Every job reports the worker's cache and pipeline state with its result
+    return fn(*args), {
+        "phoneme_cache": _worker_phonemes.stats() if _worker_phonemes else None,
+        "pipelines": _worker_pipelines.stats() if _worker_pipelines else None,
+    }
+
+
+def _worker_synth(
+    text: str, voice: str, speed: float, split_pattern: Optional[str]
+) -> list[bytes]:
+    """
+    Runs inside a worker process. Returns one int16 PCM buffer per segment;
+    raw bytes keep the pickle over the result pipe to a single memcpy.
+    """
+    assert _worker_pipelines is not None, "worker not initialized"
+
+    pipeline = _worker_pipelines.for_voice(voice)
+    texts = split_text(text, split_pattern) if split_pattern else [text]
+    return [
+        to_int16(audio).tobytes()
+        for _i, audio in iter_audio(pipeline, _worker_phonemes, texts, voice, speed)
+    ]
+
+
+def _worker_synth_batch(texts: list[str], voice: str, speed: float) -> list[list[bytes]]:
+    assert _worker_pipelines is not None, "worker not initialized"
+
+    pipeline = _worker_pipelines.for_voice(voice)
+    return [
+        [seg.tobytes() for seg in per_text]
+        for per_text in synth_texts(pipeline, _worker_phonemes, texts, voice, speed)
+    ]
+
+
+def _worker_warm_up(voices: list[str], text: str) -> list[dict]:
+    assert _worker_pipelines is not None, "worker not initialized"
+    return warm_up_pipeline(_worker_pipelines, voices, text)
+
+
+def warm_up_pipeline(pipelines: KokoroPipelines, voices: list[str], text: str) -> list[dict]:
+    """
+    Loads each voice pack (KPipeline keeps them keyed in `pipeline.voices`)
+    into its language's pipeline and runs one throwaway synthesis so lazy
+    G2P/model state is paid here. Returns timed steps.
+    """
+    steps: list[dict] = []
+    for voice in voices:
+        pipeline = pipelines.for_voice(voice)
+        t0 = time.perf_counter()
+        pipeline.load_voice(voice)
+        steps.append({"step": "load_voice", "voice": voice, "seconds": time.perf_counter() - t0})
+
+        t0 = time.perf_counter()
+        for _result in pipeline(text, voice=voice):
+            pass
+        steps.append(
+            {"step": "first_inference", "voice": voice, "seconds": time.perf_counter() - t0}
+        )
+    return steps
+
+
+def synth_texts(
+    pipeline: KPipeline,
+    phonemes: PhonemeCache | None,
+    texts: list[str],
+    voice: str,
+    speed: float,
+) -> list[list[np.ndarray]]:
+    """
+    One pass over several texts, each rendered as its own segment group.
+    Returns int16 segments per text.
+    """
+    out: list[list[np.ndarray]] = [[] for _ in texts]
+    for i, audio in iter_audio(pipeline, phonemes, texts, voice, speed):
+        out[i].append(to_int16(audio))
+    return out
+
+
+# -------------------------------------------------------------------------
+# PARENT SIDE
+# -------------------------------------------------------------------------
+class KokoroWorkerPool:
+    """
+    N single-process executors, each holding its own pipelines.
+    Jobs go to the worker with the fewest in-flight jobs.
+    """
+
+    def __init__(self, size: int, settings: Settings):
+        # spawn: forking a process that already imported torch is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        self._workers = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=ctx,
+                initializer=_init_worker,
+                # Workers build everything (backend, pipelines, caches)
+                # from the same settings as the parent
+                initargs=(settings,),
+            )
+            for _ in range(size)
+        ]
+        self._inflight = [0] * size
+        self._completed = [0] * size
+        self._failed = [0] * size
+        self._job_seconds = [0.0] * size
+        self._reported: list[dict] = [{} for _ in range(size)]
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    async def synth_segments(
+        self,
+        text: str,
+        voice: str,
+        speed: float,
+        split_pattern: Optional[str],
+    ) -> list[np.ndarray]:
+        payloads = await self._submit(_worker_synth, text, voice, speed, split_pattern)
+        # frombuffer is a view over the received bytes, no further copy
+        return [np.frombuffer(p, dtype=np.int16) for p in payloads]
+
+    async def synth_batch(
+        self, texts: list[str], voice: str, speed: float
+    ) -> list[list[np.ndarray]]:
+        payloads = await self._submit(_worker_synth_batch, texts, voice, speed)
+        return [[np.frombuffer(p, dtype=np.int16) for p in per_text] for per_text in payloads]
+
+    async def warm_up(self, voices: list[str], text: str) -> list[dict]:
+        # Every worker has its own pipeline, so every worker is warmed
+        per_worker = await asyncio.gather(
+            *(
+                self._submit(_worker_warm_up, voices, text, idx=i)
+                for i in range(self.size)
+            )
+        )
+        return [
+            {**step, "worker": i} for i, steps in enumerate(per_worker) for step in steps
+        ]
+
+    def shutdown(self) -> None:
+        for w in self._workers:
+            w.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": [
+                {
+                    "inflight": self._inflight[i],
+                    "completed": self._completed[i],
+                    "failed": self._failed[i],
+                    "job_seconds": round(self._job_seconds[i], 3),
+                    **self._reported[i],
+                }
+                for i in range(self.size)
+            ],
+        }
+
+    def phoneme_stats(self) -> Optional[dict]:
+        """
+        Phoneme cache counters summed over workers, as of each worker's
+        last finished job.
+        """
+        reported = [r["phoneme_cache"] for r in self._reported if r.get("phoneme_cache")]
+        if not reported:
+            return None
+        total = {
+            k: sum(s[k] for s in reported)
+            for k in ("hits", "misses", "entries", "memory_bytes", "evictions")
+        }
+        lookups = total["hits"] + total["misses"]
+        total["hit_ratio"] = (total["hits"] / lookups) if lookups else 0.0
+        return total
+
+    async def _submit(self, fn, *args, idx: Optional[int] = None):
+        loop = asyncio.get_running_loop()
+        if idx is None:
+            idx = self._pick()
+
+        self._inflight[idx] += 1
+        started = time.perf_counter()
+        cf: Future = self._workers[idx].submit(_worker_call, fn, *args)
+        # Bookkeeping follows the process, not the awaiting request: a
+        # cancelled caller still occupies the worker until it finishes.
+        cf.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(self._on_done, idx, started, f)
+        )
+        result, _stats = await asyncio.wrap_future(cf, loop=loop)
+        return result
+
+    def _pick(self) -> int:
+        # Least-loaded; ties go to the worker that has done the least work
+        return min(
+            range(self.size), key=lambda i: (self._inflight[i], self._completed[i])
+        )
+
+    def _on_done(self, idx: int, started: float, f: Future) -> None:
+        self._inflight[idx] -= 1
+        if f.cancelled():
+            return
+        self._job_seconds[idx] += time.perf_counter() - started
+        if f.exception() is not None:
+            self._failed[idx] += 1
+        else:
+            self._completed[idx] += 1
+            self._reported[idx] = f.result()[1]
+
+
+def build_tts_pool(settings: Settings) -> KokoroWorkerPool | None:
+    if settings.kokoro_workers <= 0:
+        return None
+
+    logger.info(f"Starting {settings.kokoro_workers} Kokoro worker processes.")
+    return KokoroWorkerPool(size=settings.kokoro_workers, settings=settings)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+from app.core.settings import Settings
+from app.services.tts_segmenter import FAST_START_SECONDS, StreamingTtsSegmenter
+
+if TYPE_CHECKING:
+    from app.services.tts_runtime import SpeechJob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Speculation:
+    task: asyncio.Task
+    created: float
+
+
+class TtsPresynthesizer:
+    """
+    Short-lived store of speculative renders keyed by the job key (segment
+    text, voice, speed, format). A speech request for the same segment
+    claims the entry and attaches to the render, finished or not.
+    Unclaimed entries expire after `ttl_s`.
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[..., "SpeechJob"],
+        render: Callable[["SpeechJob"], Awaitable[bytes]],
+        ttl_s: float,
+        max_inflight: int,
+        max_entries: int,
+    ):
+        self._prepare = prepare
+        self._render = render
+        self.ttl_s = ttl_s
+        self.max_inflight = max(1, max_inflight)
+        self.max_entries = max(1, max_entries)
+
+        self._entries: OrderedDict[str, _Speculation] = OrderedDict()
+
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @property
+    def inflight(self) -> int:
+        return sum(1 for e in self._entries.values() if not e.task.done())
+
+    def speculate(self, text: str, voice: Optional[str], speed: Optional[float]) -> bool:
+        self._expire()
+
+        # Ahead of what anyone has asked for: behind every real request
+        job = self._prepare(
+            text, voice=voice, speed=speed, response_format="wav", priority="low"
+        )
+        if not job.clean_text.strip() or job.key in self._entries:
+            return False
+        if self.inflight >= self.max_inflight:
+            self.skipped += 1
+            return False
+
+        task = asyncio.ensure_future(self._render(job))
+        task.add_done_callback(self._on_done)
+        self._entries[job.key] = _Speculation(task=task, created=time.monotonic())
+        self.started += 1
+
+        while len(self._entries) > self.max_entries:
+            _key, old = self._entries.popitem(last=False)
+            self._discard(old)
+        return True
+
+    def claim(self, key: str) -> Optional[asyncio.Task]:
+        self._expire()
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.used += 1
+        return entry.task
+
+    def speculator(self, voice: Optional[str], speed: Optional[float]) -> "ReplySpeculator":
+        return ReplySpeculator(self, voice, speed)
+
+    def stats(self) -> dict:
+        self._expire()
+        settled = self.used + self.wasted
+        return {
+            "started": self.started,
+            "used": self.used,
+            "wasted": self.wasted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "use_ratio": (self.used / settled) if settled else 0.0,
+            "inflight": self.inflight,
+            "entries": len(self._entries),
+        }
+
+    def close(self) -> None:
+        for entry in self._entries.values():
+            entry.task.cancel()
+        self._entries.clear()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_s
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.created > cutoff:
+                break
+            del self._entries[key]
+            self._discard(entry)
+
+    def _discard(self, entry: _Speculation) -> None:
+        # Nobody asked for it; an unfinished render gives its slot back
+        self.wasted += 1
+        entry.task.cancel()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            self.failed += 1
+            logger.warning(f"Speculative TTS render failed: {e}")
+
+
+class ReplySpeculator:
+    """
+    Splits a streamed reply into the same segments the client will request
+    (same segmenter, same fast-start rule) and pre-synthesizes each one.
+
+    Fast start mirrors the client's one-shot timer (useTtsController): it
+    fires once, FAST_START_SECONDS after the reply was requested, and
+    cuts whatever has arrived by then, or nothing if that is shorter than
+    the segmenter's first_min_chars.
+    """
+
+    def __init__(
+        self, presynth: TtsPresynthesizer, voice: Optional[str], speed: Optional[float]
+    ):
+        self.presynth = presynth
+        self.voice = voice
+        self.speed = speed
+        self.segmenter = StreamingTtsSegmenter(20, 240, 60)
+        self._fast_start = asyncio.get_running_loop().call_later(
+            FAST_START_SECONDS, self._on_fast_start
+        )
+
+    def feed(self, delta: str) -> None:
+        self._submit(self.segmenter.feed(delta))
+
+    def finish(self) -> None:
+        self.close()
+        self._submit(self.segmenter.flush_all())
+
+    def close(self) -> None:
+        self._fast_start.cancel()
+
+    def _on_fast_start(self) -> None:
+        self._submit(self.segmenter.flush_partial_for_fast_start())
+
+    def _submit(self, segments: list[str]) -> None:
+        for s in segments:
+            self.presynth.speculate(s, self.voice, self.speed)
+
+
+def build_tts_presynth(
+    settings: Settings,
+    prepare: Callable[..., "SpeechJob"],
+    render: Callable[["SpeechJob"], Awaitable[bytes]],
+) -> TtsPresynthesizer | None:
+    if not settings.kokoro_presynth:
+        return None
+
+    return TtsPresynthesizer(
+        prepare=prepare,
+        render=render,
+        ttl_s=settings.kokoro_presynth_ttl_s,
+        max_inflight=settings.kokoro_presynth_max_inflight,
+        max_entries=settings.kokoro_presynth_max_entries,
+    )
@@ -1,106 +1,534 @@
 from __future__ import annotations
 
 import asyncio
-import io
-import wave
-from dataclasses import dataclass
-from typing import Optional
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
 
 import numpy as np
 
 from app.core.settings import Settings
+from app.services.audio_codecs import (
+    StreamEncoder,
+    encode_audio,
+    to_int16,
+    wav_bytes_from_int16,
+)
 from app.services.markdown_tts import markdown_to_tts_text
+from app.services.tts_cache import (
+    TtsAudioCache,
+    audio_model_fingerprint,
+    build_tts_cache,
+    make_audio_key,
+)
+from app.services.tts_batching import TtsMicroBatcher, build_tts_batcher
+from app.services.tts_phonemes import (
+    PhonemeCache,
+    build_phoneme_cache,
+    iter_audio,
+    split_text,
+)
+from app.services.tts_backends import build_tts_backend
+from app.services.tts_pipelines import KokoroPipelines, build_kokoro_pipelines
+from app.services.tts_presynth import TtsPresynthesizer, build_tts_presynth
+from app.services.tts_scheduler import PRIORITIES, TtsScheduler
+from app.services.tts_pool import (
+    KokoroWorkerPool,
+    build_tts_pool,
+    synth_texts,
+    warm_up_pipeline,
+)
 
-from kokoro import KPipeline
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SpeechJob:
+    """
+    A normalized synthesis request. `key` content-addresses its audio;
+    `priority` only orders it against other jobs.
+    """
+
+    clean_text: str
+    voice: str
+    speed: float
+    response_format: str
+    key: str
+    priority: int = PRIORITIES["normal"]
+
+
+@dataclass
+class WarmupStatus:
+    ready: bool = False
+    running: bool = False
+    steps: list[dict] = field(default_factory=list)
+    total_seconds: Optional[float] = None
+    error: Optional[str] = None
 
 
 @dataclass
 class KokoroRuntime:
-    pipeline: KPipeline
+    pipelines: Optional[KokoroPipelines]
     sample_rate: int
     default_voice: str
     default_speed: float
     split_pattern: str
+    stream_split_pattern: str
 
-    _lock: asyncio.Lock
+    scheduler: TtsScheduler
 
-    async def synthesize_wav(
+    # Model and backend, part of every audio key
+    model_fingerprint: str = ""
+
+    cache: Optional[TtsAudioCache] = None
+    pool: Optional[KokoroWorkerPool] = None
+    batcher: Optional[TtsMicroBatcher] = None
+    phonemes: Optional[PhonemeCache] = None
+    presynth: Optional[TtsPresynthesizer] = None
+    warmup: WarmupStatus = field(default_factory=WarmupStatus)
+
+    def prepare(
         self,
         text_markdown: str,
         voice: Optional[str] = None,
         speed: Optional[float] = None,
-    ) -> bytes:
+        response_format: str = "wav",
+        priority: str = "normal",
+        markdown: bool = True,
+        stream: bool = False,
+    ) -> SpeechJob:
         """
-        Takes markdown input, cleans for TTS, generates WAV bytes.
+        Cleans markdown for TTS (unless the text is already clean) and
+        resolves defaults into a SpeechJob. `stream` says whether the job
+        goes to render_stream, which splits the text differently, so the
+        two renders get different keys.
         """
-        clean = markdown_to_tts_text(text_markdown)
-        if not clean.strip():
-            return _empty_wav(self.sample_rate)
-
+        clean = markdown_to_tts_text(text_markdown) if markdown else text_markdown
         use_voice = voice or self.default_voice
         use_speed = float(speed) if speed is not None else self.default_speed
 
-        async with self._lock:
-            loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(
-                None,
-                self._synth_wav_sync,
+        return SpeechJob(
+            clean_text=clean,
+            voice=use_voice,
+            speed=use_speed,
+            response_format=response_format,
+            key=make_audio_key(
                 clean,
                 use_voice,
                 use_speed,
+                self.sample_rate,
+                response_format,
+                model=self.model_fingerprint,
+                split_pattern=self.stream_split_pattern if stream else self.split_pattern,
+            ),
+            priority=PRIORITIES[priority],
+        )
+
+    async def synthesize_wav(
+        self,
+        text_markdown: str,
+        voice: Optional[str] = None,
+        speed: Optional[float] = None,
+    ) -> bytes:
+        """
+        Takes markdown input, cleans for TTS, generates WAV bytes.
+        """
+        return await self.render_audio(self.prepare(text_markdown, voice, speed))
+
+    async def stream_wav(
+        self,
+        text_markdown: str,
+        voice: Optional[str] = None,
+        speed: Optional[float] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Takes markdown input, cleans for TTS, yields a WAV header with unknown
+        length followed by int16 PCM frames as soon as each segment is ready.
+        """
+        job = self.prepare(text_markdown, voice, speed, stream=True)
+        async for chunk in self.render_stream(job):
+            yield chunk
+
+    async def render_audio(self, job: SpeechJob) -> bytes:
+        speculative = await self._claim_speculative(job)
+        if speculative is not None:
+            return speculative
+        return await self._render_audio(job)
+
+    async def _render_audio(self, job: SpeechJob) -> bytes:
+        if not job.clean_text.strip():
+            return await self._encode(np.zeros(1, dtype=np.int16), job.response_format)
+
+        if self.cache:
+            cached = await self.cache.get(job.key)
+            if cached is not None:
+                return cached
+
+        segments = await self._render_segments(job)
+        pcm = np.concatenate(segments) if segments else np.zeros(1, dtype=np.int16)
+        audio = await self._encode(pcm, job.response_format)
+
+        if self.cache:
+            await self.cache.put(job.key, audio)
+        return audio
+
+    async def render_stream(self, job: SpeechJob) -> AsyncIterator[bytes]:
+        speculative = await self._claim_speculative(job)
+        if speculative is not None:
+            yield speculative
+            return
+
+        if self.cache:
+            cached = await self.cache.get(job.key)
+            if cached is not None:
+                yield cached
+                return
+
+        encoder = StreamEncoder(job.response_format, self.sample_rate)
+        # Compressed encoders are CPU work; keep them off the event loop
+        offload = job.response_format not in ("wav", "pcm")
+
+        sent: list[bytes] = [encoder.header()]
+        if sent[0]:
+            yield sent[0]
+
+        if job.clean_text.strip():
+            async for pcm in self._stream_segments(job):
+                data = (
+                    await asyncio.to_thread(encoder.feed, pcm)
+                    if offload
+                    else encoder.feed(pcm)
+                )
+                if data:
+                    sent.append(data)
+                    yield data
+
+        tail = await asyncio.to_thread(encoder.finish) if offload else encoder.finish()
+        if tail:
+            sent.append(tail)
+            yield tail
+
+        # Only complete renders are cached; a disconnect never gets here.
+        # WAV is re-wrapped so the cached copy carries real sizes.
+        if self.cache and len(sent) > 1:
+            if job.response_format == "wav":
+                audio = wav_bytes_from_int16(
+                    np.frombuffer(b"".join(sent[1:]), dtype=np.int16), self.sample_rate
+                )
+            else:
+                audio = b"".join(sent)
+            await self.cache.put(job.key, audio)
+
+    async def _claim_speculative(self, job: SpeechJob) -> Optional[bytes]:
+        if not self.presynth:
+            return None
+        task = self.presynth.claim(job.key)
+        if task is None:
+            return None
+        # Speculation queues at low priority; a render someone is now
+        # waiting for moves up to their priority (a micro-batch that has
+        # already formed keeps its own)
+        self.scheduler.promote(task, job.priority)
+        try:
+            # Shielded so a client that disconnects does not cancel a
+            # render the audio cache can still keep
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            # Already logged by the presynthesizer; render normally
+            return None
+
+    async def _encode(self, pcm: np.ndarray, fmt: str) -> bytes:
+        if fmt in ("wav", "pcm"):
+            return encode_audio(pcm, self.sample_rate, fmt)
+        return await asyncio.to_thread(encode_audio, pcm, self.sample_rate, fmt)
+
+    async def warm_up(self, voices: list[str], text: str) -> WarmupStatus:
+        """
+        Preloads voices and runs one synthesis per voice (bypassing the audio
+        cache) so the first real request does not pay for lazy loading.
+        """
+        status = self.warmup
+        status.running = True
+        started = time.perf_counter()
+        use_voices = list(dict.fromkeys([self.default_voice, *voices]))
+
+        try:
+            if self.pool:
+                steps = await self.pool.warm_up(use_voices, text)
+            else:
+                loop = asyncio.get_running_loop()
+                steps = await self._run_exclusive(
+                    PRIORITIES["high"],
+                    lambda: loop.run_in_executor(
+                        None, warm_up_pipeline, self.pipelines, use_voices, text
+                    ),
+                )
+            status.steps.extend(steps)
+            status.ready = True
+            logger.info(
+                f"TTS warm-up done for {len(use_voices)} voice(s) in "
+                f"{time.perf_counter() - started:.2f}s."
+            )
+        except Exception as e:
+            status.error = str(e)
+            logger.error(f"TTS warm-up failed: {e}")
+        finally:
+            status.running = False
+            status.total_seconds = time.perf_counter() - started
+
+        return status
+
+    def stats(self) -> dict:
+        if self.pool:
+            phonemes = self.pool.phoneme_stats()
+        else:
+            phonemes = self.phonemes.stats() if self.phonemes else None
+
+        return {
+            "cache": self.cache.stats() if self.cache else None,
+            "pool": self.pool.stats() if self.pool else None,
+            "batching": self.batcher.stats() if self.batcher else None,
+            # With a worker pool these are reported per worker under "pool"
+            "pipelines": self.pipelines.stats() if self.pipelines else None,
+            "phoneme_cache": phonemes,
+            "queue": self.scheduler.stats(),
+            "presynth": self.presynth.stats() if self.presynth else None,
+            "warmup": asdict(self.warmup),
+        }
+
+    def close(self) -> None:
+        if self.presynth:
+            self.presynth.close()
+        if self.pool:
+            self.pool.shutdown()
+
+    async def _render_segments(self, job: SpeechJob) -> list[np.ndarray]:
+        if self.batcher:
+            chunks = split_text(job.clean_text, self.split_pattern)
+            return await self.batcher.submit(chunks, job.voice, job.speed, job.priority)
+
+        if self.pool:
+            return await self._run_exclusive(
+                job.priority,
+                lambda: self.pool.synth_segments(  # type: ignore[union-attr]
+                    job.clean_text, job.voice, job.speed, self.split_pattern
+                ),
             )
 
-    def _synth_wav_sync(self, clean_text: str, voice: str, speed: float) -> bytes:
-        chunks: list[np.ndarray] = []
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        return await self._run_exclusive(
+            job.priority,
+            lambda: loop.run_in_executor(
+                None,
+                self._synth_segments_sync,
+                job.clean_text,
+                job.voice,
+                job.speed,
+                cancel,
+            ),
+            cancel=cancel,
+        )
 
-        generator = self.pipeline(
-            clean_text,
-            voice=voice,
-            speed=speed,
-            split_pattern=self.split_pattern,
+    async def _synth_batch(
+        self, texts: list[str], voice: str, speed: float, priority: int
+    ) -> list[list[np.ndarray]]:
+        # Runner for the micro-batcher: one pipeline call for the whole batch
+        if self.pool:
+            return await self._run_exclusive(
+                priority,
+                lambda: self.pool.synth_batch(texts, voice, speed),  # type: ignore[union-attr]
+            )
+
+        loop = asyncio.get_running_loop()
+        return await self._run_exclusive(
+            priority,
+            lambda: loop.run_in_executor(None, self._synth_batch_sync, texts, voice, speed),
         )
 
-        for _i, (_gs, _ps, audio) in enumerate(generator):
-            arr = np.asarray(audio)
-            if arr.ndim > 1:
-                arr = arr.reshape(-1)
-            chunks.append(arr)
+    async def _run_exclusive(
+        self,
+        priority: int,
+        start: Callable[[], Awaitable],
+        cancel: Optional[threading.Event] = None,
+    ):
+        """
+        Runs `start()` while holding a scheduler slot. If the caller goes
+        away, `cancel` asks the work to stop at its next segment boundary;
+        the slot is only handed on once the work has actually stopped.
+        """
+        await self.scheduler.acquire(priority)
+        try:
+            fut = asyncio.ensure_future(start())
+        except BaseException:
+            self.scheduler.release()
+            raise
+
+        try:
+            result = await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            if cancel is not None:
+                cancel.set()
+            fut.add_done_callback(self._release_slot)
+            raise
+        except BaseException:
+            self.scheduler.release()
+            raise
+
+        self.scheduler.release()
+        return result
+
+    def _release_slot(self, fut: asyncio.Future) -> None:
+        if not fut.cancelled():
+            fut.exception()  # mark retrieved; the caller is gone
+        self.scheduler.release()
+
+    async def _stream_segments(self, job: SpeechJob) -> AsyncIterator[np.ndarray]:
+        if self.pool:
+            async for pcm in self._stream_segments_pool(job):
+                yield pcm
+            return
+
+        # Step the Kokoro generator one segment at a time on the executor so
+        # each segment can be sent while the next one is being synthesized.
+        loop = asyncio.get_running_loop()
+        await self.scheduler.acquire(job.priority)
 
+        generator = self._iter_audio(
+            split_text(job.clean_text, self.stream_split_pattern), job.voice, job.speed
+        )
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                pending = loop.run_in_executor(None, _next_segment, generator)
+                # Shield so a client disconnect does not orphan the worker
+                # thread while it still owns the pipeline.
+                audio = await asyncio.shield(pending)
+                pending = None
+                if audio is None:
+                    break
+                yield to_int16(audio)
+        finally:
+            if pending is not None and not pending.done():
+                # Release only once the in-flight segment has finished.
+                pending.add_done_callback(
+                    lambda fut: self._release_stream(generator, fut)
+                )
+            else:
+                self._release_stream(generator, pending)
+
+    async def _stream_segments_pool(self, job: SpeechJob) -> AsyncIterator[np.ndarray]:
+        # Sentences are dispatched one ahead of the one being sent, so two
+        # workers can overlap synthesis of consecutive sentences.
+        chunks = split_text(job.clean_text, self.stream_split_pattern)
         if not chunks:
-            return _empty_wav(self.sample_rate)
+            return
+
+        def submit(chunk: str, priority: int) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self._run_exclusive(
+                    priority,
+                    lambda: self.pool.synth_segments(  # type: ignore[union-attr]
+                        chunk, job.voice, job.speed, None
+                    ),
+                )
+            )
 
-        audio_all = np.concatenate(chunks, axis=0)
+        # Only the sentence being waited on keeps the job's priority;
+        # the lookahead is prefetch.
+        lookahead = PRIORITIES["low"]
+        current = submit(chunks[0], job.priority)
+        upcoming: Optional[asyncio.Task] = None
+        try:
+            for i in range(len(chunks)):
+                upcoming = submit(chunks[i + 1], lookahead) if i + 1 < len(chunks) else None
+                for pcm in await current:
+                    yield pcm
+                if upcoming is None:
+                    break
+                current = upcoming
+        finally:
+            for task in (current, upcoming):
+                if task is not None and not task.done():
+                    task.cancel()
 
-        # Convert to int16 PCM
-        if audio_all.dtype != np.int16:
-            audio_all = np.clip(audio_all, -1.0, 1.0)
-            audio_all = (audio_all * 32767.0).astype(np.int16)
+    def _release_stream(self, generator, fut: Optional[asyncio.Future]) -> None:
+        if fut is not None and not fut.cancelled():
+            fut.exception()  # mark retrieved; the consumer is gone
+        generator.close()
+        self.scheduler.release()
 
-        return _wav_bytes_from_int16(audio_all, self.sample_rate)
+    def _iter_audio(
+        self, texts: list[str], voice: str, speed: float
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        # Lazy, so a first-use pipeline load happens on the executor thread
+        pipeline = self.pipelines.for_voice(voice)  # type: ignore[union-attr]
+        yield from iter_audio(pipeline, self.phonemes, texts, voice, speed)
 
+    def _synth_batch_sync(
+        self, texts: list[str], voice: str, speed: float
+    ) -> list[list[np.ndarray]]:
+        pipeline = self.pipelines.for_voice(voice)  # type: ignore[union-attr]
+        return synth_texts(pipeline, self.phonemes, texts, voice, speed)
 
-def _wav_bytes_from_int16(pcm: np.ndarray, sample_rate: int) -> bytes:
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)  # int16
-        wf.setframerate(sample_rate)
-        wf.writeframes(pcm.tobytes())
-    return buf.getvalue()
+    def _synth_segments_sync(
+        self, clean_text: str, voice: str, speed: float, cancel: threading.Event
+    ) -> list[np.ndarray]:
+        chunks = split_text(clean_text, self.split_pattern)
+        out: list[np.ndarray] = []
+        for _i, audio in self._iter_audio(chunks, voice, speed):
+            if cancel.is_set():
+                # Nobody is waiting for the rest
+                break
+            out.append(to_int16(audio))
+        return out
 
 
-def _empty_wav(sample_rate: int) -> bytes:
-    return _wav_bytes_from_int16(np.zeros(1, dtype=np.int16), sample_rate)
+def _next_segment(generator) -> Optional[np.ndarray]:
+    for _i, audio in generator:
+        return audio
+    return None
 
 
 async def build_tts_runtime(settings: Settings) -> KokoroRuntime:
-    pipeline = KPipeline(lang_code=settings.kokoro_lang_code)
+    # With a worker pool each process owns its own pipelines; the parent
+    # does not need to load the model at all.
+    pool = build_tts_pool(settings)
+    pipelines = None
+    init_steps: list[dict] = []
+    if not pool:
+        pipelines = build_kokoro_pipelines(settings, build_tts_backend(settings))
+        # The default language (and the shared model) loads up front
+        t0 = time.perf_counter()
+        pipelines.get(settings.kokoro_lang_code)
+        init_steps.append({"step": "pipeline_init", "seconds": time.perf_counter() - t0})
 
-    return KokoroRuntime(
-        pipeline=pipeline,
+    runtime = KokoroRuntime(
+        pipelines=pipelines,
         sample_rate=settings.kokoro_sample_rate,
         default_voice=settings.kokoro_voice,
         default_speed=settings.kokoro_speed,
         split_pattern=settings.kokoro_split_pattern,
-        _lock=asyncio.Lock(),
+        stream_split_pattern=settings.kokoro_stream_split_pattern,
+        # One slot per worker process, or the single in-process pipeline
+        scheduler=TtsScheduler(pool.size if pool else 1),
+        model_fingerprint=audio_model_fingerprint(settings),
+        cache=build_tts_cache(settings),
+        pool=pool,
+        # Workers keep their own phoneme caches
+        phonemes=(
+            None if pool else build_phoneme_cache(settings.kokoro_phoneme_cache_max_entries)
+        ),
     )
+    runtime.batcher = build_tts_batcher(settings, runtime._synth_batch)
+    runtime.presynth = build_tts_presynth(settings, runtime.prepare, runtime._render_audio)
+    runtime.warmup.steps.extend(init_steps)
+    # Without a warm-up phase the runtime is ready as soon as it exists
+    runtime.warmup.ready = not settings.kokoro_warmup
+    return runtime
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+
+# Lower runs first. "high" is the segment the listener is waiting on,
+# "low" is prefetch of segments further ahead.
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+@dataclass
+class _WaitStats:
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+
+class TtsScheduler:
+    """
+    Hands out `capacity` synthesis slots (1 for the in-process pipeline,
+    one per worker process) in priority order, FIFO within a priority.
+    Callers that are cancelled while waiting leave the queue untouched.
+    A waiting task can be moved up with `promote`, e.g. when a request
+    attaches to a speculative render that is still queued.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._busy = 0
+        self._heap: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # Waiting task -> (priority it is queued at, its future)
+        self._waiting: dict[asyncio.Task, tuple[int, asyncio.Future]] = {}
+
+        self.cancelled_waiting = 0
+        self._waits: dict[int, _WaitStats] = {p: _WaitStats() for p in PRIORITIES.values()}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _p, fut in self._waiting.values() if not fut.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self._busy < self.capacity and not self.queue_depth:
+            self._busy += 1
+            self._waits.setdefault(priority, _WaitStats()).add(0.0)
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), fut))
+        task = asyncio.current_task()
+        if task is not None:
+            self._waiting[task] = (priority, fut)
+        started = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted in the same tick we were cancelled: pass it on
+                self.release()
+            self.cancelled_waiting += 1
+            raise
+        finally:
+            self._waiting.pop(task, None)  # type: ignore[arg-type]
+
+        self._waits.setdefault(priority, _WaitStats()).add(time.perf_counter() - started)
+
+    def promote(self, task: asyncio.Task, priority: int) -> bool:
+        """
+        Requeues `task` at `priority` if it is waiting for a slot at a lower
+        one. Returns False if the task is not waiting here.
+        """
+        entry = self._waiting.get(task)
+        if entry is None or entry[1].done():
+            return False
+        current, fut = entry
+        if priority < current:
+            # The old heap entry is skipped once the future is granted
+            self._waiting[task] = (priority, fut)
+            heapq.heappush(self._heap, (priority, next(self._seq), fut))
+        return True
+
+    def release(self) -> None:
+        # The slot goes straight to the next live waiter
+        while self._heap:
+            _p, _s, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._busy -= 1
+
+    def stats(self) -> dict:
+        names = {v: k for k, v in PRIORITIES.items()}
+        return {
+            "capacity": self.capacity,
+            "busy": self._busy,
+            "queue_depth": self.queue_depth,
+            "cancelled_waiting": self.cancelled_waiting,
+            "wait": {
+                names.get(p, str(p)): {
+                    "count": w.count,
+                    "mean_ms": (w.total_s / w.count * 1000.0) if w.count else 0.0,
+                    "max_ms": w.max_s * 1000.0,
+                }
+                for p, w in sorted(self._waits.items())
+            },
+        }
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+CODE_PLACEHOLDER = "\nCheck the code below.\n"
+
+# Delay after which the client flushes a partial first segment
+FAST_START_SECONDS = 0.35
+
+_BOUNDARY_CHARS = "\n.!?…;:"
+
+
+class StreamingTtsSegmenter:
+    """
+    Server-side port of the client's StreamingTtsSegmenter
+    (client/src/lib/audio/StreamingTtsSegmenter.ts). Keep the two in sync:
+    identical segments mean identical audio cache keys on both paths.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 240, first_min_chars: int = 60):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_min_chars = first_min_chars
+
+        self._in_code = False
+        self._raw_buf = ""
+        self._prose_buf = ""
+        self._first_segment_emitted = False
+
+    @property
+    def first_segment_emitted(self) -> bool:
+        return self._first_segment_emitted
+
+    def feed(self, delta: str) -> list[str]:
+        if not delta:
+            return []
+        self._raw_buf += delta
+
+        while True:
+            idx = self._raw_buf.find("```")
+            if idx == -1:
+                if not self._in_code:
+                    self._prose_buf += self._raw_buf
+                self._raw_buf = ""
+                break
+
+            before = self._raw_buf[:idx]
+            after = self._raw_buf[idx + 3 :]
+
+            if not self._in_code:
+                self._prose_buf += before
+                self._prose_buf += CODE_PLACEHOLDER
+                self._in_code = True
+            else:
+                self._in_code = False
+
+            self._raw_buf = after
+
+        return self._drain(force=False)
+
+    def flush_all(self) -> list[str]:
+        return self._drain(force=True)
+
+    def flush_partial_for_fast_start(self) -> list[str]:
+        if self._first_segment_emitted:
+            return []
+        if len(self._prose_buf.strip()) < self.first_min_chars:
+            return []
+
+        # Emit up to max_chars even without punctuation.
+        cut = min(len(self._prose_buf), self.max_chars)
+        chunk = self._prose_buf[:cut]
+        self._prose_buf = self._prose_buf[cut:]
+
+        trimmed = chunk.strip()
+        if not trimmed:
+            return []
+        self._first_segment_emitted = True
+        return [trimmed]
+
+    def _drain(self, force: bool) -> list[str]:
+        out: list[str] = []
+
+        while self._prose_buf:
+            window = self._prose_buf[: self.max_chars]
+
+            # Last punctuation/newline boundary in the window
+            cut = -1
+            for i in range(len(window) - 1, -1, -1):
+                if window[i] in _BOUNDARY_CHARS:
+                    cut = i + 1
+                    break
+
+            if cut == -1:
+                if len(self._prose_buf) >= self.max_chars:
+                    cut = self.max_chars
+                elif force:
+                    cut = len(self._prose_buf)
+                else:
+                    break
+
+            chunk = self._prose_buf[:cut]
+            self._prose_buf = self._prose_buf[cut:]
+
+            trimmed = chunk.strip()
+            if not trimmed:
+                continue
+
+            threshold = self.min_chars if self._first_segment_emitted else self.first_min_chars
+            if not force and len(trimmed) < threshold:
+                # Put it back and wait for more
+                self._prose_buf = chunk + self._prose_buf
+                break
+
+            out.append(trimmed)
+            self._first_segment_emitted = True
+
+        return out
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from app.core.settings import Settings
+
+
+@dataclass
+class TurnUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Replayed from the completion cache: the counts are the original
+    # generation's, and no tokens were processed for this request
+    cached: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def as_openai(self) -> dict:
+        usage = {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+        }
+        if self.cached:
+            usage["prompt_tokens_details"] = {"cached_tokens": self.prompt_tokens}
+        return usage
+
+
+@dataclass
+class RequestRecord:
+    at: float
+    session_id: str
+    model: str
+    source: str  # "llm", "coalesced" or "cache"
+    complete: bool
+    prompt_tokens: int
+    completion_tokens: int
+    # Milliseconds, except tokens_per_second
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """
+    `Server-Timing` header value for the millisecond entries.
+    """
+    return ", ".join(
+        f"{name};dur={ms:.1f}" for name, ms in timings.items() if not name.endswith("_per_second")
+    )
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None}
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"p50": at(0.5), "p95": at(0.95)}
+
+
+class UsageStore:
+    """
+    The last `max_records` chat requests with their token usage and
+    timings, plus running totals since start. Tokens are only counted for
+    requests that actually ran the model (not cache hits or coalesced
+    duplicates).
+    """
+
+    def __init__(self, max_records: int):
+        self.records: deque[RequestRecord] = deque(maxlen=max_records)
+
+        self.requests = 0
+        self.by_source: dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started_at = time.time()
+
+    def record(self, rec: RequestRecord) -> None:
+        self.records.append(rec)
+        self.requests += 1
+        self.by_source[rec.source] = self.by_source.get(rec.source, 0) + 1
+        if rec.source == "llm":
+            self.prompt_tokens += rec.prompt_tokens
+            self.completion_tokens += rec.completion_tokens
+
+    def query(
+        self,
+        session_id: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        out = []
+        for rec in reversed(self.records):
+            if session_id is not None and rec.session_id != session_id:
+                continue
+            if since is not None and rec.at < since:
+                break
+            out.append(asdict(rec))
+            if len(out) >= limit:
+                break
+        return out
+
+    def stats(self) -> dict:
+        recent = [r for r in self.records if r.source == "llm" and r.complete]
+
+        def timing(name: str) -> list[float]:
+            return [r.timings[name] for r in recent if r.timings.get(name) is not None]
+
+        return {
+            "requests": self.requests,
+            "by_source": dict(self.by_source),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "since": self.started_at,
+            # Over the retained records
+            "timings_ms": {
+                name: _percentiles(timing(name))
+                for name in ("retrieval", "prompt", "queue", "ttft", "generation")
+            },
+            "tokens_per_second": _percentiles(timing("tokens_per_second")),
+        }
+
+
+def build_usage_store(settings: Settings) -> UsageStore:
+    return UsageStore(max_records=settings.chat_usage_max_records)
@@ -0,0 +1,118 @@
+"""
+Chat pipeline overhead per token: direct path vs. LangGraph.
+
+    uv run python -m benchmarks.bench_chat_pipeline [--tokens 50 500 2000]
+
+The LLM stage is replaced by one that yields its deltas immediately and
+the memory writer by a no-op, so only what each pipeline adds between
+the model stream and the caller is measured. Reported per reply length
+(median seconds per turn, and microseconds per token over the bare
+generator):
+
+- baseline: iterating the fake LLM stage directly
+- direct: DirectPipeline
+- langgraph: LangGraphPipeline (respond -> persist graph)
+
+Every pipeline must yield the same deltas and persist the same reply.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, AsyncIterator
+
+from app.services.chat_pipeline import DirectPipeline, GenerationRun, LangGraphPipeline
+
+
+class _InstantLlm:
+    def __init__(self, deltas: list[str]):
+        self.deltas = deltas
+
+    async def generate(
+        self, prompt: str, session_id: str, sampling: dict[str, Any], run: GenerationRun
+    ) -> AsyncIterator[str]:
+        for d in self.deltas:
+            yield d
+        run.prompt_tokens = len(prompt)
+        run.completion_tokens = len(self.deltas)
+
+
+class _NullWriter:
+    def __init__(self):
+        self.last = ""
+
+    async def enqueue(self, session_id: str, user_query: str, response: str) -> None:
+        self.last = response
+
+
+async def _collect(stream: AsyncIterator[str]) -> list[str]:
+    return [d async for d in stream]
+
+
+async def _median_seconds(make_stream, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        async for _ in make_stream():
+            pass
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+async def run(token_counts: list[int], repeat: int) -> dict:
+    results = []
+    for n in token_counts:
+        deltas = [f"tok{i} " for i in range(n)]
+        llm = _InstantLlm(deltas)
+        writer = _NullWriter()
+        pipelines = {
+            "direct": DirectPipeline(llm, writer),  # type: ignore[arg-type]
+            "langgraph": LangGraphPipeline(llm, writer),  # type: ignore[arg-type]
+        }
+
+        def turn(pipeline):
+            return lambda: pipeline.run("prompt", "query", "bench", {}, GenerationRun())
+
+        parity = True
+        for pipeline in pipelines.values():
+            writer.last = ""
+            out = await _collect(turn(pipeline)())
+            parity &= out == deltas and writer.last == "".join(deltas)
+
+        baseline = await _median_seconds(
+            lambda: llm.generate("prompt", "bench", {}, GenerationRun()), repeat
+        )
+        row: dict[str, Any] = {"tokens": n, "parity": parity, "baseline_s": baseline}
+        for name, pipeline in pipelines.items():
+            seconds = await _median_seconds(turn(pipeline), repeat)
+            row[f"{name}_s"] = seconds
+            row[f"{name}_us_per_token"] = (seconds - baseline) / n * 1e6
+        results.append(row)
+
+    return {"benchmark": "chat_pipeline", "repeat": repeat, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[50, 500, 2_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.tokens, args.repeat))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(text)
+
+    if not all(r["parity"] for r in report["results"]):
+        raise SystemExit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Chat SSE framing: per-delta json.dumps vs. chunk template and coalescing.
+
+    uv run python -m benchmarks.bench_chat_sse [--tokens 2000] [--rate 1000]
+
+Two parts, both reporting frames/sec and CPU milliseconds per 1k tokens:
+
+- serialize: every delta framed as fast as possible, with the old
+  per-delta json.dumps of the whole chunk dict ("dict_json"), the chunk
+  template with json ("template_json") and, if installed, with orjson
+  ("template_orjson"). frames/sec here is per CPU second.
+- stream: deltas arriving at `--rate` tokens/s, framed with the template
+  through coalesce_deltas for each `--windows` value (0 = one frame per
+  delta) and written to a local socket, one write per frame as the ASGI
+  server does. frames/sec is per wall-clock second, and CPU covers the
+  event loop, encoding and socket writes.
+
+Frames are decoded back and checked against the deltas.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import time
+from typing import AsyncIterator
+
+from app.services import chat_sse
+from app.services.chat_sse import ChatChunkEncoder, coalesce_deltas
+
+_RESP_ID = "chatcmpl_1700000000000"
+_CREATED = 1_700_000_000
+_MODEL = "local-model"
+
+# Token-sized pieces, including ones that need escaping or are non-ASCII
+_WORDS = [
+    "the", " service", " reads", " `config.yaml`", " and", " starts", " three", " workers",
+    ".", "\n\n", " Café", " naïve", " \"quoted\"", " 日本語", " 🙂",
+]
+
+
+def make_deltas(n: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    return [rnd.choice(_WORDS) for _ in range(n)]
+
+
+def _dict_json_frame(delta: str) -> bytes:
+    # What event_gen did per delta before the chunk template
+    obj = {
+        "id": _RESP_ID,
+        "object": "chat.completion.chunk",
+        "created": _CREATED,
+        "model": _MODEL,
+        "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _content(frames: list[bytes]) -> str:
+    return "".join(json.loads(f[6:])["choices"][0]["delta"]["content"] for f in frames)
+
+
+def _serialize(encode, deltas: list[str], repeat: int) -> dict:
+    samples = []
+    frames: list[bytes] = []
+    for _ in range(repeat):
+        t0 = time.process_time()
+        frames = [encode(d) for d in deltas]
+        samples.append(time.process_time() - t0)
+    cpu = statistics.median(samples)
+    return {
+        "parity": _content(frames) == "".join(deltas),
+        "frames_per_s": len(deltas) / cpu if cpu else None,
+        "cpu_ms_per_1k_tokens": cpu / len(deltas) * 1e6,
+        "bytes_per_token": sum(len(f) for f in frames) / len(deltas),
+    }
+
+
+async def _paced(deltas: list[str], rate: float) -> AsyncIterator[str]:
+    gap = 1.0 / rate
+    start = time.perf_counter()
+    for i, d in enumerate(deltas):
+        delay = start + i * gap - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield d
+
+
+async def _stream(deltas: list[str], rate: float, window_ms: float, max_chars: int) -> dict:
+    chunks = ChatChunkEncoder(_RESP_ID, _CREATED, _MODEL)
+    source = _paced(deltas, rate)
+    if window_ms > 0:
+        source = coalesce_deltas(source, window_ms / 1000.0, max_chars)
+
+    ours, theirs = socket.socketpair()
+    _, writer = await asyncio.open_connection(sock=ours)
+    reader, peer = await asyncio.open_connection(sock=theirs)
+    received = asyncio.create_task(reader.read())
+
+    frames: list[bytes] = []
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    async for text in source:
+        frame = chunks.content(text)
+        frames.append(frame)
+        writer.write(frame)
+        await writer.drain()
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    writer.close()
+    await writer.wait_closed()
+    sent = await received == b"".join(frames)
+    peer.close()
+
+    return {
+        "window_ms": window_ms,
+        "parity": sent and _content(frames) == "".join(deltas),
+        "frames": len(frames),
+        "frames_per_s": len(frames) / wall,
+        "cpu_ms_per_1k_tokens": cpu / len(deltas) * 1e6,
+        "bytes_per_token": sum(len(f) for f in frames) / len(deltas),
+    }
+
+
+def run(tokens: int, repeat: int, rate: float, windows: list[float], max_chars: int) -> dict:
+    deltas = make_deltas(tokens)
+    chunks = ChatChunkEncoder(_RESP_ID, _CREATED, _MODEL)
+
+    serialize = {"dict_json": _serialize(_dict_json_frame, deltas, repeat)}
+    orjson_available = chat_sse.orjson_available
+    try:
+        chat_sse.orjson_available = False
+        serialize["template_json"] = _serialize(chunks.content, deltas, repeat)
+    finally:
+        chat_sse.orjson_available = orjson_available
+    if orjson_available:
+        serialize["template_orjson"] = _serialize(chunks.content, deltas, repeat)
+
+    stream = [asyncio.run(_stream(deltas, rate, w, max_chars)) for w in windows]
+
+    return {
+        "benchmark": "chat_sse",
+        "tokens": tokens,
+        "repeat": repeat,
+        "rate": rate,
+        "serialize": serialize,
+        "stream": stream,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rate", type=float, default=1_000.0, help="Tokens/s in the stream part")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 20.0, 50.0])
+    parser.add_argument("--max-chars", type=int, default=256)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results here")
+    args = parser.parse_args()
+
+    report = run(args.tokens, args.repeat, args.rate, args.windows, args.max_chars)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(text)
+
+    rows = [*report["serialize"].values(), *report["stream"]]
+    if not all(r["parity"] for r in rows):
+        raise SystemExit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
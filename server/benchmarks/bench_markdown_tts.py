@@ -0,0 +1,137 @@
+"""
+Markdown -> speech text: regex pipeline vs. incremental normalizer.
+
+    uv run python -m benchmarks.bench_markdown_tts [--sizes 2000 20000 100000]
+
+Each size is a synthetic assistant answer (headings, lists, links, inline
+code, fenced code). Deltas are fed in token-sized pieces, as the chat
+stream produces them. Reported per size (median seconds):
+
+- regex_full: markdown_to_tts_text on the finished document
+- regex_per_delta: re-running it on the accumulated text at every delta,
+  which is what streaming cleanup costs without the normalizer
+- incremental_stream: MarkdownTtsNormalizer fed delta by delta
+- incremental_full: MarkdownTtsNormalizer fed the whole document at once
+
+Output parity with markdown_to_tts_text is checked for every size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.services.markdown_tts import MarkdownTtsNormalizer, markdown_to_tts_text
+
+_BLOCKS = [
+    "## Overview\n\nThe **service** reads a `config.yaml` file and starts _three_ workers. ",
+    "See the [docs](https://example.com/docs) or ![diagram](img.png) for details.\n\n",
+    "- First, install the package.\n- Then run `make build`.\n- Finally, restart.\n\n",
+    "1. Open the file.\n2. Edit the ~~old~~ value.\n3. Save it.\n\n",
+    "> Note: this only applies to <b>version 2</b> and later.\n\n",
+    "```python\ndef main():\n    print('hello')\n```\n\n",
+    "Is it fast? Yes! It handles thousands of requests per second… mostly.\n\n",
+]
+
+
+def make_document(size: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    parts: list[str] = []
+    total = 0
+    while total < size:
+        block = rnd.choice(_BLOCKS)
+        parts.append(block)
+        total += len(block)
+    return "".join(parts)[:size]
+
+
+def split_deltas(doc: str, seed: int = 0) -> list[str]:
+    # Roughly LLM-token-sized pieces
+    rnd = random.Random(seed)
+    out: list[str] = []
+    i = 0
+    while i < len(doc):
+        n = rnd.randint(1, 8)
+        out.append(doc[i : i + n])
+        i += n
+    return out
+
+
+def _median_seconds(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def run(sizes: list[int], repeat: int, per_delta_limit: int) -> dict:
+    results = []
+    for size in sizes:
+        doc = make_document(size)
+        deltas = split_deltas(doc)
+        expected = markdown_to_tts_text(doc)
+
+        def incremental_stream() -> str:
+            n = MarkdownTtsNormalizer()
+            for d in deltas:
+                n.feed(d)
+            n.finish()
+            return n.text
+
+        def incremental_full() -> str:
+            n = MarkdownTtsNormalizer()
+            n.feed(doc)
+            n.finish()
+            return n.text
+
+        def regex_per_delta() -> None:
+            acc = ""
+            for d in deltas:
+                acc += d
+                markdown_to_tts_text(acc)
+
+        parity = incremental_stream() == expected and incremental_full() == expected
+
+        row = {
+            "chars": len(doc),
+            "deltas": len(deltas),
+            "parity": parity,
+            "regex_full_s": _median_seconds(lambda: markdown_to_tts_text(doc), repeat),
+            "incremental_stream_s": _median_seconds(incremental_stream, repeat),
+            "incremental_full_s": _median_seconds(incremental_full, repeat),
+            # Quadratic; skipped for large documents
+            "regex_per_delta_s": (
+                _median_seconds(regex_per_delta, 1) if size <= per_delta_limit else None
+            ),
+        }
+        results.append(row)
+
+    return {"benchmark": "markdown_tts", "repeat": repeat, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 20_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--per-delta-limit", type=int, default=20_000)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results here")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.per_delta_limit)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(text)
+
+    if not all(r["parity"] for r in report["results"]):
+        raise SystemExit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
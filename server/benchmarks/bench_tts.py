@@ -0,0 +1,342 @@
+"""
+TTS benchmark: real-time factor, time to first audio, latency and
+throughput under concurrency.
+
+    uv run python -m benchmarks.bench_tts [--voice af_heart] [--workers 2]
+        [--split-pattern '\\n+'] [--concurrency 1 2 4 8] [--url http://127.0.0.1:8000]
+        [--backend torch] [--compare-backend onnx]
+
+Two phases over a fixed corpus of short, medium and long markdown inputs:
+
+- runtime: KokoroRuntime in this process. Per input: markdown cleanup
+  time, full synthesis latency, real-time factor (synthesis seconds /
+  audio seconds) and time to the first streamed segment.
+- http: POST /v1/audio/speech at increasing concurrency. Against `--url`
+  if given (run that server with KOKORO_CACHE_MAX_ENTRIES=0), otherwise
+  against the speech route mounted in-process. Reports p50/p95 latency
+  and requests per second.
+- backends (with --compare-backend): the same corpus through a second
+  in-process runtime on another synthesis backend. Reports the speedup
+  and how far its audio is from the primary backend's (duration ratio and
+  log-spectral distance in dB; 0 means identical spectra).
+
+The audio cache is disabled for in-process runs so every request is
+synthesized. Output is JSON so runs can be diffed between builds.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+from typing import Optional
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.api.v1.openai.audio_speech import router as speech_router
+from app.core.settings import Settings
+from app.services.markdown_tts import markdown_to_tts_text
+from app.services.tts_runtime import KokoroRuntime, build_tts_runtime
+
+CORPUS = {
+    "short": "Sure, **that works**.",
+    "medium": (
+        "## Quick answer\n\n"
+        "You can run the server with `uv run main.py`. It listens on port 8000 "
+        "and serves the [OpenAI-compatible](https://platform.openai.com) routes.\n\n"
+        "- Chat completions stream tokens as they arrive.\n"
+        "- Speech returns a WAV file for the given text.\n"
+    ),
+    "long": (
+        "# Setting up the project\n\n"
+        "First, install the dependencies for both the client and the server. "
+        "The server uses uv, so a single command creates the environment and "
+        "installs everything. The client uses npm.\n\n"
+        "```bash\nuv sync\nnpm install\n```\n\n"
+        "Next, start Neo4j. Long-term memory is optional, but without it the "
+        "assistant forgets everything between sessions. If the connection "
+        "fails, the server logs a warning and keeps running.\n\n"
+        "1. Start the database with Docker.\n"
+        "2. Set the password in the environment.\n"
+        "3. Restart the server and check the logs.\n\n"
+        "> Tip: voices are loaded lazily, so the very first request is slower "
+        "unless warm-up is enabled.\n\n"
+        "Finally, open the client in your browser, type a question, and press "
+        "the speaker button next to the answer. Audio starts after the first "
+        "sentence is ready, and the rest follows while you listen."
+    ),
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    # Nearest-rank; good enough for benchmark summaries
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "n": len(samples),
+        "p50_s": percentile(samples, 0.50),
+        "p95_s": percentile(samples, 0.95),
+        "mean_s": statistics.fmean(samples) if samples else 0.0,
+    }
+
+
+# -------------------------------------------------------------------------
+# Runtime phase
+# -------------------------------------------------------------------------
+async def bench_runtime(tts: KokoroRuntime, repeat: int) -> dict:
+    out: dict[str, dict] = {}
+    for name, markdown in CORPUS.items():
+        t0 = time.perf_counter()
+        markdown_to_tts_text(markdown)
+        normalize_s = time.perf_counter() - t0
+
+        latencies: list[float] = []
+        first_audio: list[float] = []
+        audio_s = 0.0
+        for _ in range(repeat):
+            job = tts.prepare(markdown, response_format="pcm")
+
+            t0 = time.perf_counter()
+            pcm = await tts.render_audio(job)
+            latencies.append(time.perf_counter() - t0)
+            audio_s = len(pcm) / 2 / tts.sample_rate
+
+            t0 = time.perf_counter()
+            stream_job = tts.prepare(markdown, response_format="pcm", stream=True)
+            async for _chunk in tts.render_stream(stream_job):
+                first_audio.append(time.perf_counter() - t0)
+                break
+
+        synth = summarize(latencies)
+        out[name] = {
+            "input_chars": len(markdown),
+            "normalize_s": normalize_s,
+            "audio_s": audio_s,
+            "synthesis": synth,
+            "rtf": (synth["p50_s"] / audio_s) if audio_s else None,
+            "first_segment": summarize(first_audio),
+        }
+    return out
+
+
+# -------------------------------------------------------------------------
+# Backend comparison
+# -------------------------------------------------------------------------
+def log_spectral_distance(a: np.ndarray, b: np.ndarray, n_fft: int = 1024) -> float:
+    """
+    Mean log-spectral distance (dB) between two int16 clips, over their
+    common length. Frame-level, so small timing shifts barely register.
+    """
+    n = min(len(a), len(b))
+    if n < n_fft:
+        return 0.0
+    hop = n_fft // 4
+    window = np.hanning(n_fft)
+
+    def spec(x: np.ndarray) -> np.ndarray:
+        x = x[:n].astype(np.float64) / 32768.0
+        frames = np.lib.stride_tricks.sliding_window_view(x, n_fft)[::hop] * window
+        return np.abs(np.fft.rfft(frames, axis=-1)) ** 2 + 1e-10
+
+    diff = 10.0 * np.log10(spec(a)) - 10.0 * np.log10(spec(b))
+    return float(np.mean(np.sqrt(np.mean(diff**2, axis=-1))))
+
+
+async def _render_corpus(tts: KokoroRuntime, repeat: int) -> dict[str, tuple[float, np.ndarray]]:
+    out: dict[str, tuple[float, np.ndarray]] = {}
+    for name, markdown in CORPUS.items():
+        job = tts.prepare(markdown, response_format="pcm")
+        samples: list[float] = []
+        pcm = b""
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            pcm = await tts.render_audio(job)
+            samples.append(time.perf_counter() - t0)
+        out[name] = (percentile(samples, 0.5), np.frombuffer(pcm, dtype=np.int16))
+    return out
+
+
+async def bench_backends(
+    primary: KokoroRuntime, settings: Settings, other_backend: str, repeat: int
+) -> dict:
+    other = await build_tts_runtime(
+        settings.model_copy(update={"kokoro_backend": other_backend, "kokoro_workers": 0})
+    )
+    try:
+        await other.warm_up([], settings.kokoro_warmup_text)
+        base = await _render_corpus(primary, repeat)
+        cand = await _render_corpus(other, repeat)
+    finally:
+        other.close()
+
+    rows: dict[str, dict] = {}
+    for name in CORPUS:
+        (t_base, a_base), (t_cand, a_cand) = base[name], cand[name]
+        rows[name] = {
+            "baseline_p50_s": t_base,
+            "candidate_p50_s": t_cand,
+            "speedup": (t_base / t_cand) if t_cand else None,
+            "duration_ratio": (len(a_cand) / len(a_base)) if len(a_base) else None,
+            "log_spectral_distance_db": log_spectral_distance(a_base, a_cand),
+        }
+    return {"baseline": settings.kokoro_backend, "candidate": other_backend, "inputs": rows}
+
+
+# -------------------------------------------------------------------------
+# HTTP phase
+# -------------------------------------------------------------------------
+async def _one_request(client: httpx.AsyncClient, body: dict) -> float:
+    t0 = time.perf_counter()
+    res = await client.post("/v1/audio/speech", json=body)
+    res.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def bench_http(
+    client: httpx.AsyncClient,
+    voice: Optional[str],
+    levels: list[int],
+    requests_per_level: int,
+) -> list[dict]:
+    rows: list[dict] = []
+    inputs = list(CORPUS.values())
+    for concurrency in levels:
+        sem = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+
+        async def worker(i: int) -> None:
+            body = {"input": inputs[i % len(inputs)], "voice": voice, "response_format": "wav"}
+            async with sem:
+                latencies.append(await _one_request(client, body))
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(requests_per_level)))
+        wall = time.perf_counter() - t0
+
+        rows.append(
+            {
+                "concurrency": concurrency,
+                "requests": requests_per_level,
+                "wall_s": wall,
+                "rps": requests_per_level / wall if wall else 0.0,
+                "latency": summarize(latencies),
+            }
+        )
+    return rows
+
+
+def _local_app(tts: KokoroRuntime) -> FastAPI:
+    app = FastAPI()
+    app.include_router(speech_router, prefix="/v1")
+    app.state.tts = tts
+    return app
+
+
+# -------------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------------
+async def run(args: argparse.Namespace) -> dict:
+    overrides: dict = {"kokoro_cache_max_entries": 0, "kokoro_warmup": False}
+    if args.voice:
+        overrides["kokoro_voice"] = args.voice
+    if args.split_pattern:
+        overrides["kokoro_split_pattern"] = args.split_pattern
+    if args.workers is not None:
+        overrides["kokoro_workers"] = args.workers
+    if args.worker_threads is not None:
+        overrides["kokoro_worker_threads"] = args.worker_threads
+    if args.no_phoneme_cache:
+        overrides["kokoro_phoneme_cache_max_entries"] = 0
+    if args.backend:
+        overrides["kokoro_backend"] = args.backend
+    settings = Settings(**overrides)
+
+    report: dict = {
+        "benchmark": "tts",
+        "python": platform.python_version(),
+        "config": {
+            "backend": settings.kokoro_backend,
+            "voice": settings.kokoro_voice,
+            "split_pattern": settings.kokoro_split_pattern,
+            "stream_split_pattern": settings.kokoro_stream_split_pattern,
+            "workers": settings.kokoro_workers,
+            "worker_threads": settings.kokoro_worker_threads,
+            "batch_window_ms": settings.kokoro_batch_window_ms,
+            "phoneme_cache_max_entries": settings.kokoro_phoneme_cache_max_entries,
+            "repeat": args.repeat,
+            "url": args.url,
+        },
+    }
+
+    tts = await build_tts_runtime(settings)
+    try:
+        # Lazy model/voice loading is reported, not mixed into latencies
+        warmup = await tts.warm_up([], settings.kokoro_warmup_text)
+        report["warmup_s"] = warmup.total_seconds
+
+        if not args.skip_runtime:
+            report["runtime"] = await bench_runtime(tts, args.repeat)
+
+        if args.compare_backend:
+            report["backends"] = await bench_backends(
+                tts, settings, args.compare_backend, args.repeat
+            )
+
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=None)
+        else:
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=_local_app(tts)),
+                base_url="http://bench",
+                timeout=None,
+            )
+        async with client:
+            report["http"] = await bench_http(
+                client, settings.kokoro_voice, args.concurrency, args.requests
+            )
+
+        report["stats"] = tts.stats()
+    finally:
+        tts.close()
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--voice", default=None)
+    parser.add_argument("--split-pattern", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--worker-threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=16, help="Requests per concurrency level")
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead")
+    parser.add_argument("--skip-runtime", action="store_true")
+    parser.add_argument("--no-phoneme-cache", action="store_true")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=None)
+    parser.add_argument("--compare-backend", choices=["torch", "onnx"], default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write results here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
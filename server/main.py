@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.services.factory import initialize_graphiti, initialize_langfuse
 from app.services.history import build_history_service
@@ -44,6 +47,17 @@ async def lifespan(app: FastAPI):
 
     # Init TTS
     app.state.tts = await build_tts_runtime(settings)
+    # Lets streamed replies pre-synthesize their sentences (if enabled)
+    app.state.chat.presynth = app.state.tts.presynth
+
+    # Warm up in the background; /readyz stays 503 until it finishes
+    app.state.tts_warmup = None
+    if settings.kokoro_warmup:
+        app.state.tts_warmup = asyncio.create_task(
+            app.state.tts.warm_up(
+                settings.kokoro_preload_voices, settings.kokoro_warmup_text
+            )
+        )
 
     logger.info("Application startup complete.")
     yield
@@ -51,6 +65,12 @@ async def lifespan(app: FastAPI):
     # Cleanup
     logger.info("Shutting down...")
 
+    if app.state.tts_warmup and not app.state.tts_warmup.done():
+        app.state.tts_warmup.cancel()
+    app.state.tts.close()
+    # Flush pending chat turns before the memory connection goes away
+    await app.state.chat.close(settings.memory_outbox_drain_s)
+
     if memory_client:
         try:
             if hasattr(memory_client, "close"):
@@ -93,6 +113,18 @@ def create_app() -> FastAPI:
     async def healthz():
         return {"ok": True}
 
+    @app.get("/readyz")
+    async def readyz(request: Request):
+        """
+        Readiness for load balancers: 503 until the TTS warm-up has finished.
+        """
+        tts = getattr(request.app.state, "tts", None)
+        ready = bool(tts and tts.warmup.ready)
+        return JSONResponse(
+            {"ready": ready, "tts": asdict(tts.warmup) if tts else None},
+            status_code=200 if ready else 503,
+        )
+
     return app
 
 
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable
+
+import pytest
+from pydantic_ai.models.function import FunctionModel
+
+from app.core.settings import Settings
+from app.services.chat_runtime import ChatRuntime, build_chat_runtime
+from app.services.history import SQLiteChatHistory
+
+
+def make_settings(**overrides) -> Settings:
+    # Ignore any local .env; no summaries, no memory
+    overrides.setdefault("prompt_summary_max_tokens", 0)
+    return Settings(_env_file=None, **overrides)
+
+
+class GatedModel:
+    """
+    `stream` is a FunctionModel stream function that yields `words` once
+    `gate` is set, counting how many generations were started.
+    """
+
+    def __init__(self, words: list[str]):
+        self.words = words
+        self.gate = asyncio.Event()
+        self.calls = 0
+
+    async def stream(self, messages, info) -> AsyncIterator[str]:
+        self.calls += 1
+        await self.gate.wait()
+        for w in self.words:
+            yield w
+
+
+@pytest.fixture
+def chat_runtime(tmp_path) -> Callable[..., Awaitable[ChatRuntime]]:
+    """
+    Builds a ChatRuntime on a fresh SQLite file whose LLM is `model`
+    (a FunctionModel stream function). Call it inside the test's loop and
+    close the runtime before the loop ends.
+    """
+
+    async def build(model, **overrides) -> ChatRuntime:
+        history = SQLiteChatHistory(str(tmp_path / "chat.db"))
+        await history.initialize()
+        chat = await build_chat_runtime(make_settings(**overrides), None, history)
+        chat.router.backends[0].model = FunctionModel(stream_function=model)
+        return chat
+
+    return build
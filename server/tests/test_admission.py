@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.schemas.openai_chat import ChatMessage
+from app.services.admission import (
+    ChatAdmission,
+    ChatOverloaded,
+    build_chat_admission,
+    retry_after_header,
+)
+from tests.conftest import GatedModel, make_settings
+
+
+def test_off_by_default():
+    assert build_chat_admission(make_settings()) is None
+    assert build_chat_admission(make_settings(chat_max_concurrent=2)) is not None
+
+
+def test_rejects_when_queue_is_full():
+    async def main():
+        adm = ChatAdmission(max_concurrent=1, max_queue=1, max_wait_s=60.0)
+        slot = await adm.acquire("a")
+        waiter = asyncio.create_task(adm.acquire("b"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ChatOverloaded) as exc:
+            await adm.acquire("c")
+        assert retry_after_header(exc.value) == {"Retry-After": "1"}
+        assert adm.rejected == 1
+
+        slot.release()
+        (await waiter).release()
+        assert adm.running == 0
+
+    asyncio.run(main())
+
+
+def test_rejects_when_expected_wait_is_too_long():
+    async def main():
+        adm = ChatAdmission(max_concurrent=1, max_queue=8, max_wait_s=0.01)
+        slot = await adm.acquire("a")
+        await asyncio.sleep(0.05)
+        slot.release()
+
+        # One generation took ~50 ms, so the next in line would wait that long
+        slot = await adm.acquire("a")
+        with pytest.raises(ChatOverloaded) as exc:
+            await adm.acquire("b")
+        assert exc.value.retry_after_s >= 1.0
+        slot.release()
+
+    asyncio.run(main())
+
+
+def test_sessions_are_served_round_robin():
+    async def main():
+        adm = ChatAdmission(max_concurrent=1, max_queue=8, max_wait_s=60.0)
+        slot = await adm.acquire("busy")
+        order: list[str] = []
+
+        async def request(session_id: str, n: int) -> None:
+            s = await adm.acquire(session_id)
+            order.append(f"{session_id}{n}")
+            s.release()
+
+        # "a" queues three requests before "b" queues one
+        tasks = [asyncio.create_task(request("a", i)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("b", 0)))
+        await asyncio.sleep(0)
+
+        slot.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a0", "b0", "a1", "a2"]
+        assert adm.running == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        adm = ChatAdmission(max_concurrent=1, max_queue=8, max_wait_s=60.0)
+        slot = await adm.acquire("a")
+        waiter = asyncio.create_task(adm.acquire("b"))
+        await asyncio.sleep(0)
+        assert adm.queue_depth() == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert adm.queue_depth() == 0
+
+        slot.release()
+        assert adm.running == 0
+
+    asyncio.run(main())
+
+
+def test_chat_completions_returns_429_with_retry_after(chat_runtime):
+    pytest.importorskip("kokoro")
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api.v1.openai.chat_completions import router
+
+    async def main():
+        model = GatedModel(["Hello", " there"])
+        chat = await chat_runtime(model.stream, chat_max_concurrent=1, chat_max_queue=0)
+        app = FastAPI()
+        app.include_router(router, prefix="/v1")
+        app.state.chat = chat
+        try:
+            # Hold the only slot with a generation that has not finished
+            turn = await chat.prepare([ChatMessage(role="user", content="first")], "s1")
+            await chat.start(turn)
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                r = await client.post(
+                    "/v1/chat/completions",
+                    json={"messages": [{"role": "user", "content": "second"}]},
+                    headers={"X-Session-ID": "s2"},
+                )
+            assert r.status_code == 429
+            assert int(r.headers["Retry-After"]) >= 1
+
+            model.gate.set()
+            assert "".join([d async for d in chat.stream(turn)]) == "Hello there"
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
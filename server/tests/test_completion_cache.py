@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.schemas.openai_chat import ChatMessage
+from app.services.completion_cache import CompletionCache
+from app.services.usage import TurnUsage
+from tests.conftest import GatedModel
+
+
+def test_hit_replays_deltas_and_usage():
+    cache = CompletionCache(max_entries=4, max_chars=1000, ttl_s=60.0)
+    usage = TurnUsage(prompt_tokens=12, completion_tokens=3)
+    cache.put("k", ("Hel", "lo"), usage)
+
+    hit = cache.get("k")
+    assert hit is not None
+    assert hit.deltas == ("Hel", "lo")
+    assert hit.usage == usage
+    assert cache.get("other") is None
+
+
+def test_cached_reply_reports_the_original_usage(chat_runtime):
+    async def main():
+        model = GatedModel(["Hello", " there"])
+        model.gate.set()
+        chat = await chat_runtime(model.stream, chat_cache_max_entries=4)
+        messages = [ChatMessage(role="user", content="hi")]
+        try:
+            first = await chat.prepare(messages, "s1", sampling={"temperature": 0})
+            assert "".join([d async for d in chat.stream(first)]) == "Hello there"
+            assert first.usage.completion_tokens > 0 and not first.usage.cached
+
+            # Another session, so the prompt has no history of the first turn
+            second = await chat.prepare(messages, "s2", sampling={"temperature": 0})
+            assert second.cached == ("Hello", " there")
+            assert "".join([d async for d in chat.stream(second)]) == "Hello there"
+            assert model.calls == 1
+
+            assert second.usage.cached
+            assert (second.usage.prompt_tokens, second.usage.completion_tokens) == (
+                first.usage.prompt_tokens,
+                first.usage.completion_tokens,
+            )
+            usage = second.usage.as_openai()
+            assert usage["total_tokens"] == first.usage.total_tokens
+            assert usage["prompt_tokens_details"] == {"cached_tokens": first.usage.prompt_tokens}
+
+            # Totals only count tokens the model actually processed
+            stats = chat.usage_store.stats()
+            assert stats["by_source"] == {"llm": 1, "cache": 1}
+            assert stats["completion_tokens"] == first.usage.completion_tokens
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.schemas.openai_chat import ChatMessage
+from app.services.inflight import InflightGenerations
+from tests.conftest import GatedModel
+
+
+async def _settle() -> None:
+    # Let done callbacks run
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def _collect(chat, turn) -> str:
+    return "".join([d async for d in chat.stream(turn)])
+
+
+def test_identical_requests_join_one_generation(chat_runtime):
+    async def main():
+        model = GatedModel(["Hello", " there"])
+        chat = await chat_runtime(model.stream, chat_max_concurrent=1)
+        try:
+            messages = [ChatMessage(role="user", content="hi")]
+            first = await chat.prepare(messages, "s1")
+            second = await chat.prepare(messages, "s1")
+            await chat.start(first)
+            # Joins instead of queueing behind the only slot
+            await asyncio.wait_for(chat.start(second), 1.0)
+            assert (first.owner, second.owner) == (True, False)
+            assert first.generation is second.generation
+
+            model.gate.set()
+            texts = await asyncio.gather(_collect(chat, first), _collect(chat, second))
+            assert texts == ["Hello there", "Hello there"]
+            assert model.calls == 1
+            assert chat.inflight.stats()["coalesced"] == 1
+
+            await _settle()
+            assert chat.admission.running == 0
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
+
+
+def test_last_subscriber_leaving_cancels_and_releases_slot(chat_runtime):
+    async def main():
+        model = GatedModel(["Hello", " there", " again"])
+        model.gate.set()
+        chat = await chat_runtime(model.stream, chat_max_concurrent=1)
+        try:
+            turn = await chat.prepare([ChatMessage(role="user", content="hi")], "s1")
+            await chat.start(turn)
+            stream = chat.stream(turn)
+            assert await anext(stream) == "Hello"
+            # Client went away
+            await stream.aclose()
+
+            await asyncio.wait([turn.generation.task], timeout=1.0)
+            await _settle()
+            assert turn.generation.done
+            assert turn.generation.task.cancelled()
+            assert chat.admission.running == 0
+            stats = chat.inflight.stats()
+            assert (stats["inflight"], stats["cancelled"]) == (0, 1)
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
+
+
+def test_generation_cancelled_before_it_starts_releases_slot(chat_runtime):
+    async def main():
+        model = GatedModel(["Hello"])
+        chat = await chat_runtime(model.stream, chat_max_concurrent=1)
+        try:
+            turn = await chat.prepare([ChatMessage(role="user", content="hi")], "s1")
+            await chat.start(turn)
+            # Before the task has taken its first step
+            turn.generation.task.cancel()
+
+            await _settle()
+            assert model.calls == 0
+            assert turn.generation.done
+            assert chat.admission.running == 0
+            assert chat.inflight.stats()["inflight"] == 0
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
+
+
+def test_late_subscriber_replays_buffered_deltas():
+    async def main():
+        inflight = InflightGenerations()
+        gate = asyncio.Event()
+
+        async def produce(gen):
+            yield "a"
+            yield "b"
+            await gate.wait()
+            yield "c"
+
+        gen, _ = inflight.join("key", produce)
+        await _settle()
+        assert gen.deltas == ["a", "b"]
+
+        joined, owner = inflight.join("key", produce)
+        assert joined is gen and not owner
+        gate.set()
+        assert [d async for d in joined.subscribe()] == ["a", "b", "c"]
+
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import memory_outbox
+from app.services.history import SQLiteChatHistory
+from app.services.memory_outbox import MemoryWriter
+
+
+class FakeMemory:
+    """
+    Records add_episode calls; raises while `fail` is set.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.episodes: list[str] = []
+
+    async def add_episode(self, name, episode_body, **_kwargs) -> None:
+        if self.fail:
+            raise ConnectionError("graph database unavailable")
+        self.episodes.append(episode_body)
+
+
+@pytest.fixture(autouse=True)
+def graphiti(monkeypatch):
+    # Graphiti itself is optional; the writer only needs its episode type
+    monkeypatch.setattr(memory_outbox, "graphiti_available", True)
+    monkeypatch.setattr(
+        memory_outbox, "EpisodeType", SimpleNamespace(message="message"), raising=False
+    )
+
+
+def _writer(history: SQLiteChatHistory, memory: FakeMemory, **overrides) -> MemoryWriter:
+    options = dict(
+        max_pending=16,
+        episode_max_turns=4,
+        episode_linger_s=60.0,
+        max_attempts=5,
+        retry_base_s=60.0,
+        retry_max_s=60.0,
+    )
+    options.update(overrides)
+    return MemoryWriter(history=history, memory=memory, cache=None, **options)
+
+
+async def _history(tmp_path) -> SQLiteChatHistory:
+    history = SQLiteChatHistory(str(tmp_path / "chat.db"))
+    await history.initialize()
+    return history
+
+
+def test_history_is_written_before_the_episode(tmp_path):
+    async def main():
+        history = await _history(tmp_path)
+        memory = FakeMemory()
+        writer = _writer(history, memory)
+        await writer.start()
+
+        await writer.enqueue("s1", "hi", "hello")
+        rows = await history.get_messages("s1")
+        assert [(m.role, m.content) for m in rows] == [("user", "hi"), ("assistant", "hello")]
+        # Lingering for more turns
+        assert writer.pending == 1 and memory.episodes == []
+
+        await writer.drain(1.0)
+        assert memory.episodes == ["User: hi\nAssistant: hello"]
+
+    asyncio.run(main())
+
+
+def test_consecutive_turns_become_one_episode(tmp_path):
+    async def main():
+        history = await _history(tmp_path)
+        memory = FakeMemory()
+        writer = _writer(history, memory, episode_max_turns=2, episode_linger_s=0.0)
+        await writer.start()
+
+        await writer.enqueue("s1", "one", "1")
+        await writer.enqueue("s1", "two", "2")
+        await writer.drain(1.0)
+
+        assert memory.episodes == ["User: one\nAssistant: 1\n\nUser: two\nAssistant: 2"]
+        assert writer.stats()["turns_per_episode"] == 2.0
+
+    asyncio.run(main())
+
+
+def test_pending_turns_survive_a_restart(tmp_path):
+    async def main():
+        history = await _history(tmp_path)
+
+        down = FakeMemory(fail=True)
+        writer = _writer(history, down)
+        await writer.start()
+        await writer.enqueue("s1", "one", "1")
+        await writer.enqueue("s2", "two", "2")
+        await writer.drain(1.0)
+        assert writer.pending == 2 and down.episodes == []
+
+        up = FakeMemory()
+        writer = _writer(history, up)
+        await writer.start()
+        assert writer.pending == 2
+        await writer.drain(1.0)
+
+        assert sorted(up.episodes) == ["User: one\nAssistant: 1", "User: two\nAssistant: 2"]
+        assert writer.pending == 0
+        # Written to history once, by the first enqueue
+        assert len(await history.get_messages("s1")) == 2
+
+    asyncio.run(main())
+
+
+def test_full_outbox_skips_memory_not_history(tmp_path):
+    async def main():
+        history = await _history(tmp_path)
+        memory = FakeMemory()
+        writer = _writer(history, memory, max_pending=1)
+        await writer.start()
+
+        await writer.enqueue("s1", "one", "1")
+        await writer.enqueue("s1", "two", "2")
+        assert writer.stats()["skipped"] == 1
+        assert len(await history.get_messages("s1")) == 4
+
+        await writer.drain(1.0)
+        assert memory.episodes == ["User: one\nAssistant: 1"]
+
+    asyncio.run(main())
+
+
+def test_episode_is_dropped_after_max_attempts(tmp_path):
+    async def main():
+        history = await _history(tmp_path)
+        memory = FakeMemory(fail=True)
+        writer = _writer(
+            history, memory, episode_linger_s=0.0, max_attempts=2, retry_base_s=0.01
+        )
+        await writer.start()
+
+        await writer.enqueue("s1", "one", "1")
+        for _ in range(100):
+            if writer.dropped:
+                break
+            await asyncio.sleep(0.02)
+        stats = writer.stats()
+        assert (stats["retries"], stats["dropped"], stats["pending"]) == (1, 1, 0)
+        await writer.drain(1.0)
+
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from app.schemas.openai_chat import ChatMessage
+from app.services.memory_cache import build_memory_cache
+from app.services.retrieval import ContextRetriever
+from tests.conftest import GatedModel, make_settings
+
+
+class SlowSource:
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.calls = 0
+
+    async def search(self) -> list[str]:
+        self.calls += 1
+        await asyncio.sleep(self.delay_s)
+        return ["fact"]
+
+
+async def _history() -> list[str]:
+    return ["message"]
+
+
+def test_late_lookup_is_dropped_and_not_repeated_for_its_session():
+    async def main():
+        retriever = ContextRetriever(0.02)
+        memory = SlowSource(0.2)
+
+        first = await retriever.gather({"history": _history(), "memory": memory.search()}, "s1")
+        second = await retriever.gather({"history": _history(), "memory": memory.search()}, "s1")
+        assert first == second == {"history": ["message"]}
+        assert memory.calls == 1
+        assert retriever.stats()["sources"]["memory"]["skipped"] == 1
+
+        # Once the late one is done the session searches again
+        await asyncio.sleep(0.25)
+        await retriever.gather({"memory": memory.search()}, "s1")
+        assert memory.calls == 2
+        await asyncio.sleep(0.25)
+        assert retriever.stats()["late_running"] == 0
+
+    asyncio.run(main())
+
+
+def test_late_lookup_does_not_make_other_sessions_skip():
+    async def main():
+        retriever = ContextRetriever(0.02)
+        slow = SlowSource(0.2)
+        fast = SlowSource(0.0)
+
+        await retriever.gather({"memory": slow.search()}, "s1")
+        other = await retriever.gather({"memory": fast.search()}, "s2")
+        assert other == {"memory": ["fact"]}
+        assert retriever.stats()["sources"]["memory"]["skipped"] == 0
+        await asyncio.sleep(0.25)
+
+    asyncio.run(main())
+
+
+def test_cached_memory_facts_survive_a_late_search(chat_runtime):
+    class Memory:
+        async def search(self, query: str):
+            if query == "slow":
+                await asyncio.sleep(0.3)
+            return [SimpleNamespace(fact=f"fact about {query}")]
+
+    async def main():
+        chat = await chat_runtime(GatedModel([]).stream, context_deadline_ms=50.0)
+        chat.memory = Memory()
+        chat.memory_cache = build_memory_cache(make_settings())
+        try:
+            turn = await chat.prepare([ChatMessage(role="user", content="cats")], "s1")
+            assert "fact about cats" in turn.prompt
+
+            # Leaves a late memory search running for the session
+            turn = await chat.prepare([ChatMessage(role="user", content="slow")], "s1")
+            assert "fact about slow" not in turn.prompt
+
+            turn = await chat.prepare([ChatMessage(role="user", content="cats")], "s1")
+            assert "fact about cats" in turn.prompt
+            await asyncio.sleep(0.3)
+        finally:
+            await chat.close(1.0)
+
+    asyncio.run(main())
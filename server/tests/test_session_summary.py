@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from app.services.admission import ChatAdmission
+from app.services.history import SQLiteChatHistory
+from app.services.llm_router import build_llm_router
+from app.services.prompt_budget import build_token_counter
+from app.services.session_summary import build_session_summarizer
+from tests.conftest import make_settings
+
+
+def _summary_model(calls: list[str]) -> FunctionModel:
+    def summarize(messages, info) -> ModelResponse:
+        calls.append("summary")
+        return ModelResponse(parts=[TextPart("They said hi.")])
+
+    return FunctionModel(function=summarize)
+
+
+async def _setup(tmp_path, admission):
+    settings = make_settings(prompt_summary_max_tokens=64)
+    history = SQLiteChatHistory(str(tmp_path / "chat.db"))
+    await history.initialize()
+    await history.add_message("s1", "user", "hi")
+    await history.add_message("s1", "assistant", "hello")
+
+    router = build_llm_router(settings)
+    calls: list[str] = []
+    router.backends[0].model = _summary_model(calls)
+    summarizer = build_session_summarizer(
+        settings, router, admission, history, build_token_counter(settings)
+    )
+    return history, router, summarizer, calls
+
+
+def test_summary_waits_for_an_admission_slot(tmp_path):
+    async def main():
+        admission = ChatAdmission(max_concurrent=1, max_queue=4, max_wait_s=60.0)
+        history, router, summarizer, calls = await _setup(tmp_path, admission)
+
+        chat_turn = await admission.acquire("s2")
+        summarizer.schedule("s1", upto_id=2)
+        await asyncio.sleep(0.05)
+        assert calls == [] and admission.queue_depth() == 1
+
+        chat_turn.release()
+        await asyncio.wait_for(asyncio.gather(*summarizer._tasks.values()), 1.0)
+        assert calls == ["summary"]
+        assert await history.get_summary("s1") == ("They said hi.", 2)
+        # Went through the router on the session's backend
+        assert router.backends[0].requests == 1
+        assert admission.running == 0
+
+    asyncio.run(main())
+
+
+def test_summary_is_deferred_when_admission_is_full(tmp_path):
+    async def main():
+        admission = ChatAdmission(max_concurrent=1, max_queue=0, max_wait_s=60.0)
+        history, _router, summarizer, calls = await _setup(tmp_path, admission)
+
+        chat_turn = await admission.acquire("s2")
+        summarizer.schedule("s1", upto_id=2)
+        await asyncio.wait_for(asyncio.gather(*summarizer._tasks.values()), 1.0)
+        assert calls == []
+        stats = summarizer.stats()
+        assert (stats["deferred"], stats["failures"]) == (1, 0)
+        assert await history.get_summary("s1") == ("", 0)
+        chat_turn.release()
+
+    asyncio.run(main())
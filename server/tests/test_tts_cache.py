@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.tts_cache import TtsAudioCache, audio_model_fingerprint, make_audio_key
+from tests.conftest import make_settings
+
+BASE = dict(
+    clean_text="Hello there.",
+    voice="af_heart",
+    speed=1.0,
+    sample_rate=24000,
+    fmt="wav",
+    model="torch:hexgrad/Kokoro-82M",
+    split_pattern=r"\n+",
+)
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("clean_text", "Hello there!"),
+        ("voice", "am_adam"),
+        ("speed", 1.1),
+        ("sample_rate", 22050),
+        ("fmt", "mp3"),
+        ("model", "onnx:onnx-community/Kokoro-82M-v1.0-ONNX/onnx/model_quantized.onnx"),
+        ("split_pattern", r"(?<=[.!?…])\s+|\n+"),
+    ],
+)
+def test_key_changes_with_every_input(field, value):
+    assert make_audio_key(**BASE) == make_audio_key(**BASE)
+    assert make_audio_key(**BASE) != make_audio_key(**{**BASE, field: value})
+
+
+def test_fields_do_not_run_together():
+    a = make_audio_key(**{**BASE, "voice": "af", "clean_text": "_heart x"})
+    b = make_audio_key(**{**BASE, "voice": "af_heart", "clean_text": " x"})
+    assert a != b
+
+
+def test_model_fingerprint_tracks_backend_and_model():
+    torch = audio_model_fingerprint(make_settings())
+    other_repo = audio_model_fingerprint(make_settings(kokoro_repo_id="someone/Kokoro-fork"))
+    onnx = audio_model_fingerprint(make_settings(kokoro_backend="onnx"))
+    onnx_fp32 = audio_model_fingerprint(
+        make_settings(kokoro_backend="onnx", kokoro_onnx_file="onnx/model.onnx")
+    )
+    onnx_local = audio_model_fingerprint(
+        make_settings(kokoro_backend="onnx", kokoro_onnx_model_path="/models/kokoro.onnx")
+    )
+    assert len({torch, other_repo, onnx, onnx_fp32, onnx_local}) == 5
+
+
+def test_disk_tier_is_keyed_the_same_after_restart(tmp_path):
+    async def main():
+        key = make_audio_key(**BASE)
+        cache = TtsAudioCache(4, 1 << 20, str(tmp_path), 1 << 20)
+        await cache.put(key, b"RIFF-audio")
+
+        reopened = TtsAudioCache(4, 1 << 20, str(tmp_path), 1 << 20)
+        assert await reopened.get(key) == b"RIFF-audio"
+        # The same text from another model is a miss
+        assert await reopened.get(make_audio_key(**{**BASE, "model": "onnx:x"})) is None
+
+    asyncio.run(main())
+
+
+def test_streamed_and_full_renders_get_different_keys():
+    pytest.importorskip("kokoro")
+    from app.services.tts_runtime import KokoroRuntime
+    from app.services.tts_scheduler import TtsScheduler
+
+    def runtime(fingerprint: str) -> KokoroRuntime:
+        return KokoroRuntime(
+            pipelines=None,
+            sample_rate=24000,
+            default_voice="af_heart",
+            default_speed=1.0,
+            split_pattern=r"\n+",
+            stream_split_pattern=r"(?<=[.!?…])\s+|\n+",
+            scheduler=TtsScheduler(1),
+            model_fingerprint=fingerprint,
+        )
+
+    tts = runtime("torch:hexgrad/Kokoro-82M")
+    full = tts.prepare("Hello there. How are you?")
+    streamed = tts.prepare("Hello there. How are you?", stream=True)
+    assert full.key != streamed.key
+    assert full.key == tts.prepare("**Hello** there. How are you?").key
+    assert full.key != runtime("onnx:local").prepare("Hello there. How are you?").key
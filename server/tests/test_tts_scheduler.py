@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.tts_scheduler import PRIORITIES, TtsScheduler
+
+HIGH, NORMAL, LOW = PRIORITIES["high"], PRIORITIES["normal"], PRIORITIES["low"]
+
+
+async def _settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_slots_go_out_by_priority():
+    async def main():
+        scheduler = TtsScheduler(1)
+        await scheduler.acquire(NORMAL)
+        order: list[str] = []
+
+        async def job(name: str, priority: int) -> None:
+            await scheduler.acquire(priority)
+            order.append(name)
+            scheduler.release()
+
+        tasks = [
+            asyncio.create_task(job("low", LOW)),
+            asyncio.create_task(job("normal", NORMAL)),
+            asyncio.create_task(job("high", HIGH)),
+        ]
+        await _settle()
+        assert scheduler.queue_depth == 3
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["high", "normal", "low"]
+
+    asyncio.run(main())
+
+
+def test_promoted_waiter_overtakes_queued_work():
+    async def main():
+        scheduler = TtsScheduler(1)
+        await scheduler.acquire(NORMAL)
+        order: list[str] = []
+
+        async def job(name: str, priority: int) -> None:
+            await scheduler.acquire(priority)
+            order.append(name)
+            scheduler.release()
+
+        speculative = asyncio.create_task(job("speculative", LOW))
+        others = [asyncio.create_task(job(f"normal{i}", NORMAL)) for i in range(2)]
+        await _settle()
+
+        assert scheduler.promote(speculative, HIGH)
+        # Requeued, not duplicated
+        assert scheduler.queue_depth == 3
+
+        scheduler.release()
+        await asyncio.gather(speculative, *others)
+        assert order == ["speculative", "normal0", "normal1"]
+        assert scheduler.stats()["busy"] == 0
+
+    asyncio.run(main())
+
+
+def test_promote_ignores_tasks_that_are_not_waiting():
+    async def main():
+        scheduler = TtsScheduler(1)
+
+        async def running() -> None:
+            await scheduler.acquire(LOW)
+            await asyncio.sleep(0.01)
+            scheduler.release()
+
+        task = asyncio.create_task(running())
+        await _settle()
+        # Already holds its slot
+        assert not scheduler.promote(task, HIGH)
+        await task
+        assert not scheduler.promote(task, HIGH)
+
+    asyncio.run(main())
+
+
+def test_claimed_speculation_renders_before_queued_low_work():
+    pytest.importorskip("kokoro")
+    from app.services.tts_presynth import TtsPresynthesizer
+    from app.services.tts_runtime import KokoroRuntime
+
+    async def main():
+        tts = KokoroRuntime(
+            pipelines=None,
+            sample_rate=24000,
+            default_voice="af_heart",
+            default_speed=1.0,
+            split_pattern=r"\n+",
+            stream_split_pattern=r"(?<=[.!?…])\s+|\n+",
+            scheduler=TtsScheduler(1),
+        )
+        order: list[str] = []
+
+        async def render(job) -> bytes:
+            async def synth():
+                order.append(job.clean_text)
+                return job.clean_text.encode()
+
+            return await tts._run_exclusive(job.priority, synth)
+
+        tts.presynth = TtsPresynthesizer(tts.prepare, render, 30.0, 4, 16)
+
+        await tts.scheduler.acquire(NORMAL)
+        prefetch = [
+            asyncio.create_task(render(tts.prepare(f"Prefetch {i}.", priority="low")))
+            for i in range(2)
+        ]
+        await _settle()
+        # Queued behind the prefetch
+        tts.presynth.speculate("Second sentence.", None, None)
+        await _settle()
+
+        # The listener asks for the speculated segment at high priority
+        claim = asyncio.create_task(
+            tts.render_audio(tts.prepare("Second sentence.", priority="high"))
+        )
+        await _settle()
+        tts.scheduler.release()
+
+        assert await claim == b"Second sentence."
+        await asyncio.gather(*prefetch)
+        assert order == ["Second sentence.", "Prefetch 0.", "Prefetch 1."]
+
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("kokoro")
+
+from fastapi import WebSocketDisconnect  # noqa: E402
+
+from app.api.v1.voice import voice_socket  # noqa: E402
+
+
+class FakeSocket:
+    """
+    Feeds `messages` to the endpoint, then disconnects. Sending an
+    "error" message fails, as on a socket that is going away.
+    """
+
+    def __init__(self, chat, messages: list):
+        self.app = SimpleNamespace(state=SimpleNamespace(chat=chat, tts=object()))
+        self.messages = list(messages)
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive_json(self):
+        # Let the running turn get ahead of the next message
+        await asyncio.sleep(0.05)
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    async def send_json(self, payload: dict) -> None:
+        if payload["type"] == "error":
+            raise RuntimeError("socket closed")
+        self.sent.append(payload)
+
+
+class FailingChat:
+    async def stream_deltas(self, messages, session_id):
+        raise ValueError("LLM unavailable")
+        yield  # pragma: no cover
+
+
+def test_failed_turn_is_logged_when_the_next_message_arrives(caplog):
+    start = {"type": "start", "messages": [{"role": "user", "content": "hi"}]}
+    ws = FakeSocket(FailingChat(), [start, {"type": "stop"}])
+
+    with caplog.at_level(logging.ERROR, logger="app.api.v1.voice"):
+        asyncio.run(voice_socket(ws))
+
+    # The turn's own report, then the error that escaped it
+    messages = [r.getMessage() for r in caplog.records]
+    assert "Voice turn failed: LLM unavailable" in messages
+    assert "Voice turn failed: socket closed" in messages
+    # Nothing was running, so the stop is not acknowledged
+    assert ws.sent == []